@@ -0,0 +1,11 @@
+"""Benchmarks measuring sandman's throughput, latency, memory use and startup
+time against synthetic chinook-shaped databases of configurable size.
+
+Generate a database and run the benchmarks, from the project root, with::
+
+    python -m benchmarks.run --scale 100000
+
+and compare two result files (for example from two versions) with::
+
+    python -m benchmarks.compare OLD.json NEW.json
+"""
@@ -0,0 +1,80 @@
+"""Compare two benchmark result files written by :mod:`benchmarks.run`,
+reporting the change of each measurement and failing (with exit status 1)
+if any scenario regressed by more than a threshold.
+"""
+
+# Standard library imports
+import argparse
+import json
+import sys
+
+MEASUREMENTS = (
+    ('requests_per_second', 'req/s', True),
+    ('p50', 'p50', False),
+    ('p99', 'p99', False),
+    )
+"""The measurements compared: key, label and whether higher is better."""
+
+
+def _value(scenario, key):
+    """Return the measurement *key* of a scenario's results."""
+    if key in scenario:
+        return scenario[key]
+    return scenario['latency'][key]
+
+
+def compare(old, new, threshold):
+    """Return the rows of the comparison of the results *old* and *new*, and
+    whether any measurement regressed by more than *threshold*.
+
+    :param dict old: The baseline results
+    :param dict new: The results compared to the baseline
+    :param float threshold: The relative change tolerated, e.g. 0.1
+    :rtype: tuple
+    """
+    rows = []
+    regressed = False
+    for name in sorted(set(old['scenarios']) & set(new['scenarios'])):
+        for key, label, higher_is_better in MEASUREMENTS:
+            before = _value(old['scenarios'][name], key)
+            after = _value(new['scenarios'][name], key)
+            if not before or after is None:
+                continue
+            change = (after - before) / float(before)
+            worse = -change if higher_is_better else change
+            regression = worse > threshold
+            regressed = regressed or regression
+            rows.append((name, label, before, after, change, regression))
+    for key in ('startup_seconds', 'reflection_seconds'):
+        before, after = old.get(key), new.get(key)
+        if before and after is not None:
+            change = (after - before) / float(before)
+            regression = change > threshold
+            regressed = regressed or regression
+            rows.append((key.split('_')[0], 'seconds', before, after, change,
+                         regression))
+    return rows, regressed
+
+
+def main():
+    """Compare two result files from the command line."""
+    arguments = argparse.ArgumentParser(
+        description='Compare two sandman benchmark results')
+    arguments.add_argument('old', help='The baseline results file.')
+    arguments.add_argument('new', help='The results file to compare.')
+    arguments.add_argument(
+        '--threshold', default=0.1, type=float,
+        help='The relative change reported as a regression.')
+    args = arguments.parse_args()
+
+    with open(args.old) as old, open(args.new) as new:
+        rows, regressed = compare(json.load(old), json.load(new),
+                                  args.threshold)
+    for name, label, before, after, change, regression in rows:
+        print('{:<12} {:<8} {:>12.4f} {:>12.4f} {:>+8.1%}{}'.format(
+            name, label, before, after, change,
+            '  REGRESSION' if regression else ''))
+    return 1 if regressed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""Generation of synthetic databases with the chinook schema used by the
+tests, scaled to a given total number of rows.
+
+Every table keeps its share of the rows of the real chinook database, except
+the small lookup tables, which keep their real size. Values are random but
+respect column types, lengths, nullability, primary keys and foreign keys.
+"""
+
+# Standard library imports
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import time
+from decimal import Decimal
+
+# Third-party imports
+from sqlalchemy import create_engine, MetaData
+from sqlalchemy.types import DateTime, Integer, Numeric, String
+
+CHINOOK = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.path.pardir, 'tests',
+    'data', 'chinook.sqlite3')
+"""The chinook database whose schema and proportions are reproduced."""
+
+FIXED_TABLES = ('Genre', 'MediaType', 'Employee')
+"""Lookup tables which keep their real number of rows at every scale."""
+
+BATCH_SIZE = 10000
+"""The number of rows inserted per statement."""
+
+WORDS = ('love', 'night', 'rock', 'blue', 'city', 'dream', 'fire', 'heart',
+         'road', 'rain', 'gold', 'star', 'time', 'river', 'song', 'light')
+
+
+def table_sizes(scale, source=CHINOOK):
+    """Return the number of rows of each table for a database of about
+    *scale* rows.
+
+    :param int scale: The total number of rows wanted
+    :param str source: The path of the database whose proportions are kept
+    :rtype: dict
+    """
+    counts = database_sizes(source)
+    fixed = sum(counts[name] for name in FIXED_TABLES if name in counts)
+    scaled = sum(counts.values()) - fixed
+    factor = max(scale - fixed, 0) / float(scaled)
+    return dict(
+        (name, count if name in FIXED_TABLES else max(1, int(count * factor)))
+        for name, count in counts.items())
+
+
+def database_sizes(path):
+    """Return the number of rows of each table of the database at *path*.
+
+    :param str path: The path of the SQLite database
+    :rtype: dict
+    """
+    connection = sqlite3.connect(path)
+    try:
+        names = [name for name, in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND "
+            "name NOT LIKE 'sqlite_%'")]
+        return dict((name, connection.execute(
+            'SELECT count(*) FROM "{}"'.format(name)).fetchone()[0])
+                    for name in names)
+    finally:
+        connection.close()
+
+
+def database_scale(path):
+    """Return the scale the database at *path* was generated with, or None
+    if it wasn't generated by :func:`generate`.
+
+    :param str path: The path of the SQLite database
+    :rtype: int
+    """
+    connection = sqlite3.connect(path)
+    try:
+        scale = connection.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        connection.close()
+    return scale or None
+
+
+def generate(path, scale, source=CHINOOK, seed=0):
+    """Create a database at *path* with *source*'s schema and about *scale*
+    rows of random data, replacing any existing file.
+
+    :param str path: The path of the SQLite database to create
+    :param int scale: The total number of rows wanted
+    :param str source: The path of the database whose schema is copied
+    :param int seed: The seed of the random values
+    :returns: The number of rows of each table
+    :rtype: dict
+    """
+    if os.path.exists(path):
+        os.unlink(path)
+    _copy_schema(source, path)
+    sizes = table_sizes(scale, source)
+    engine = create_engine('sqlite+pysqlite:///{}'.format(path))
+    metadata = MetaData()
+    metadata.reflect(bind=engine)
+    generator = random.Random(seed)
+    with engine.begin() as connection:
+        connection.execute('PRAGMA synchronous = OFF')
+        for table in metadata.sorted_tables:
+            if table.name not in sizes:  # e.g. sqlite_sequence
+                continue
+            sizes[table.name] = _row_count(table, sizes)
+            rows = _rows(table, sizes, generator)
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == BATCH_SIZE:
+                    connection.execute(table.insert(), batch)
+                    batch = []
+            if batch:
+                connection.execute(table.insert(), batch)
+        # recorded so that runs can check which scale an existing file has
+        connection.execute('PRAGMA user_version = {:d}'.format(scale))
+    engine.dispose()
+    return sizes
+
+
+def _copy_schema(source, path):
+    """Create the tables and indexes of the database *source* in *path*."""
+    connection = sqlite3.connect(source)
+    try:
+        statements = [sql for sql, in connection.execute(
+            "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL AND name "
+            "NOT LIKE 'sqlite_%' ORDER BY type DESC")]
+    finally:
+        connection.close()
+    connection = sqlite3.connect(path)
+    try:
+        for statement in statements:
+            connection.execute(statement)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def _row_count(table, sizes):
+    """Return the number of rows of *table*, which for tables keyed by a
+    combination of foreign keys is at most the number of combinations."""
+    key_columns = list(table.primary_key.columns)
+    if len(key_columns) == 1:
+        return sizes[table.name]
+    combinations = 1
+    for column in key_columns:
+        for foreign_key in column.foreign_keys:
+            combinations *= sizes[foreign_key.column.table.name]
+    return min(sizes[table.name], combinations)
+
+
+def _rows(table, sizes, generator):
+    """Yield the random rows of *table*."""
+    key_columns = list(table.primary_key.columns)
+    references = dict(
+        (foreign_key.parent.name, foreign_key.column.table.name)
+        for foreign_key in table.foreign_keys)
+    for index in range(sizes[table.name]):
+        row = {}
+        if len(key_columns) == 1:
+            row[key_columns[0].name] = index + 1
+        else:
+            # enumerate the distinct combinations of referenced keys
+            remainder = index
+            for column in key_columns:
+                count = sizes[references[column.name]]
+                row[column.name] = remainder % count + 1
+                remainder //= count
+        for column in table.columns:
+            if column.name in row:
+                continue
+            if column.nullable and generator.random() < 0.1:
+                row[column.name] = None
+            elif column.name in references:
+                row[column.name] = generator.randint(
+                    1, sizes[references[column.name]])
+            else:
+                row[column.name] = _value(column, index, generator)
+        yield row
+
+
+def _value(column, index, generator):
+    """Return a random value for *column* in the row *index*."""
+    if isinstance(column.type, Integer):
+        return generator.randint(1, 10 ** 6)
+    if isinstance(column.type, Numeric):
+        return Decimal(generator.randint(0, 2000)) / 100
+    if isinstance(column.type, DateTime):
+        return datetime.datetime(2009, 1, 1) + datetime.timedelta(
+            minutes=generator.randint(0, 5 * 365 * 24 * 60))
+    text = '{} {} {}'.format(
+        generator.choice(WORDS).title(), generator.choice(WORDS), index)
+    if isinstance(column.type, String) and column.type.length:
+        text = text[:column.type.length]
+    return text
+
+
+def main():
+    """Generate a database from the command line."""
+    arguments = argparse.ArgumentParser(
+        description='Generate a chinook-shaped SQLite database')
+    arguments.add_argument('path', help='The database file to create.')
+    arguments.add_argument(
+        '-s', '--scale', default=10000, type=int,
+        help='The total number of rows to generate.')
+    args = arguments.parse_args()
+
+    start = time.time()
+    sizes = generate(args.path, args.scale)
+    sys.stderr.write('Generated {} rows in {:.1f}s\n'.format(
+        sum(sizes.values()), time.time() - start))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+"""Run sandman's benchmarks against a generated chinook-shaped database and
+store the results as JSON, for comparison across versions with
+:mod:`benchmarks.compare`.
+
+Requests are made in-process through Flask's test client, so the results
+measure sandman (routing, queries and serialization) rather than a web
+server or the network. Each scenario reports its throughput, latency
+percentiles, error count and how much it raised the process's peak memory
+use; since scenarios share the process, the peak itself is reported once,
+for the whole run. Startup (import and reflection in a new process) and
+reflection alone are timed separately.
+"""
+
+# Standard library imports
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # pylint: disable=invalid-name
+
+# Third-party imports
+import sqlalchemy
+
+# Application imports
+import sandman
+from sandman import reflect_all_app
+from benchmarks.dataset import database_scale, database_sizes, generate
+
+SCENARIOS = (
+    'get_by_id',
+    'collection',
+    'pagination',
+    'post',
+    'put',
+    'patch',
+    'delete',
+    )
+"""The request scenarios benchmarked, in the order they run. The write
+scenarios modify only the tracks created by ``post``."""
+
+TRACK = {
+    'Name': 'Benchmark',
+    'AlbumId': 1,
+    'MediaTypeId': 1,
+    'GenreId': 1,
+    'Composer': 'sandman',
+    'Milliseconds': 180000,
+    'Bytes': 4000000,
+    'UnitPrice': '0.99',
+    }
+"""The track written by the write scenarios."""
+
+
+def percentile(values, fraction):
+    """Return the value below which *fraction* of the sorted *values* lie.
+
+    :param list values: Sorted values
+    :param float fraction: A number between 0 and 1
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def peak_memory():
+    """Return the peak resident memory of the process in kilobytes, or None
+    where it can't be measured."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class Benchmark(object):
+    """Runs the request scenarios against an application.
+
+    :param app: The sandman application to benchmark
+    :param dict sizes: The number of rows of each table
+    :param int requests: The maximum number of requests per scenario
+    :param float duration: The maximum duration of each scenario, in seconds
+
+    """
+
+    def __init__(self, app, sizes, requests, duration):
+        self.client = app.test_client()
+        self.sizes = sizes
+        self.requests = requests
+        self.duration = duration
+        self.created = []
+        self._random = random.Random(0)
+
+    def run(self, scenario):
+        """Run *scenario* and return its measurements.
+
+        :param str scenario: One of :data:`SCENARIOS`
+        :rtype: dict
+        """
+        request = getattr(self, scenario)
+        peak = peak_memory()
+        latencies = []
+        errors = 0
+        start = time.time()
+        for index in range(self.requests):
+            if index and time.time() - start > self.duration:
+                break
+            if scenario in ('put', 'patch', 'delete') and index >= len(
+                    self.created):
+                break
+            before = time.time()
+            status = request(index)
+            latencies.append(time.time() - before)
+            if status >= 400:
+                errors += 1
+        seconds = time.time() - start
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'seconds': seconds,
+            'requests_per_second': len(latencies) / seconds if seconds else
+                                   None,
+            'latency': dict(
+                [('p{}'.format(int(fraction * 100)),
+                  percentile(latencies, fraction))
+                 for fraction in (0.5, 0.9, 0.99)] +
+                [('max', latencies[-1] if latencies else None)]),
+            # the process's peak only grows, so report this scenario's part
+            'peak_memory_growth_kb': None if peak is None else
+                                     peak_memory() - peak,
+            }
+
+    def get_by_id(self, index):  # pylint: disable=unused-argument
+        """GET a random track."""
+        return self.client.get('/track/{}'.format(
+            self._random.randint(1, self.sizes['Track']))).status_code
+
+    def collection(self, index):  # pylint: disable=unused-argument
+        """GET the whole artist collection."""
+        return self.client.get('/artist').status_code
+
+    def pagination(self, index):  # pylint: disable=unused-argument
+        """GET a random page of the track collection."""
+        return self.client.get('/track?page={}'.format(
+            self._random.randint(1, max(1, self.sizes['Track'] // 20)))
+                              ).status_code
+
+    def post(self, index):
+        """POST a new track."""
+        # identical resources aren't created twice, so name each one
+        response = self.client.post(
+            '/track', data=json.dumps(dict(
+                TRACK, Name='Benchmark {}'.format(index))),
+            content_type='application/json')
+        if response.status_code == 201:
+            self.created.append(json.loads(
+                response.get_data(as_text=True))['TrackId'])
+        return response.status_code
+
+    def put(self, index):
+        """PUT one of the tracks created."""
+        return self.client.put(
+            '/track/{}'.format(self.created[index]),
+            data=json.dumps(dict(TRACK, TrackId=self.created[index])),
+            content_type='application/json').status_code
+
+    def patch(self, index):
+        """PATCH one of the tracks created."""
+        return self.client.patch(
+            '/track/{}'.format(self.created[index]),
+            data=json.dumps({'Name': 'Patched'}),
+            content_type='application/json').status_code
+
+    def delete(self, index):
+        """DELETE one of the tracks created."""
+        return self.client.delete(
+            '/track/{}'.format(self.created[index])).status_code
+
+
+def time_startup(uri):
+    """Return the time taken by a new process to import sandman and reflect
+    the database at *uri*, in seconds.
+
+    :param str uri: The database URI
+    :rtype: float
+    """
+    code = ('import time; start = time.time(); '
+            'from sandman import reflect_all_app; reflect_all_app({!r}); '
+            'print(time.time() - start)').format(uri)
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [os.getcwd()] + [os.environ.get('PYTHONPATH', '')]))
+    return float(subprocess.check_output(
+        [sys.executable, '-c', code], env=environment).decode().split()[-1])
+
+
+def time_reflection(uri, repeat):
+    """Return the median time taken by :func:`sandman.reflect_all_app` to
+    reflect the database at *uri*, in seconds.
+
+    :param str uri: The database URI
+    :param int repeat: The number of reflections timed
+    :rtype: float
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.time()
+        reflect_all_app(uri)
+        timings.append(time.time() - start)
+    return percentile(sorted(timings), 0.5)
+
+
+def _revision():
+    """Return the git revision being benchmarked, if known."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.STDOUT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(path, scale, requests, duration, scenarios=SCENARIOS, repeat=3,
+        regenerate=False):
+    """Benchmark sandman against a database of about *scale* rows at *path*,
+    generating it first if needed, and return the results.
+
+    :param str path: The path of the SQLite database
+    :param int scale: The total number of rows of the database
+    :param int requests: The maximum number of requests per scenario
+    :param float duration: The maximum duration of each scenario, in seconds
+    :param tuple scenarios: The scenarios to run
+    :param int repeat: The number of reflections timed
+    :param bool regenerate: Whether to regenerate an existing database
+    :rtype: dict
+    """
+    start = time.time()
+    if regenerate or not os.path.exists(path):
+        sizes = generate(path, scale)
+    elif database_scale(path) != scale:
+        raise ValueError(
+            '{} was not generated with a scale of {}; regenerate it'.format(
+                path, scale))
+    else:
+        sizes = database_sizes(path)
+    generation = time.time() - start
+    uri = 'sqlite+pysqlite:///{}'.format(os.path.abspath(path))
+
+    results = {
+        'version': sandman.__version__,
+        'revision': _revision(),
+        'time': datetime.datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'scale': scale,
+        'rows': sum(sizes.values()),
+        'generation_seconds': generation,
+        'startup_seconds': time_startup(uri),
+        'reflection_seconds': time_reflection(uri, repeat),
+        'scenarios': {},
+        }
+    benchmark = Benchmark(reflect_all_app(uri), sizes, requests, duration)
+    for scenario in scenarios:
+        results['scenarios'][scenario] = benchmark.run(scenario)
+    results['peak_memory_kb'] = peak_memory()
+    return results
+
+
+def main():
+    """Run the benchmarks from the command line."""
+    arguments = argparse.ArgumentParser(
+        description='Benchmark sandman against a synthetic database')
+    arguments.add_argument(
+        '-s', '--scale', default=10000, type=int,
+        help='The total number of rows of the database (10k to 10M).')
+    arguments.add_argument(
+        '-d', '--database', default=None,
+        help='The database file to use (generated if it does not exist).')
+    arguments.add_argument(
+        '-n', '--requests', default=1000, type=int,
+        help='The maximum number of requests per scenario.')
+    arguments.add_argument(
+        '-t', '--duration', default=10.0, type=float,
+        help='The maximum duration of each scenario, in seconds.')
+    arguments.add_argument(
+        '--scenario', action='append', choices=SCENARIOS,
+        help='A scenario to run (may be repeated; all by default).')
+    arguments.add_argument(
+        '--regenerate', action='store_true',
+        help='Regenerate the database even if it exists.')
+    arguments.add_argument(
+        '-o', '--output', default=os.path.join('benchmarks', 'results'),
+        help='The directory results are written to.')
+    args = arguments.parse_args()
+
+    path = args.database or os.path.join(
+        'benchmarks', 'data', 'chinook-{}.sqlite3'.format(args.scale))
+    for directory in (os.path.dirname(path), args.output):
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+    # the write scenarios need the tracks created by post
+    scenarios = [scenario for scenario in SCENARIOS
+                 if not args.scenario or scenario in args.scenario or (
+                     scenario == 'post' and set(args.scenario) & set(
+                         ['put', 'patch', 'delete']))]
+    try:
+        results = run(path, args.scale, args.requests, args.duration,
+                      tuple(scenarios), regenerate=args.regenerate)
+    except ValueError as exception:
+        arguments.error('{} (use --regenerate)'.format(exception))
+    output = os.path.join(args.output, '{}-{}-{}.json'.format(
+        results['version'], args.scale,
+        results['time'].replace(':', '').split('.')[0]))
+    with open(output, 'w') as result_file:
+        json.dump(results, result_file, indent=2, sort_keys=True)
+
+    for scenario in scenarios:
+        measured = results['scenarios'][scenario]
+        print('{:<12} {:>9.1f} req/s  p50 {:>7.2f}ms  p99 {:>7.2f}ms  '
+              '{} errors'.format(
+                  scenario, measured['requests_per_second'] or 0,
+                  (measured['latency']['p50'] or 0) * 1000,
+                  (measured['latency']['p99'] or 0) * 1000,
+                  measured['errors']))
+    print('startup {:.2f}s, reflection {:.2f}s, peak memory {} kB; results '
+          'written to {}'.format(
+              results['startup_seconds'], results['reflection_seconds'],
+              results['peak_memory_kb'], output))
+
+if __name__ == '__main__':
+    main()
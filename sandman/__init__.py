@@ -7,10 +7,9 @@ from flask import jsonify
 from sqlalchemy.ext.automap import automap_base
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.declarative import DeferredReflection
-from flask.ext.admin import Admin
-from flask.ext.admin.contrib.sqla import ModelView
 
 # Application imports
+from sandman.admin import register_admin
 from sandman.model import db, Model
 from sandman.exception import (
     BadRequestException,
@@ -18,11 +17,23 @@ from sandman.exception import (
     NotAcceptableException,
     NotFoundException,
     ConflictException,
+    RangeNotSatisfiableException,
     ServerErrorException,
     NotImplementedException,
     ServiceUnavailableException,
     )
 from sandman.service import Service
+from sandman.compression import register_compression
+from sandman.dispatch import register_service as register_dispatched
+from sandman.group_commit import register_group_commit
+from sandman.instrumentation import register_instrumentation
+from sandman.profiling import register_profiling
+from sandman.query_log import register_query_log
+from sandman.reflection import DEFAULT_WORKERS, reflect_tables
+from sandman.schema import internal_tables, register_schema, service_class
+from sandman.snapshot import register_snapshots
+from sandman.sqlite import register_sqlite
+from sandman.tracing import register_tracing
 
 __version__ = '0.0.1'
 
@@ -48,12 +59,27 @@ def register(classes):
         _SERVICE_CLASSES.append(service_cls)
 
 
-def custom_class_app(database_uri):
+def _init_app(app):
+    """Set up the parts of *app* common to all sandman applications."""
+    # sessions must be bound to their engine before anything uses them
+    register_sqlite(app)
+    register_tracing(app)
+    register_instrumentation(app)
+    register_query_log(app)
+    register_compression(app)
+    register_profiling(app)
+    register_group_commit(app)
+    register_snapshots(app)
+
+
+def custom_class_app(database_uri, admin='lazy'):
     """Return a Flask application object with a service created for all of
     the classes in *classes*.
 
     :param str database_uri: The SQLAlchemy database URI to reflect
     :param list classes: A list of SQLAlchemy model classes to register
+    :param str admin: How admin views are built: ``'eager'`` (at startup),
+                      ``'lazy'`` (on first use) or None (no admin)
 
     """
     from sandman.application import get_app
@@ -63,16 +89,18 @@ def custom_class_app(database_uri):
     with app.app_context():
         Model.prepare(  # pylint:disable=no-member
             db.engine)
-        admin = Admin(app)
         for cls in _SERVICE_CLASSES:
             cls.register_service(app)
-            admin.add_view(ModelView(cls.__model__, db.session))
+        register_admin(
+            app, [cls.__model__ for cls in _SERVICE_CLASSES], admin)
+    _init_app(app)
 
     @app.errorhandler(BadRequestException)
     @app.errorhandler(ForbiddenException)
     @app.errorhandler(NotAcceptableException)
     @app.errorhandler(NotFoundException)
     @app.errorhandler(ConflictException)
+    @app.errorhandler(RangeNotSatisfiableException)
     @app.errorhandler(ServerErrorException)
     @app.errorhandler(NotImplementedException)
     @app.errorhandler(ServiceUnavailableException)
@@ -86,11 +114,27 @@ def custom_class_app(database_uri):
     return app
 
 
-def reflect_all_app(database_uri):
+def reflect_all_app(database_uri, schemas=None, tables=None,
+                    workers=DEFAULT_WORKERS, single_rule=False,
+                    admin='lazy'):
     """Return a Flask application object with all of the tables in
     *database_uri* automatically added as REST endpoints.
 
+    Tables are reflected over *workers* concurrent connections, which
+    speeds up the start of services of databases with many tables.
+
     :param str database_uri: The SQLAlchemy database URI to reflect
+    :param list schemas: The schemas to reflect (the default schema if None)
+    :param list tables: Shell-style patterns (e.g. ``'invoice*'``) selecting
+                        the tables to reflect (all tables if None); the
+                        tables they reference are reflected too
+    :param int workers: The number of tables reflected at the same time
+    :param bool single_rule: Whether to route the requests of every service
+                             through a single URL rule (see
+                             :mod:`sandman.dispatch`), which scales to
+                             thousands of tables
+    :param str admin: How admin views are built: ``'eager'`` (at startup),
+                      ``'lazy'`` (on first use) or None (no admin)
 
     """
 
@@ -99,28 +143,32 @@ def reflect_all_app(database_uri):
     app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
     db.init_app(app)
     with app.app_context():
-        admin = Admin(app)
         app.class_references = {}
-        AutomapModel.prepare(  # pylint:disable=maybe-no-member
-            db.engine, reflect=True)
+        reflected = reflect_tables(
+            db.engine, AutomapModel.metadata, schemas, tables, workers)
+        AutomapModel.prepare()  # pylint:disable=maybe-no-member
+        served = set(reflected)
+        internal = internal_tables(table.name for table in reflected)
         for cls in AutomapModel.classes:  # pylint:disable=maybe-no-member
-            service_cls = type(
-                str(cls.__table__.name) + 'Service',
-                (Service,),
-                {
-                    '__model__': cls,
-                    '__endpoint__': str(cls.__table__.name),
-                    '__url__': '/' + str(cls.__table__.name).lower()
-                })
-            admin.add_view(ModelView(cls, db.session))
+            if cls.__table__ not in served or cls.__table__.name in internal:
+                continue
+            service_cls = service_class(cls)
             app.class_references[cls.__table__.name] = cls
-            service_cls.register_service(app)
+            if single_rule:
+                register_dispatched(app, service_cls)
+            else:
+                service_cls.register_service(app)
+        register_admin(app, list(app.class_references.values()), admin)
+        register_schema(
+            app, reflected, schemas, tables, workers, single_rule)
+    _init_app(app)
 
     @app.errorhandler(BadRequestException)
     @app.errorhandler(ForbiddenException)
     @app.errorhandler(NotAcceptableException)
     @app.errorhandler(NotFoundException)
     @app.errorhandler(ConflictException)
+    @app.errorhandler(RangeNotSatisfiableException)
     @app.errorhandler(ServerErrorException)
     @app.errorhandler(NotImplementedException)
     @app.errorhandler(ServiceUnavailableException)
@@ -0,0 +1,124 @@
+"""The Flask-Admin interface of sandman applications, whose model views can
+be built the first time they are used rather than at startup.
+
+Building a :class:`flask_admin.contrib.sqla.ModelView` and registering its
+URL rules takes a few milliseconds per model, which adds up to most of the
+startup time of services of databases with thousands of tables, although
+few of those views are ever visited. In the ``lazy`` mode, the admin index
+and a menu link per model are registered at startup, along with one rule
+matching every model view URL; a model's view is built and registered the
+first time one of its URLs is requested, and serves that request.
+"""
+
+# Standard library imports
+import threading
+
+# Third-party imports
+from flask import current_app, request
+from flask.ext.admin import Admin
+from flask.ext.admin.contrib.sqla import ModelView
+from flask.ext.admin.helpers import prettify_class_name
+from flask.ext.admin.menu import MenuLink
+from werkzeug.exceptions import NotFound
+
+# Application imports
+from sandman.application import runtime_setup
+from sandman.model import db
+
+ADMIN_MODES = ('eager', 'lazy', None)
+"""How model views are built: all at startup, each on first use, or not at
+all (for processes only serving the API)."""
+
+ENDPOINT = 'sandman_admin'
+"""The endpoint of the rule matching the URLs of unbuilt model views."""
+
+_LOCK = threading.Lock()
+
+
+def view_endpoint(model):
+    """Return the endpoint of *model*'s view, as Flask-Admin names it.
+
+    :param model: A SQLAlchemy model class
+    :rtype: str
+    """
+    return '{}view'.format(model.__name__).lower()
+
+
+def register_admin(app, models, mode='lazy'):
+    """Register the admin interface of *models* with *app*.
+
+    :param app: An instance of a Flask application object
+    :param list models: The model classes administered
+    :param str mode: One of :data:`ADMIN_MODES`
+    :returns: The :class:`flask_admin.Admin`, or None without admin
+    :raises ValueError: if *mode* is unknown
+    """
+    if mode not in ADMIN_MODES:
+        raise ValueError('Unknown admin mode {!r}'.format(mode))
+    if mode is None:
+        return None
+    admin = Admin(app)
+    if mode == 'eager':
+        app.extensions['sandman_admin'] = (admin, None)
+        add_models(app, models)
+        return admin
+    app.extensions['sandman_admin'] = (admin, {})
+    add_models(app, models)
+    app.add_url_rule('{}/<path:path>'.format(admin.url), ENDPOINT,
+                     build_view, methods=['GET', 'POST'])
+    return admin
+
+
+def add_models(app, models):
+    """Add the views of *models* to *app*'s admin interface, if it has one,
+    in the mode it was registered with.
+
+    A model replacing another of the same name (after a schema reload)
+    replaces it in views not built yet; views already built keep the model
+    they were built with.
+
+    :param app: An instance of a Flask application object
+    :param list models: The model classes administered
+    """
+    if 'sandman_admin' not in app.extensions:
+        return
+    admin, unbuilt = app.extensions['sandman_admin']
+    with _LOCK:
+        for model in models:
+            endpoint = view_endpoint(model)
+            # a view's blueprint is named after its endpoint
+            if endpoint in app.blueprints:
+                continue
+            if unbuilt is None:
+                with runtime_setup(app):
+                    admin.add_view(ModelView(model, db.session))
+                continue
+            if endpoint not in unbuilt:
+                admin.add_link(MenuLink(
+                    prettify_class_name(model.__name__),
+                    url='{}/{}/'.format(admin.url, endpoint)))
+            unbuilt[endpoint] = model
+
+
+def build_view(path):
+    """Build and register the view of the model whose URL was requested,
+    then serve the request with it.
+
+    :param str path: The requested URL, under the admin's URL
+    :rtype flask.Response:
+    """
+    # pylint: disable=protected-access
+    app = current_app._get_current_object()
+    admin, unbuilt = app.extensions['sandman_admin']
+    with _LOCK:
+        model = unbuilt.pop(path.split('/', 1)[0], None)
+        if model is not None:
+            view = ModelView(model, db.session)
+            with runtime_setup(app):
+                app.register_blueprint(view.create_blueprint(admin))
+    rule, arguments = app.create_url_adapter(request).match(
+        return_rule=True)
+    if rule.endpoint == ENDPOINT:
+        raise NotFound()
+    request.url_rule, request.view_args = rule, arguments
+    return app.view_functions[rule.endpoint](**arguments)
@@ -0,0 +1,65 @@
+"""Aggregation queries, computed by the database with a single ``GROUP BY``
+rather than by clients downloading whole collections.
+
+Aggregations are requested with the ``group_by`` and ``agg`` query
+parameters of a collection, for example
+``/track?group_by=GenreId&agg=count,sum:UnitPrice``, and each group is
+returned as a resource such as
+``{"GenreId": 1, "count": 1297, "sum_UnitPrice": "1284.03"}``.
+"""
+
+# Third-party imports
+from sqlalchemy import func, select
+
+AGGREGATES = {
+    'count': func.count,
+    'sum': func.sum,
+    'avg': func.avg,
+    'min': func.min,
+    'max': func.max,
+    }
+"""The supported aggregate functions."""
+
+
+def parse_aggregation(table, group_by, aggregates):
+    """Return the validated query shape described by the ``group_by`` and
+    ``agg`` query parameter values.
+
+    :param table: The :class:`sqlalchemy.Table` being aggregated
+    :param str group_by: Comma-separated column names (may be empty)
+    :param str aggregates: Comma-separated ``function[:column]`` items
+    :rtype: tuple
+    :raises ValueError: if a column or function is unknown
+    """
+    columns = tuple(name for name in (group_by or '').split(',') if name)
+    functions = []
+    for item in (aggregates or 'count').split(','):
+        function, _, column = item.partition(':')
+        if function not in AGGREGATES:
+            raise ValueError('Unknown aggregate function {}'.format(function))
+        if not column and function != 'count':
+            raise ValueError('{} requires a column'.format(function))
+        functions.append((function, column or None))
+    for name in columns + tuple(column for _, column in functions if column):
+        if name not in table.columns:
+            raise ValueError('Unknown column {}'.format(name))
+    return columns, tuple(functions)
+
+
+def aggregate_statement(table, shape):
+    """Return the ``GROUP BY`` statement for a shape returned by
+    :func:`parse_aggregation`.
+
+    :param table: The :class:`sqlalchemy.Table` being aggregated
+    :param tuple shape: The grouping columns and aggregate functions
+    """
+    columns, functions = shape
+    selected = [table.columns[name] for name in columns]
+    for function, column in functions:
+        if column is None:
+            selected.append(AGGREGATES[function]().label(function))
+        else:
+            selected.append(AGGREGATES[function](table.columns[column]).label(
+                '{}_{}'.format(function, column)))
+    group_columns = [table.columns[name] for name in columns]
+    return select(selected).group_by(*group_columns).order_by(*group_columns)
@@ -1,5 +1,8 @@
 """This module creates the actual Flask application object."""
 
+# Standard library imports
+import contextlib
+
 # Third-party imports
 from flask import Flask
 
@@ -11,3 +14,36 @@ def get_app():
     global app  # pylint: disable=global-statement
     app = Flask(__name__)
     return app
+
+
+@contextlib.contextmanager
+def runtime_setup(application):
+    """Allow URL rules and blueprints to be added to *application* while it
+    serves requests.
+
+    Flask refuses (in debug mode) to add rules once requests are served, to
+    catch setup mistakes; sandman adds some deliberately, such as the rules
+    of admin views built on first use.
+
+    Werkzeug sorts a map's rules in place the next time it matches a URL
+    after rules were added, and requests matched meanwhile see no rules at
+    all; so the rules are sorted into a new list here, replacing the old
+    one at once, while requests wait for the map instead of re-sorting it.
+
+    :param application: An instance of a Flask application object
+    """
+    # pylint: disable=protected-access
+    url_map = application.url_map
+    got_first_request = application._got_first_request
+    application._got_first_request = False
+    try:
+        with url_map._remap_lock:
+            yield application
+            url_map._rules = sorted(
+                url_map._rules, key=lambda rule: rule.match_compare_key())
+            for endpoint, rules in list(url_map._rules_by_endpoint.items()):
+                url_map._rules_by_endpoint[endpoint] = sorted(
+                    rules, key=lambda rule: rule.build_compare_key())
+            url_map._remap = False
+    finally:
+        application._got_first_request = got_first_request
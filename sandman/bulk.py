@@ -0,0 +1,405 @@
+"""Bulk transfer of whole tables, for snapshotting or migrating data without
+going through the per-resource REST endpoints."""
+
+# Standard library imports
+import base64
+import csv
+import datetime
+import decimal
+import io
+import json
+import logging
+import threading
+import time
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue  # pylint: disable=import-error
+
+# Third-party imports
+from sqlalchemy import and_, func, select, Integer
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    }
+"""The supported bulk formats and their content types."""
+
+MAX_PARTITIONS = 64
+"""The largest number of primary key ranges an export request may split a
+table into; they are read by :class:`Exporter`'s fixed number of
+workers."""
+
+DATETIME_FORMATS = (
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d',
+    '%H:%M:%S.%f',
+    '%H:%M:%S',
+    )
+"""The formats accepted for date and time values given as text."""
+
+_DONE = object()
+
+
+class BulkFormatError(ValueError):
+    """Raised when bulk input can't be parsed or doesn't match the table."""
+
+    def __init__(self, message, line):
+        super(BulkFormatError, self).__init__(
+            'line {}: {}'.format(line, message))
+        self.line = line
+
+
+def coerce_value(column, value):
+    """Return the text *value* converted to the Python type of *column*.
+
+    Values which aren't text, and columns whose type has no known Python
+    type, are returned unchanged.
+
+    :param column: A :class:`sqlalchemy.Column`
+    :param value: The value to convert
+    :raises ValueError: if *value* isn't valid for the column's type
+    """
+    if not isinstance(value, type(u'')):
+        return value
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is bool:
+        return value.lower() in ('1', 'true', 't', 'yes')
+    if python_type in (int, float, decimal.Decimal):
+        return python_type(value)
+    if python_type in (datetime.datetime, datetime.date, datetime.time):
+        for fmt in DATETIME_FORMATS:
+            try:
+                parsed = datetime.datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+            if python_type is datetime.date:
+                return parsed.date()
+            if python_type is datetime.time:
+                return parsed.time()
+            return parsed
+        raise ValueError('{!r} is not a valid {}'.format(
+            value, python_type.__name__))
+    return value
+
+
+def json_default(value):
+    """Return a JSON-serializable form of *value* for :func:`json.dumps`."""
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+def partition_ranges(connection, table, partitions):
+    """Return up to *partitions* half-open ``(start, stop)`` ranges of primary
+    key values covering all of *table*'s rows.
+
+    Tables without a single integer primary key can't be split, and are
+    exported as one ``(None, None)`` partition.
+
+    :param connection: A SQLAlchemy connection
+    :param table: The :class:`sqlalchemy.Table` to split
+    :param int partitions: The maximum number of ranges
+    :rtype: list
+    """
+    key_columns = list(table.primary_key.columns)
+    if (partitions < 2 or len(key_columns) != 1 or
+            not isinstance(key_columns[0].type, Integer)):
+        return [(None, None)]
+    low, high = connection.execute(select([
+        func.min(key_columns[0]), func.max(key_columns[0])])).first()
+    if low is None:
+        return [(None, None)]
+    step = (high - low) // partitions + 1
+    return [(start, min(start + step, high + 1))
+            for start in range(low, high + 1, step)]
+
+
+class Exporter(object):
+    """Iterates over the serialized rows of a table, read concurrently in
+    primary key ranges over a pool of connections.
+
+    Partitions are read by a fixed number of worker threads, each on a
+    connection of its own with a server-side cursor (where the driver
+    supports one), and handed to the consumer in batches through a bounded
+    queue, so memory use doesn't grow with the table size. Rows from
+    different partitions are interleaved in the output.
+
+    :param engine: The SQLAlchemy engine to read from
+    :param table: The :class:`sqlalchemy.Table` to export
+    :param str fmt: One of :data:`FORMATS`
+    :param int partitions: The number of primary key ranges the table is
+                           split into
+    :param int batch_size: The number of rows fetched and serialized at once
+    :param int workers: The number of ranges read concurrently
+
+    """
+
+    def __init__(self, engine, table, fmt='ndjson', partitions=4,
+                 batch_size=1000, workers=4):
+        if fmt not in FORMATS:
+            raise ValueError('Unsupported export format {}'.format(fmt))
+        self.engine = engine
+        self.table = table
+        self.fmt = fmt
+        self.partitions = partitions
+        self.batch_size = batch_size
+        self.workers = workers
+        self.rows = 0
+        """The number of rows exported so far."""
+        self.seconds = 0.0
+        """The time taken by the export so far."""
+        self._queue = queue.Queue(maxsize=workers * 2)
+        self._stop = threading.Event()
+
+    @property
+    def rows_per_second(self):
+        """The export's throughput."""
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __iter__(self):
+        start = time.time()
+        with self.engine.connect() as connection:
+            ranges = partition_ranges(connection, self.table, self.partitions)
+        pending = queue.Queue()
+        for bounds in ranges:
+            pending.put(bounds)
+        workers = [threading.Thread(target=self._read_partitions,
+                                    args=(pending,))
+                   for _ in range(max(1, min(self.workers, len(ranges))))]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        try:
+            if self.fmt == 'csv':
+                yield self._csv([self.table.columns.keys()])
+            running = len(workers)
+            while running:
+                item = self._queue.get()
+                if item is _DONE:
+                    running -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    count, chunk = item
+                    self.rows += count
+                    self.seconds = time.time() - start
+                    yield chunk
+        finally:
+            self._stop.set()
+            self.seconds = time.time() - start
+            logger.info(
+                'Exported %d rows from %s in %.2fs (%.0f rows/sec)',
+                self.rows, self.table.name, self.seconds,
+                self.rows_per_second)
+
+    def _read_partitions(self, pending):
+        """Read the ranges queued in *pending* one after the other, until
+        none is left."""
+        try:
+            while not self._stop.is_set():
+                try:
+                    start, stop = pending.get_nowait()
+                except queue.Empty:
+                    break
+                self._read_partition(start, stop)
+        except Exception as exception:  # pylint: disable=broad-except
+            self._put(exception)
+        self._put(_DONE)
+
+    def _read_partition(self, start, stop):
+        """Read the rows whose primary key is in ``[start, stop)`` and queue
+        them in serialized batches."""
+        statement = select([self.table])
+        if start is not None:
+            column = list(self.table.primary_key.columns)[0]
+            statement = statement.where(
+                and_(column >= start, column < stop))
+        with self.engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True).execute(statement)
+            while not self._stop.is_set():
+                rows = result.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                self._put((len(rows), self._serialize(rows)))
+            result.close()
+
+    def _put(self, item):
+        """Queue *item* for the consumer unless the export was abandoned."""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _serialize(self, rows):
+        """Return *rows* in the exporter's format."""
+        if self.fmt == 'csv':
+            return self._csv(rows)
+        keys = self.table.columns.keys()
+        return ''.join(
+            json.dumps(dict(zip(keys, row)), default=json_default) + '\n'
+            for row in rows)
+
+    @staticmethod
+    def _csv(rows):
+        """Return *rows* as CSV text."""
+        output = io.StringIO()
+        writer = csv.writer(output)
+        for row in rows:
+            writer.writerow([
+                json_default(value) if isinstance(
+                    value, (bytes, datetime.date, datetime.time)) else value
+                for value in row])
+        return output.getvalue()
+
+
+class Importer(object):
+    """Loads rows in a bulk format into a table, in batched transactions.
+
+    Input is parsed incrementally and validated against the table's
+    reflected columns, so only one batch of rows is held in memory at a
+    time. Each batch is written in its own transaction using ``COPY`` on
+    PostgreSQL (with psycopg2) and ``executemany`` elsewhere; batches written
+    before an invalid row is found stay committed.
+
+    :param engine: The SQLAlchemy engine to write to
+    :param table: The :class:`sqlalchemy.Table` to load
+    :param str fmt: One of :data:`FORMATS`
+    :param int batch_size: The number of rows written per transaction
+    :param progress: An optional callable, called with the importer after
+                     each batch is committed
+
+    """
+
+    def __init__(self, engine, table, fmt='ndjson', batch_size=5000,
+                 progress=None):
+        if fmt not in FORMATS:
+            raise ValueError('Unsupported import format {}'.format(fmt))
+        self.engine = engine
+        self.table = table
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.progress = progress
+        self.rows = 0
+        """The number of rows committed so far."""
+        self.batches = 0
+        """The number of batches committed so far."""
+        self.seconds = 0.0
+        """The time taken by the import so far."""
+
+    @property
+    def rows_per_second(self):
+        """The import's throughput."""
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def load(self, lines):
+        """Parse and write all rows in *lines*.
+
+        :param lines: An iterable of text lines
+        :raises BulkFormatError: if a row is invalid
+        """
+        start = time.time()
+        use_copy = self.engine.dialect.driver == 'psycopg2'
+        batch = []
+        with self.engine.connect() as connection:
+            for row in self._records(lines):
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    self._write(connection, batch, use_copy, start)
+                    batch = []
+            if batch:
+                self._write(connection, batch, use_copy, start)
+        self.seconds = time.time() - start
+        logger.info(
+            'Imported %d rows into %s in %.2fs (%.0f rows/sec)',
+            self.rows, self.table.name, self.seconds, self.rows_per_second)
+
+    def _records(self, lines):
+        """Yield each row in *lines* as a dictionary of validated column
+        values."""
+        columns = self.table.columns
+        if self.fmt == 'csv':
+            reader = csv.reader(lines)
+            header = next(reader, None)
+            records = ((reader.line_num, dict(zip(header, values)))
+                       for values in reader)
+        else:
+            header = None
+            records = ((number, line) for number, line in enumerate(lines, 1)
+                       if line.strip())
+        for number, record in records:
+            if header is None:
+                try:
+                    record = json.loads(record)
+                except ValueError as exception:
+                    raise BulkFormatError(str(exception), number)
+                if not isinstance(record, dict):
+                    raise BulkFormatError('expected a JSON object', number)
+            unknown = set(record) - set(columns.keys())
+            if unknown:
+                raise BulkFormatError('unknown columns {}'.format(
+                    ', '.join(sorted(unknown))), number)
+            try:
+                yield {
+                    name: None if value == '' and header is not None else
+                          coerce_value(columns[name], value)
+                    for name, value in record.items()}
+            except ValueError as exception:
+                raise BulkFormatError(str(exception), number)
+
+    def _write(self, connection, batch, use_copy, start):
+        """Write *batch* in a single transaction."""
+        # executemany and COPY need the same columns in every row
+        groups = {}
+        for row in batch:
+            groups.setdefault(frozenset(row), []).append(row)
+        with connection.begin():
+            for rows in groups.values():
+                if use_copy:
+                    self._copy(connection, rows)
+                else:
+                    connection.execute(self.table.insert(), rows)
+        self.rows += len(batch)
+        self.batches += 1
+        self.seconds = time.time() - start
+        logger.debug('Imported %d rows into %s', self.rows, self.table.name)
+        if self.progress:
+            self.progress(self)
+
+    def _copy(self, connection, rows):
+        """Write *rows*, which all have the same columns, with PostgreSQL's
+        ``COPY FROM STDIN``."""
+        names = sorted(rows[0])
+        buffer_ = io.StringIO()
+        writer = csv.writer(buffer_)
+        for row in rows:
+            writer.writerow([
+                '\\N' if row.get(name) is None else row[name]
+                for name in names])
+        buffer_.seek(0)
+        preparer = connection.dialect.identifier_preparer
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                "COPY {} ({}) FROM STDIN "
+                "WITH (FORMAT csv, NULL '\\N')".format(
+                    preparer.format_table(self.table),
+                    ', '.join(preparer.quote(name) for name in names)),
+                buffer_)
+        finally:
+            cursor.close()
@@ -0,0 +1,84 @@
+"""Caching of the SQL statements :class:`sandman.service.Service` executes on
+every request, so hot endpoints skip statement construction and compilation.
+"""
+
+# Third-party imports
+from sqlalchemy.ext import baked
+from sqlalchemy.util import LRUCache
+
+# Application imports
+from sandman.model import db
+
+
+class StatementCache(object):
+    """A cache of Core statements and baked ORM queries, keyed by model and
+    query shape.
+
+    Core statements are executed with the ``compiled_cache`` execution option,
+    so their compiled form is reused as well. Baked queries keep their own
+    compiled form in :attr:`bakery`.
+
+    """
+
+    def __init__(self, size=1000):
+        self.size = size
+        """The maximum number of statements of each kind kept."""
+        self.bakery = baked.bakery(size=size)
+        """The :func:`sqlalchemy.ext.baked.bakery` used for ORM queries."""
+        self.compiled = LRUCache(size)
+        """The compiled forms of cached Core statements."""
+        self._statements = LRUCache(size)
+        self.hits = 0
+        """The number of lookups which found a cached statement."""
+        self.misses = 0
+        """The number of lookups which had to build a statement."""
+
+    def statement(self, key, build):
+        """Return the statement cached under *key*, calling *build* to create
+        it if it isn't cached yet.
+
+        :param tuple key: The model and query shape the statement is for
+        :param build: A callable returning a Core statement or baked query
+        """
+        try:
+            statement = self._statements[key]
+        except KeyError:
+            self.misses += 1
+            statement = self._statements.setdefault(key, build())
+        else:
+            self.hits += 1
+        return statement
+
+    def execute(self, statement, **params):
+        """Execute a cached Core *statement* on the session's connection,
+        reusing its compiled form.
+
+        :param statement: A statement returned by :meth:`statement`
+        :rtype: :class:`sqlalchemy.engine.ResultProxy`
+        """
+        connection = db.session.connection().execution_options(
+            compiled_cache=self.compiled)
+        return connection.execute(statement, **params)
+
+    def stats(self):
+        """Return a dictionary describing the cache's effectiveness.
+
+        :rtype: dict
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': float(self.hits) / lookups if lookups else None,
+            'statements': len(self._statements),
+            'compiled': len(self.compiled),
+            }
+
+    def clear(self):
+        """Discard all cached statements and reset the counters."""
+        self._statements.clear()
+        self.compiled.clear()
+        self.bakery = baked.bakery(size=self.size)
+        self.hits = self.misses = 0
+
+statement_cache = StatementCache()  # pylint: disable=invalid-name
@@ -0,0 +1,183 @@
+"""Incremental change feeds, letting clients mirror a table by fetching only
+the rows changed since their last sync.
+
+A model opts in by naming, in :attr:`sandman.model.Model.__updated_at__`, a
+column holding a last-modified timestamp or a monotonically increasing
+value. Deletes performed through sandman on such models are recorded as
+tombstones in the :data:`tombstones` table, which is created by the first
+such delete; reading a feed never writes to the database, so feeds can be
+served from read-only connections.
+
+Each request returns a bounded number of changes (``limit``), so a first
+sync pages through a large table with the watermarks each response
+returns.
+"""
+
+# Standard library imports
+import datetime
+import weakref
+
+# Third-party imports
+from sqlalchemy import (
+    and_,
+    Column,
+    DateTime,
+    func,
+    Integer,
+    literal,
+    MetaData,
+    or_,
+    select,
+    String,
+    Table,
+    )
+
+# Application imports
+from sandman.bulk import coerce_value, json_default
+
+DEFAULT_LIMIT = 1000
+"""The number of changes returned by a request to a feed which doesn't
+give a ``limit``."""
+
+MAX_LIMIT = 10000
+"""The largest ``limit`` accepted by a feed."""
+
+TOMBSTONE_TABLE = 'sandman_tombstone'
+"""The name of the table in which deletes are recorded."""
+
+tombstones = Table(  # pylint: disable=invalid-name
+    TOMBSTONE_TABLE, MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('table_name', String(255), nullable=False, index=True),
+    Column('resource_id', String(255), nullable=False),
+    Column('deleted_at', DateTime, nullable=False),
+    )
+"""Records the resources deleted from tables with a change feed."""
+
+_CREATED = weakref.WeakSet()
+
+
+def ensure_tombstones(engine):
+    """Create the tombstone table in *engine*'s database if it doesn't exist.
+
+    The table is created on a connection of its own, outside of any
+    transaction in progress.
+
+    :param engine: The SQLAlchemy engine in use
+    """
+    if engine not in _CREATED:
+        tombstones.create(bind=engine, checkfirst=True)
+        _CREATED.add(engine)
+
+
+def record_delete(connection, model, resource_id):
+    """Record that the resource of *model* with primary key *resource_id*
+    was deleted, as part of *connection*'s current transaction. The
+    tombstone table must already exist (see :func:`ensure_tombstones`).
+
+    :param connection: The connection the delete is executed on
+    :param model: A :class:`sandman.model.Model` class with a change feed
+    :param resource_id: The primary key value of the deleted resource
+    """
+    connection.execute(tombstones.insert(), {
+        'table_name': model.__table__.name,
+        'resource_id': str(resource_id),
+        'deleted_at': datetime.datetime.utcnow(),
+        })
+
+
+def _comparable(value, dialect):
+    """Return *value*, an updated-at column or watermark, in a form which
+    compares the same as the time it holds.
+
+    SQLite stores date and time values as text, which sandman's watermarks
+    may be written differently from (with or without microseconds, for
+    instance), so both sides are normalized to the millisecond.
+    """
+    if dialect.name == 'sqlite' and isinstance(value.type, DateTime):
+        return func.strftime('%Y-%m-%d %H:%M:%f', value)
+    return value
+
+
+def changes_since(connection, model, since=None, deleted_since=None,
+                  since_key=None, limit=DEFAULT_LIMIT):
+    """Return up to *limit* rows of *model* changed since the watermark
+    (*since*, *since_key*) and up to *limit* resources deleted after the
+    tombstone watermark *deleted_since*.
+
+    Rows are returned in the order of their updated-at value, then of their
+    primary key. While rows remain past those returned, the result's
+    watermark holds the updated-at value and the primary key of the last
+    row, so the next call resumes right after it. Once the feed is caught
+    up, the watermark is the last updated-at value alone, and the next call
+    returns the rows changed at that very value again: rows changed at the
+    same time as the last ones returned may not have been committed yet, so
+    clients apply changes by primary key rather than expect each row once.
+    Rows whose updated-at value is NULL aren't part of the feed.
+
+    :param connection: The connection to read from
+    :param model: A :class:`sandman.model.Model` class with a change feed
+    :param since: The updated-at watermark the client has seen, as text
+    :param deleted_since: The last tombstone watermark the client has seen
+    :param since_key: The primary key watermark the client has seen, as
+                      text, if the feed wasn't caught up
+    :param limit: The maximum number of rows and of deletes returned
+    :rtype: dict
+    :raises ValueError: if a watermark or the limit isn't valid
+    """
+    limit = int(limit)
+    if not 0 < limit <= MAX_LIMIT:
+        raise ValueError('limit must be between 1 and {}'.format(MAX_LIMIT))
+    column = model.__table__.columns[model.__updated_at__]
+    key = model.__table__.columns[model.primary_key()]
+    updated_at = _comparable(column, connection.dialect)
+    statement = select(model.inline_columns()).where(
+        column.isnot(None)).order_by(updated_at, key).limit(limit + 1)
+    if since is not None:
+        since = coerce_value(column, since)
+        bound = _comparable(
+            literal(since, column.type), connection.dialect)
+        if since_key is None:
+            statement = statement.where(updated_at >= bound)
+        else:
+            statement = statement.where(or_(updated_at > bound, and_(
+                updated_at == bound, key > coerce_value(key, since_key))))
+    elif since_key is not None:
+        raise ValueError('since_key requires since')
+    result = connection.execute(statement)
+    keys = result.keys()
+    rows = [dict(zip(keys, row)) for row in result]
+    more = len(rows) > limit
+    rows = rows[:limit]
+    resources = [model.row_as_dict(row) for row in rows]
+    watermark = rows[-1][column.key] if rows else since
+    watermark_key = rows[-1][key.key] if more else None
+    if isinstance(watermark, (datetime.date, datetime.time)):
+        watermark = json_default(watermark)
+    if isinstance(watermark_key, (datetime.date, datetime.time)):
+        watermark_key = json_default(watermark_key)
+
+    deleted_since = int(deleted_since or 0)
+    deleted = []
+    # no tombstone table means nothing was ever deleted through sandman
+    if connection.dialect.has_table(connection, TOMBSTONE_TABLE):
+        for row in connection.execute(select([tombstones]).where(
+                (tombstones.c.table_name == model.__table__.name) &
+                (tombstones.c.id > deleted_since)).order_by(
+                    tombstones.c.id).limit(limit + 1)):
+            if len(deleted) == limit:
+                more = True
+                break
+            deleted.append({
+                'resource_id': row.resource_id,
+                'deleted_at': json_default(row.deleted_at),
+                })
+            deleted_since = row.id
+    return {
+        model.__top_level_json_name__: resources,
+        'deleted': deleted,
+        'watermark': watermark,
+        'watermark_key': watermark_key,
+        'deleted_watermark': deleted_since,
+        'more': more,
+        }
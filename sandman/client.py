@@ -0,0 +1,175 @@
+"""An in-process client of a sandman application's services, for callers
+running in the same Python process (batch jobs, scripts, tests) which would
+otherwise go through HTTP.
+
+The client calls the same :class:`sandman.service.Service` methods as HTTP
+requests do, so resources are filtered, paginated, aggregated and validated
+the same way, and the application's ``before_request`` and
+``teardown_request`` functions run around each call (binding sessions,
+tracing, checking the schema...). What is skipped is everything between the
+caller and those methods: sockets, HTTP parsing, the WSGI stack and JSON
+encoding and decoding. Resources are returned as the dictionaries the API
+would serialize, or as row tuples::
+
+    from sandman.client import Client
+
+    client = Client(app)
+    client.get('artist', 1)
+    client.list('track', page=2)
+    client.list('invoice', group_by='BillingCountry', agg='sum:Total')
+    client.rows('track')
+    client.create('artist', {'Name': 'Nick Cave'})
+    client.update('artist', 276, {'Name': 'Nick Cave & the Bad Seeds'})
+    client.delete('artist', 276)
+
+Errors are raised as the exceptions the API would turn into error responses:
+the :mod:`sandman.exception` classes, and :class:`werkzeug.exceptions.NotFound`
+or :class:`werkzeug.exceptions.MethodNotAllowed` for resources or methods the
+application doesn't serve.
+"""
+
+# Standard library imports
+import contextlib
+
+# Third-party imports
+from flask import request
+
+# Application imports
+from sandman.dispatch import services
+from sandman.exception import ForbiddenException, NotFoundException
+from sandman.snapshot import reading
+
+
+class Client(object):
+    """Calls the services of *app* without HTTP.
+
+    Services are named by their endpoint (the table's name, e.g.
+    ``'Artist'``) or the first segment of their URL (e.g. ``'artist'``).
+
+    :param app: An instance of a Flask application object
+
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._services = {}
+
+    def service(self, name):
+        """Return the service class named *name*.
+
+        :param str name: The endpoint or URL segment of the service
+        :rtype: type
+        :raises: :class:`sandman.exception.NotFoundException` if no service
+                 has this name
+        """
+        if name not in self._services:
+            # services may have been added since (by a schema reload)
+            for cls in services(self.app):
+                self._services[cls.__endpoint__] = cls
+                self._services[cls.__url__.lstrip('/')] = cls
+        try:
+            return self._services[name]
+        except KeyError:
+            raise NotFoundException('No service named {}'.format(name))
+
+    @contextlib.contextmanager
+    def _call(self, name, method, resource_id=None, params=None):
+        """Yield an instance of the service *name* within the context of a
+        request to it, after the application's ``before_request``
+        functions ran (reading from the model's snapshot, if it has one)."""
+        cls = self.service(name)
+        path = cls.__url__
+        if resource_id is not None:
+            path = '{}/{}'.format(path, resource_id)
+        with self.app.test_request_context(
+                path, method=method, query_string=params or {}):
+            if request.routing_exception is not None:
+                raise request.routing_exception
+            response = self.app.preprocess_request()
+            if response is not None:
+                raise ForbiddenException(
+                    'The request was answered before reaching its service',
+                    {'status': response.status_code})
+            if method != 'GET':
+                yield cls()
+                return
+            with reading(cls.__model__):
+                yield cls()
+
+    def get(self, name, resource_id):
+        """Return the resource of *name* with primary key *resource_id*.
+
+        :param str name: The name of the service
+        :param resource_id: The primary key value of the resource
+        :rtype: dict
+        """
+        with self._call(name, 'GET', resource_id) as service:
+            return service.resource_dict(resource_id)
+
+    def list(self, name, **params):
+        """Return the resources of *name* selected by *params*, the query
+        parameters of a collection (``page``, ``q``, ``sample``,
+        ``group_by`` and ``agg``).
+
+        :param str name: The name of the service
+        :rtype: list
+        """
+        with self._call(name, 'GET', params=params) as service:
+            return service.collection()
+
+    def rows(self, name, page=None):
+        """Return all (or the *page* of) resources of *name* as tuples of the
+        values of the model's inline columns, in order.
+
+        :param str name: The name of the service
+        :param int page: The page to return (all resources if None)
+        :rtype: list
+        """
+        params = {} if page is None else {'page': page}
+        with self._call(name, 'GET', params=params) as service:
+            return service.collection_rows()
+
+    def create(self, name, values):
+        """Create a resource of *name* with the column *values*, unless an
+        identical one exists.
+
+        :param str name: The name of the service
+        :param dict values: The resource's column values
+        :returns: The resource created, or None if it already existed
+        :rtype: dict
+        """
+        with self._call(name, 'POST') as service:
+            return service.create(values)
+
+    def update(self, name, resource_id, values):
+        """Update the resource of *name* with primary key *resource_id* with
+        the column *values* (as a ``PATCH`` does) and return it.
+
+        :param str name: The name of the service
+        :param resource_id: The primary key value of the resource
+        :param dict values: The column values to change
+        :rtype: dict
+        """
+        with self._call(name, 'PATCH', resource_id) as service:
+            return service.update(resource_id, values)
+
+    def replace(self, name, resource_id, values):
+        """Replace the resource of *name* with primary key *resource_id* by
+        one with the column *values* (as a ``PUT`` does) and return it.
+
+        :param str name: The name of the service
+        :param resource_id: The primary key value of the resource
+        :param dict values: The resource's column values
+        :rtype: dict
+        """
+        with self._call(name, 'PUT', resource_id) as service:
+            return service.replace(resource_id, values)
+
+    def delete(self, name, resource_id):
+        """Delete the resource of *name* with primary key *resource_id*.
+
+        :param str name: The name of the service
+        :param resource_id: The primary key value of the resource
+        """
+        with self._call(name, 'DELETE', resource_id) as service:
+            service.remove(resource_id)
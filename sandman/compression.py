@@ -0,0 +1,92 @@
+"""``Accept-Encoding``-negotiated gzip compression of responses, including
+streamed ones.
+
+Compression is configured with the following application settings:
+
+    SANDMAN_COMPRESS_LEVEL: The zlib compression level, or 0 to disable
+        compression (default: 6)
+    SANDMAN_COMPRESS_MIN_SIZE: The size in bytes below which non-streamed
+        responses are sent uncompressed (default: 500)
+    SANDMAN_COMPRESS_MIMETYPES: The mimetypes which are compressed
+"""
+
+# Standard library imports
+import gzip
+import io
+import zlib
+
+# Third-party imports
+from flask import current_app, request
+
+DEFAULT_MIMETYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/event-stream',
+    'text/html',
+    'text/plain',
+    )
+"""The mimetypes compressed unless ``SANDMAN_COMPRESS_MIMETYPES`` is set."""
+
+
+def compress_response(response):
+    """Return *response* gzip-compressed if the client accepts it and it is
+    worth compressing.
+
+    Streamed responses are compressed as they are sent, flushing the
+    compressor after every chunk so clients receive each chunk immediately.
+
+    :param response: The :class:`flask.Response` to compress
+    :rtype flask.Response:
+    """
+    config = current_app.config
+    level = config['SANDMAN_COMPRESS_LEVEL']
+    if (not level or response.status_code < 200 or
+            response.status_code in (204, 206, 304) or
+            'Content-Encoding' in response.headers or
+            response.mimetype not in config['SANDMAN_COMPRESS_MIMETYPES']):
+        return response
+    response.vary.add('Accept-Encoding')
+    if not request.accept_encodings['gzip']:
+        return response
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, level)
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['SANDMAN_COMPRESS_MIN_SIZE']:
+            return response
+        buffer_ = io.BytesIO()
+        with gzip.GzipFile(
+                mode='wb', compresslevel=level, fileobj=buffer_) as output:
+            output.write(data)
+        response.set_data(buffer_.getvalue())
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def _compress_stream(chunks, level):
+    """Yield the gzip-compressed form of the iterable of *chunks*."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for chunk in chunks:
+            if not isinstance(chunk, bytes):
+                chunk = chunk.encode('utf-8')
+            yield compressor.compress(chunk) + compressor.flush(
+                zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def register_compression(app):
+    """Compress the responses of *app*.
+
+    :param app: An instance of a Flask application object
+    """
+    app.config.setdefault('SANDMAN_COMPRESS_LEVEL', 6)
+    app.config.setdefault('SANDMAN_COMPRESS_MIN_SIZE', 500)
+    app.config.setdefault('SANDMAN_COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)
+    app.after_request(compress_response)
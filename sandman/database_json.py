@@ -0,0 +1,120 @@
+"""Statements which have the database itself build the JSON representation of
+the resources of a collection, for dialects with JSON functions (SQLite's
+JSON1 extension and PostgreSQL).
+
+The generated JSON matches :meth:`sandman.model.Model.as_dict`, including the
+``_links`` entries, except that values are rendered by the database (dates
+are left in the database's own text format, for example).
+"""
+
+# Third-party imports
+from sqlalchemy import (
+    case,
+    cast,
+    func,
+    literal,
+    literal_column,
+    null,
+    select,
+    String,
+    Numeric,
+    Text,
+    )
+from sqlalchemy.dialects.postgresql import array
+
+SUPPORTED_DIALECTS = ('sqlite', 'postgresql')
+"""The dialects for which database-side JSON generation is available."""
+
+JSON_BATCH_SIZE = 500
+"""The number of resources whose JSON is fetched from the database at a
+time while streaming a collection."""
+
+MAX_SQLITE_COLUMNS = 60
+"""SQLite limits functions to 127 arguments, so ``json_object()`` can't build
+rows with more columns than this."""
+
+
+def supports_database_json(model, dialect):
+    """Return True if the database can generate the JSON for *model*.
+
+    :param model: A :class:`sandman.model.Model` class
+    :param dialect: The SQLAlchemy dialect in use
+    :rtype: bool
+    """
+    if dialect.name == 'sqlite':
+        return len(model.__table__.columns) <= MAX_SQLITE_COLUMNS
+    return dialect.name in SUPPORTED_DIALECTS
+
+
+def resource_json_statement(model, dialect, source):
+    """Return a statement selecting the JSON object of each resource selected
+    by *source*, as text, one row per resource.
+
+    :param model: A :class:`sandman.model.Model` class
+    :param dialect: The SQLAlchemy dialect in use
+    :param source: A ``select()`` of the rows of *model*'s table
+    """
+    rows = source.alias('resources')
+    large_objects = model.large_object_columns()
+    columns = []
+    for name in model.__table__.columns.keys():
+        if name in large_objects:
+            # large objects are left out of *source* and linked to instead
+            columns.append((name, literal(model.service_url() + '/') + cast(
+                rows.columns[model.primary_key()], String) + literal(
+                    '/' + name)))
+        else:
+            columns.append((name, _column_value(rows.columns[name], dialect)))
+    if dialect.name == 'sqlite':
+        members = []
+        for name, value in columns:
+            members.extend((literal(name), value))
+        # json_array() keeps NULLs, so drop them by re-aggregating the
+        # array's non-NULL elements
+        value = literal_column('value')
+        links = select([func.json_group_array(func.json(value))]).select_from(
+            func.json_each(func.json_array(
+                *_links(model, rows, func.json_object)))).where(
+                    value.isnot(None))
+        members.extend((literal('_links'), func.json(links.as_scalar())))
+        return select([func.json_object(*members)])
+    links = func.array_to_json(func.array_remove(
+        array(_links(model, rows, func.jsonb_build_object)), null()))
+    resources = select(
+        [value.label(name) for name, value in columns] +
+        [links.label('_links')]).alias('resource')
+    # cast to text, so the driver doesn't decode the JSON
+    return select([cast(func.row_to_json(literal_column(resources.name)),
+                        Text)]).select_from(resources)
+
+
+def _column_value(column, dialect):
+    """Return the expression rendering *column* as
+    :meth:`sandman.model.Model.as_dict` does (which renders Decimal values as
+    strings)."""
+    if not isinstance(column.type, Numeric) or column.type.asdecimal is False:
+        return column
+    if dialect.name == 'sqlite' and column.type.scale is not None:
+        return case([(column.is_(None), null())], else_=func.printf(
+            '%.{}f'.format(column.type.scale), column))
+    return cast(column, String)
+
+
+def _links(model, rows, build_object):
+    """Return expressions for the ``_links`` entries of each row, where
+    related links are NULL if the referring column is."""
+    links = []
+    for foreign_key in model.__table__.foreign_keys:
+        name = foreign_key.column.name
+        if name not in rows.columns:
+            continue
+        column = rows.columns[name]
+        links.append(case([(column.isnot(None), build_object(
+            literal('rel'), literal('related'),
+            literal('uri'), literal('/{}/'.format(
+                foreign_key.column.table.name)) + cast(column, String)))]))
+    links.append(build_object(
+        literal('rel'), literal('self'),
+        literal('uri'), literal(model.uri_for('')) + cast(
+            rows.columns[model.primary_key()], String)))
+    return links
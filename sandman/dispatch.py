@@ -0,0 +1,158 @@
+"""A dispatcher routing the requests of every service through a single URL
+rule, for databases with thousands of tables.
+
+:meth:`sandman.service.Service.register_service` adds up to nine URL rules
+per service, which Werkzeug matches one after the other. Services registered
+with :func:`register_service` here instead share the rule ``/<path:path>``:
+the first segment of the path is looked up in a dictionary of services, and
+the rest selects the service's handler. Primary key values are converted to
+the Python type of the model's primary key column rather than to ``int``.
+
+The names of the actions (the keys of :data:`ACTIONS`) are reserved: as
+with the URL rules of :meth:`sandman.service.Service.register_service`,
+where the action's rule wins over the resource's, ``/<resource>/meta`` is
+the model's description even if a resource has the primary key ``meta``.
+Such resources are still served in collections, but can't be addressed by
+their URL.
+"""
+
+# Standard library imports
+from decimal import Decimal
+
+# Third-party imports
+from flask import current_app, request
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+
+ENDPOINT = 'sandman_dispatch'
+"""The endpoint of the rule shared by dispatched services."""
+
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+"""The methods accepted by the rule shared by dispatched services."""
+
+ACTIONS = {
+    'meta': ('GET', 'get'),
+    'export': ('GET', 'export'),
+    'changes': ('GET', 'changes'),
+    'events': ('GET', 'events'),
+    'import': ('POST', 'import_resources'),
+    }
+"""The method and handler of each ``/<resource>/<action>`` URL, whose
+names can't be used to address resources by primary key."""
+
+
+def primary_key_converter(model):
+    """Return a function converting a primary key value from a URL to the
+    Python type of *model*'s primary key column (left a string if the type
+    is unknown).
+
+    :param model: A :class:`sandman.model.Model` class
+    :rtype: function
+    """
+    column = model.__table__.columns[model.primary_key()]
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        python_type = str
+    if python_type in (int, float, Decimal):
+        return python_type
+    return lambda value: value
+
+
+def register_service(app, cls):
+    """Register the service *cls* with *app*, through the rule shared by
+    dispatched services.
+
+    :param app: An instance of a Flask application object
+    :param cls: The :class:`sandman.service.Service` class to register
+    """
+    if ENDPOINT not in app.view_functions:
+        app.extensions['sandman_dispatch'] = {}
+        app.add_url_rule('/<path:path>', ENDPOINT, dispatch,
+                         methods=METHODS)
+        app.url_value_preprocessor(route)
+    cls.__model__.__url__ = cls.__url__
+    app.extensions['sandman_dispatch'][cls.__url__.lstrip('/')] = (
+        cls, primary_key_converter(cls.__model__))
+
+
+def route(endpoint, values):
+    """Replace the path of a dispatched request with the service and handler
+    serving it, and the handler's arguments.
+
+    Routing happens before the request's ``before_request`` functions are
+    called, so they can find its service with :func:`request_service`.
+
+    :raises: :class:`werkzeug.exceptions.NotFound` if no service serves the
+             path, as if no rule matched it
+    """
+    # Flask answers OPTIONS requests itself, without calling views
+    if endpoint != ENDPOINT or request.method == 'OPTIONS':
+        return
+    segments = values.pop('path').split('/')
+    try:
+        cls, convert = current_app.extensions['sandman_dispatch'][
+            segments[0]]
+    except KeyError:
+        raise NotFound()
+    methods = set(cls.__model__.__methods__)
+    arguments = {}
+    if len(segments) == 1:
+        allowed = methods & set(['GET', 'POST'])
+        handler = request.method.lower()
+    elif len(segments) == 2 and segments[1] in ACTIONS:
+        method, handler = ACTIONS[segments[1]]
+        allowed = methods & set([method])
+    elif len(segments) in (2, 3) and all(segments[1:]):
+        try:
+            arguments['resource_id'] = convert(segments[1])
+        except ValueError:
+            raise NotFound()
+        if len(segments) == 3:
+            arguments['column'] = segments[2]
+            allowed = methods & set(['GET'])
+            handler = 'large_object'
+        else:
+            allowed = methods - set(['POST'])
+            handler = request.method.lower()
+    else:
+        raise NotFound()
+    if 'GET' in allowed:
+        allowed.add('HEAD')
+    if request.method not in allowed:
+        raise MethodNotAllowed(sorted(allowed))
+    if request.method == 'HEAD' and handler == 'head':
+        handler = 'get'
+    values.update(service=cls, handler=handler, arguments=arguments)
+
+
+def dispatch(service, handler, arguments):
+    """Serve a dispatched request with the *handler* method of *service*.
+
+    :rtype flask.Response:
+    """
+    return getattr(service(), handler)(**arguments)
+
+
+def request_service():
+    """Return the service class serving the current request, whether it was
+    registered with its own URL rules or dispatched, or None.
+    """
+    if request.endpoint == ENDPOINT:
+        return (request.view_args or {}).get('service')
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, 'view_class', None)
+
+
+def services(app):
+    """Return the service classes registered with *app*.
+
+    :param app: An instance of a Flask application object
+    :rtype: set
+    """
+    registered = set(
+        cls for cls, _ in app.extensions.get('sandman_dispatch', {}).values())
+    for view in app.view_functions.values():
+        cls = getattr(view, 'view_class', None)
+        if getattr(cls, '__model__', None) is not None:
+            registered.add(cls)
+    return registered
@@ -0,0 +1,181 @@
+"""Server-Sent Events streams of the changes made to resources.
+
+Every change made through a :class:`sandman.service.Service` is published
+once to the process-wide :data:`broker`, which fans it out to every client
+subscribed to the model's ``/<resource>/events`` endpoint, so clients don't
+need to poll the database. Changes made by other processes can be published
+through PostgreSQL's ``LISTEN``/``NOTIFY`` with :func:`listen`.
+"""
+
+# Standard library imports
+import itertools
+import json
+import logging
+import select
+import threading
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue  # pylint: disable=import-error
+
+# Application imports
+from sandman.bulk import json_default
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class EventBroker(object):
+    """Fans events out to the subscribers of each topic (table name).
+
+    Each subscriber has a bounded queue; events for a subscriber which has
+    fallen too far behind are dropped rather than blocking publishers.
+
+    :param int queue_size: The number of events buffered per subscriber
+
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def has_subscribers(self, topic):
+        """Return True if anyone is subscribed to *topic*.
+
+        :param str topic: The topic to check
+        :rtype: bool
+        """
+        return bool(self._subscribers.get(topic))
+
+    def subscribe(self, topic):
+        """Return a new queue receiving the events published to *topic*.
+
+        :param str topic: The topic to subscribe to
+        """
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, topic, subscriber):
+        """Stop delivering the events published to *topic* to *subscriber*.
+
+        :param str topic: The topic subscribed to
+        :param subscriber: A queue returned by :meth:`subscribe`
+        """
+        with self._lock:
+            self._subscribers.get(topic, set()).discard(subscriber)
+
+    def publish(self, topic, event_type, data):
+        """Deliver an event to every subscriber of *topic*.
+
+        :param str topic: The topic to publish to
+        :param str event_type: The type of the event, e.g. ``created``
+        :param data: The JSON-serializable payload of the event
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        if not subscribers:
+            return
+        event = 'id: {}\nevent: {}\ndata: {}\n\n'.format(
+            next(self._ids), event_type,
+            json.dumps(data, default=json_default))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                logger.warning('Dropped %s event for a slow subscriber to %s',
+                               event_type, topic)
+
+    def stream(self, topic, keepalive=15.0):
+        """Subscribe to *topic* and return an iterator over the events
+        published to it, formatted as Server-Sent Events.
+
+        :param str topic: The topic to subscribe to
+        :param float keepalive: The maximum time between two messages
+        :rtype: :class:`EventStream`
+        """
+        return EventStream(self, topic, keepalive)
+
+
+class EventStream(object):
+    """An iterator over the events of a topic, formatted as Server-Sent
+    Events, which unsubscribes when closed.
+
+    A comment is sent as soon as the stream starts, so clients (and any
+    proxies in between) receive the response headers immediately, and every
+    *keepalive* seconds without events, so disconnected clients are noticed.
+
+    :param event_broker: The :class:`EventBroker` to subscribe to
+    :param str topic: The topic to subscribe to
+    :param float keepalive: The maximum time between two messages
+
+    """
+
+    def __init__(self, event_broker, topic, keepalive):
+        self.broker = event_broker
+        self.topic = topic
+        self.keepalive = keepalive
+        self._subscriber = event_broker.subscribe(topic)
+        self._started = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._started:
+            self._started = True
+            return ': connected\n\n'
+        try:
+            return self._subscriber.get(timeout=self.keepalive)
+        except queue.Empty:
+            return ': keepalive\n\n'
+    next = __next__
+
+    def close(self):
+        """Unsubscribe from the topic."""
+        self.broker.unsubscribe(self.topic, self._subscriber)
+
+broker = EventBroker()  # pylint: disable=invalid-name
+
+
+def listen(engine, channel='sandman_events', event_broker=broker):
+    """Publish the notifications sent on the PostgreSQL *channel* to the
+    event broker, from a background thread.
+
+    Notification payloads must be JSON objects with ``table``, ``type``
+    and ``data`` keys, e.g. as sent by a trigger calling ``pg_notify()``.
+
+    :param engine: A SQLAlchemy engine using psycopg2
+    :param str channel: The channel to ``LISTEN`` on
+    :param event_broker: The :class:`EventBroker` to publish to
+    :rtype: :class:`threading.Thread`
+    """
+    connection = engine.raw_connection()
+    connection.set_isolation_level(0)  # autocommit, required by LISTEN
+    cursor = connection.cursor()
+    cursor.execute('LISTEN {}'.format(
+        engine.dialect.identifier_preparer.quote(channel)))
+
+    def run():
+        """Wait for notifications and publish them."""
+        dbapi_connection = connection.connection
+        while True:
+            if not select.select([dbapi_connection], [], [], 60)[0]:
+                continue
+            dbapi_connection.poll()
+            while dbapi_connection.notifies:
+                notification = dbapi_connection.notifies.pop(0)
+                try:
+                    event = json.loads(notification.payload)
+                    event_broker.publish(
+                        event['table'], event['type'], event['data'])
+                except (ValueError, KeyError, TypeError):
+                    logger.warning('Ignored malformed notification %r',
+                                   notification.payload)
+
+    thread = threading.Thread(target=run, name='sandman-listen')
+    thread.daemon = True
+    thread.start()
+    return thread
@@ -57,6 +57,13 @@ class ConflictException(EndpointException):
     code = 409
 
 
+class RangeNotSatisfiableException(EndpointException):
+    """Raised when the *Range* requested by a client lies outside of the
+    resource being requested."""
+
+    code = 416
+
+
 class ServerErrorException(EndpointException):
     """Raised when the application itself encounters an error not related to
     the request itself (for example, a database error)."""
@@ -0,0 +1,230 @@
+"""Group commit of the resources created by ``POST`` requests, for models
+receiving many small inserts per second.
+
+Committing a transaction waits for the database to make it durable (an
+``fsync`` of its log), which caps the number of ``POST`` requests a model can
+serve per second whatever their size. For models whose
+:attr:`sandman.model.Model.__group_commit__` is set, the resources posted
+are queued instead, and a thread per model inserts them in groups, each in
+a single transaction: a group is committed once it holds
+``SANDMAN_GROUP_COMMIT_SIZE`` resources, or ``SANDMAN_GROUP_COMMIT_DELAY``
+seconds after its first resource was queued. Each request is answered only
+once its group is committed, so a ``201 Created`` response still means the
+resource is durable; requests rather wait up to the delay for other
+requests to share their commit.
+
+A resource which fails to insert (violating a constraint, for instance)
+would abort its whole group, so a failed group is retried one resource per
+transaction, and only the resources failing again fail their request.
+
+Group commit is configured with the following application settings:
+
+    SANDMAN_GROUP_COMMIT_SIZE: The maximum number of resources committed
+        together (default: 100)
+    SANDMAN_GROUP_COMMIT_DELAY: The maximum time a resource waits for others
+        to join its group, in seconds (default: 0.005)
+"""
+
+# Standard library imports
+import threading
+import time
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue  # pylint: disable=import-error
+
+# Third-party imports
+from sqlalchemy import and_, bindparam, select
+from sqlalchemy.exc import CompileError, DataError, IntegrityError
+
+# Application imports
+from sandman.cache import statement_cache
+from sandman.exception import BadRequestException
+from sandman.model import db
+from sandman.sqlite import engines
+
+_LOCK = threading.Lock()
+
+
+class _Pending(object):
+    """A resource waiting for its group to commit."""
+
+    __slots__ = ('values', 'done', 'resource', 'error')
+
+    def __init__(self, values):
+        self.values = values
+        self.done = threading.Event()
+        self.resource = None
+        self.error = None
+
+
+class GroupCommitter(object):
+    """Inserts the resources of a model submitted by concurrent requests in
+    groups, one transaction per group.
+
+    :param engine: The :class:`sqlalchemy.engine.Engine` inserting resources
+    :param model: The :class:`sandman.model.Model` class of the resources
+    :param int size: The maximum number of resources committed together
+    :param float delay: The maximum time a resource waits for others to join
+                        its group, in seconds
+
+    """
+
+    def __init__(self, engine, model, size=100, delay=0.005):
+        self.engine = engine
+        self.model = model
+        self.size = size
+        self.delay = delay
+        self.groups = 0
+        """The number of groups committed."""
+        self.resources = 0
+        """The number of resources created."""
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run,
+            name='sandman-group-commit-{}'.format(model.__table__.name))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, values):
+        """Queue the resource with the column *values* for insertion, and
+        return it once its group is committed.
+
+        :param dict values: The resource's column values
+        :returns: The resource created, as a dictionary, or None if an
+                  identical resource already existed
+        :rtype: dict
+        :raises: :class:`sandman.exception.BadRequestException` if the
+                 database rejects the resource
+        """
+        pending = _Pending(values)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.resource
+
+    def _run(self):
+        """Collect and commit groups of resources, forever."""
+        while True:
+            group = [self._queue.get()]
+            deadline = time.time() + self.delay
+            while len(group) < self.size:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    group.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._commit(group)
+
+    def _commit(self, group):
+        """Insert and commit *group*, retrying its resources one by one if it
+        fails, then wake up their requests."""
+        try:
+            try:
+                self._insert(group)
+                self.groups += 1
+            except Exception:  # pylint: disable=broad-except
+                for pending in group:
+                    pending.resource = None
+                    try:
+                        self._insert([pending])
+                        self.groups += 1
+                    except (CompileError, DataError,
+                            IntegrityError) as exception:
+                        pending.error = BadRequestException(str(exception))
+                    except Exception as exception:  # pylint: disable=W0703
+                        pending.error = exception
+        finally:
+            for pending in group:
+                pending.done.set()
+
+    def _insert(self, group):
+        """Insert the resources of *group* in a single transaction and read
+        them back."""
+        model = self.model
+        table = model.__table__
+        key = table.columns[model.primary_key()]
+        insert = statement_cache.statement(
+            (model, 'group_insert'), table.insert)
+        created = []
+        with self.engine.begin() as connection:
+            connection = connection.execution_options(
+                compiled_cache=statement_cache.compiled)
+            for pending in group:
+                if self._exists(connection, pending.values):
+                    continue
+                result = connection.execute(insert, pending.values)
+                created.append((pending, result.inserted_primary_key[0]))
+            rows = {}
+            if created:
+                read = statement_cache.statement(
+                    (model, 'group_read'),
+                    lambda: select(model.inline_columns()).where(
+                        key.in_(bindparam('keys', expanding=True))))
+                for row in connection.execute(
+                        read, keys=[value for _, value in created]):
+                    row = dict(row.items())
+                    rows[row[key.name]] = row
+            for pending, value in created:
+                pending.resource = model.row_as_dict(rows[value])
+        self.resources += len(created)
+
+    def _exists(self, connection, values):
+        """Return whether a resource with the column *values* exists (POSTing
+        an existing resource doesn't create it again)."""
+        table = self.model.__table__
+        shape = tuple(sorted(
+            (column, value is None) for column, value in values.items()))
+
+        def build():
+            """Select the resources whose columns equal the values."""
+            key = table.columns[self.model.primary_key()]
+            return select([key]).where(and_(*[
+                table.columns[column].is_(None) if is_null else
+                table.columns[column] == bindparam(column)
+                for column, is_null in shape])).limit(1)
+        try:
+            statement = statement_cache.statement(
+                (self.model, ('group_exists', shape)), build)
+        except KeyError:
+            raise CompileError('Unknown columns in {}'.format(
+                sorted(values)))
+        return connection.execute(statement, **dict(
+            (column, value) for column, value in values.items()
+            if value is not None)).first() is not None
+
+
+def committer(app, model):
+    """Return the group committer of *model* in *app*, starting it on first
+    use.
+
+    :param app: An instance of a Flask application object
+    :param model: A :class:`sandman.model.Model` class
+    :rtype: :class:`GroupCommitter`
+    """
+    committers = app.extensions['sandman_group_commit']
+    try:
+        return committers[model]
+    except KeyError:
+        pass
+    with _LOCK:
+        if model not in committers:
+            pair = engines(app)
+            committers[model] = GroupCommitter(
+                pair[0] if pair else db.get_engine(app), model,
+                app.config['SANDMAN_GROUP_COMMIT_SIZE'],
+                app.config['SANDMAN_GROUP_COMMIT_DELAY'])
+    return committers[model]
+
+
+def register_group_commit(app):
+    """Register the group commit of the resources posted with *app*.
+
+    :param app: An instance of a Flask application object
+    """
+    app.config.setdefault('SANDMAN_GROUP_COMMIT_SIZE', 100)
+    app.config.setdefault('SANDMAN_GROUP_COMMIT_DELAY', 0.005)
+    app.extensions['sandman_group_commit'] = {}
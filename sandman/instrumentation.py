@@ -0,0 +1,86 @@
+"""Internal endpoints exposing sandman's own runtime statistics."""
+
+# Third-party imports
+from flask import current_app, jsonify, Response
+
+# Application imports
+from sandman.cache import statement_cache
+from sandman.dispatch import services
+from sandman.exception import NotFoundException
+from sandman.query_log import slow_queries as recent_slow_queries
+
+
+def stats():
+    """Return sandman's runtime statistics as JSON.
+
+    :rtype flask.Response:
+    """
+    return jsonify({'statement_cache': statement_cache.stats()})
+
+
+def slow_queries():
+    """Return the most recent slow queries as JSON, oldest first.
+
+    :rtype flask.Response:
+    """
+    return jsonify({'slow_queries': recent_slow_queries(current_app)})
+
+
+def profiles():
+    """Return a description of the profiles kept, newest first, as JSON.
+
+    :rtype flask.Response:
+    """
+    return jsonify(
+        {'profiles': current_app.extensions['sandman_profiles'].describe()})
+
+
+def profile(profile_id, profile_format):
+    """Return the profile *profile_id* in *profile_format* (``pstats`` or
+    ``collapsed``) as a download.
+
+    :param int profile_id: The id of the profile
+    :param str profile_format: The format of the profile
+    :rtype flask.Response:
+    """
+    stored = current_app.extensions['sandman_profiles'].get(profile_id)
+    if stored is None:
+        raise NotFoundException()
+    response = Response(
+        stored[profile_format], mimetype='application/octet-stream'
+        if profile_format == 'pstats' else 'text/plain')
+    response.headers['Content-Disposition'] = (
+        'attachment; filename=profile-{}.{}'.format(
+            profile_id, profile_format))
+    return response
+
+
+def resources():
+    """Return a description of each resource served, for clients discovering
+    the API, as JSON.
+
+    :rtype flask.Response:
+    """
+    return jsonify({'resources': [{
+        'name': service.__endpoint__,
+        'url': service.__url__,
+        'meta': '{}/meta'.format(service.__url__),
+        'primary_key': service.__model__.primary_key(),
+        'methods': sorted(service.__model__.__methods__),
+        } for service in sorted(
+            services(current_app), key=lambda cls: cls.__url__)]})
+
+
+def register_instrumentation(app):
+    """Register sandman's internal instrumentation endpoints with *app*.
+
+    :param app: An instance of a Flask application object
+    """
+    app.add_url_rule('/_sandman/stats', 'sandman_stats', stats)
+    app.add_url_rule('/_sandman/resources', 'sandman_resources', resources)
+    app.add_url_rule(
+        '/_sandman/slow_queries', 'sandman_slow_queries', slow_queries)
+    app.add_url_rule('/_sandman/profiles', 'sandman_profiles', profiles)
+    app.add_url_rule(
+        '/_sandman/profiles/<int:profile_id>.'
+        '<any(pstats, collapsed):profile_format>', 'sandman_profile', profile)
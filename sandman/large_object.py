@@ -0,0 +1,72 @@
+"""Chunked reads of large object (BLOB and CLOB) column values, so they can be
+streamed to clients without loading whole values into memory.
+
+Offsets and lengths are in bytes for binary columns and in characters for
+text columns.
+"""
+
+# Third-party imports
+from sqlalchemy import func, select
+
+CHUNK_SIZE = 64 * 1024
+"""The amount of a value read per statement."""
+
+
+def _length(column, dialect):
+    """Return an expression for the length of *column*'s value."""
+    if dialect.name == 'oracle':
+        return func.dbms_lob.getlength(column)
+    return func.length(column)
+
+
+def _substring(column, dialect, offset, length):
+    """Return an expression for part of *column*'s value, starting at the
+    zero-based *offset*."""
+    if dialect.name == 'oracle':
+        return func.dbms_lob.substr(column, length, offset + 1)
+    return func.substr(column, offset + 1, length)
+
+
+def value_length(connection, column, key, resource_id):
+    """Return the length of *column*'s value in the row whose primary key
+    *key* equals *resource_id*.
+
+    :param connection: The connection to read from
+    :param column: The large object :class:`sqlalchemy.Column`
+    :param key: The primary key :class:`sqlalchemy.Column`
+    :param resource_id: The primary key value of the row
+    :returns: The length, or None if there is no such row or the value is
+              NULL
+    """
+    return connection.execute(select([
+        _length(column, connection.dialect)]).where(
+            key == resource_id)).scalar()
+
+
+def read_chunks(engine, column, key, resource_id, start, stop,
+                chunk_size=CHUNK_SIZE):
+    """Yield the part ``[start, stop)`` of *column*'s value in the row whose
+    primary key *key* equals *resource_id*, one chunk at a time.
+
+    Each chunk is read with a statement of its own, on a connection which is
+    only held while the chunk is read.
+
+    :param engine: The SQLAlchemy engine to read from
+    :param column: The large object :class:`sqlalchemy.Column`
+    :param key: The primary key :class:`sqlalchemy.Column`
+    :param resource_id: The primary key value of the row
+    :param int start: The offset of the first byte or character to read
+    :param int stop: The offset after the last byte or character to read
+    :param int chunk_size: The amount read per statement
+    """
+    for offset in range(start, stop, chunk_size):
+        length = min(chunk_size, stop - offset)
+        with engine.connect() as connection:
+            chunk = connection.execute(select([_substring(
+                column, connection.dialect, offset, length)]).where(
+                    key == resource_id)).scalar()
+        if not chunk:
+            return
+        if not isinstance(chunk, (bytes, type(u''))):
+            chunk = bytes(chunk)
+        yield chunk
@@ -0,0 +1,366 @@
+"""A load generator for capacity planning, sending a configurable mix of
+reads and writes to a running sandman service over concurrent connections
+and measuring throughput, latency and errors per endpoint.
+
+Resources are discovered through ``/_sandman/resources`` and their
+``/<resource>/meta`` routes, so no per-table configuration is needed. Writes
+only ever modify or delete resources the load generator created itself.
+"""
+
+# Standard library imports
+import itertools
+import json
+import random
+import re
+import socket
+import threading
+import time
+try:
+    from http.client import HTTPConnection, HTTPException
+    from urllib.parse import urlsplit
+except ImportError:  # pragma: no cover
+    from httplib import HTTPConnection, HTTPException  # pylint: disable=F0401
+    from urlparse import urlsplit  # pylint: disable=import-error
+
+HISTOGRAM_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+"""The upper bounds, in milliseconds, of the latency histogram's buckets
+(the last bucket holds slower requests)."""
+
+READ_MIX = (('get', 0.8), ('page', 0.2))
+"""The share of reads fetching a resource by id and a page of resources."""
+
+WRITE_MIX = (('post', 0.5), ('patch', 0.3), ('delete', 0.2))
+"""The share of writes creating, updating and deleting resources."""
+
+_UNWRITABLE_TYPES = re.compile(r'date|time|blob|binary', re.IGNORECASE)
+
+
+class EndpointStats(object):
+    """The measurements of the requests made to one endpoint."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.statuses = {}
+
+    def record(self, seconds, status):
+        """Record a request which took *seconds* and got *status* (None if
+        it failed without a response)."""
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status is None or status >= 400:
+            self.errors += 1
+
+    def report(self, seconds):
+        """Return the measurements, over a run of *seconds*, as a dictionary.
+
+        :param float seconds: The duration of the run
+        :rtype: dict
+        """
+        latencies = sorted(self.latencies)
+        histogram = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        bucket = 0
+        for latency in latencies:
+            while (bucket < len(HISTOGRAM_BUCKETS) and
+                   latency * 1000 > HISTOGRAM_BUCKETS[bucket]):
+                bucket += 1
+            histogram[bucket] += 1
+
+        def percentile(fraction):
+            """Return the latency below which *fraction* of requests lie."""
+            return latencies[min(len(latencies) - 1,
+                                 int(len(latencies) * fraction))]
+        return {
+            'requests': len(latencies),
+            'errors': self.errors,
+            'error_rate': float(self.errors) / len(latencies),
+            'requests_per_second': len(latencies) / seconds,
+            'latency': {
+                'p50': percentile(0.5),
+                'p90': percentile(0.9),
+                'p99': percentile(0.99),
+                'max': latencies[-1],
+                },
+            'histogram': [
+                {'le_ms': bound, 'count': count} for bound, count in zip(
+                    HISTOGRAM_BUCKETS + (None,), histogram)],
+            'statuses': dict(
+                (str(status), count) for status, count in
+                self.statuses.items()),
+            }
+
+
+class Resource(object):
+    """A resource of the service under load, as discovered.
+
+    :param dict description: The resource's entry in ``/_sandman/resources``
+    :param dict columns: The column types returned by its ``meta`` route
+
+    """
+
+    def __init__(self, description, columns):
+        self.url = description['url']
+        self.primary_key = description['primary_key']
+        self.methods = description['methods']
+        self.columns = columns
+        self.ids = []
+        """Primary key values of existing resources, read from."""
+        self.created = []
+        """Primary key values of the resources created by writes."""
+        self.pages = 1
+        """The number of pages known to exist."""
+        self.lock = threading.Lock()
+
+    @property
+    def writable(self):
+        """Whether the load generator can create resources of this type.
+
+        Date, time and binary values can't be sent as JSON, so resources
+        with such columns are only read.
+        """
+        return 'POST' in self.methods and not any(
+            _UNWRITABLE_TYPES.search(column_type)
+            for column_type in self.columns.values())
+
+    def payload(self, number):
+        """Return the JSON body creating a new, unique resource.
+
+        :param int number: A number making the resource unique
+        :rtype: dict
+        """
+        body = {}
+        for name, column_type in self.columns.items():
+            if name == self.primary_key:
+                continue
+            length = re.search(r'char\((\d+)\)', column_type)
+            if 'char' in column_type or 'text' in column_type:
+                value = 'bench {}'.format(number)
+                body[name] = value[:int(length.group(1))] if length else value
+            elif re.search(r'numeric|decimal|float|real|double', column_type):
+                body[name] = '1.00'
+            elif 'bool' in column_type:
+                body[name] = False
+            else:
+                body[name] = 1
+        return body
+
+
+class LoadGenerator(object):
+    """Sends a mix of requests to a sandman service from concurrent
+    connections and records their latency per endpoint.
+
+    :param str base_url: The URL of the service, e.g. ``http://host:5000``
+    :param list names: The names or URLs of the resources to load (all by
+                       default)
+    :param int concurrency: The number of concurrent connections
+    :param float duration: The duration of the run, in seconds
+    :param int requests: The maximum number of requests of the run
+    :param float write_ratio: The fraction of requests which are writes
+    :param float timeout: The time to wait for each response, in seconds
+
+    """
+
+    def __init__(self, base_url, names=None, concurrency=8, duration=10.0,
+                 requests=None, write_ratio=0.1, timeout=10.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.names = names
+        self.concurrency = concurrency
+        self.duration = duration
+        self.requests = requests
+        self.write_ratio = write_ratio
+        self.timeout = timeout
+        self.resources = []
+        self.stats = {}
+        self.total = EndpointStats()
+        self.seconds = None
+        self._lock = threading.Lock()
+        self._sent = itertools.count()
+        # identical resources aren't created twice, so start from a number
+        # no earlier run is likely to have used
+        self._numbers = itertools.count(random.randrange(10 ** 9))
+
+    def request(self, connection, method, path, body=None):
+        """Send a request on *connection* and return its status and decoded
+        JSON body (None if it has none).
+
+        :param connection: An :class:`HTTPConnection`
+        :param str method: The HTTP method
+        :param str path: The path, relative to the service's URL
+        :param dict body: The JSON body to send
+        :rtype: tuple
+        """
+        headers = {'Accept': 'application/json'}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        connection.request(method, self.prefix + path, body, headers)
+        response = connection.getresponse()
+        data = response.read()
+        try:
+            return response.status, json.loads(data.decode('utf-8'))
+        except ValueError:
+            return response.status, None
+
+    def _connection(self):
+        """Return a new connection to the service."""
+        return HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def discover(self):
+        """Discover the resources to load, their columns and some of their
+        primary key values.
+
+        :raises ValueError: if no resource could be discovered
+        """
+        connection = self._connection()
+        status, listing = self.request(
+            connection, 'GET', '/_sandman/resources')
+        if status != 200:
+            raise ValueError(
+                'The service does not list its resources (status {})'.format(
+                    status))
+        for description in listing['resources']:
+            if self.names and not (
+                    description['name'] in self.names or
+                    description['url'] in self.names or
+                    description['url'].lstrip('/') in self.names):
+                continue
+            if 'GET' not in description['methods']:
+                continue
+            status, meta = self.request(
+                connection, 'GET', description['meta'])
+            if status != 200:
+                continue
+            resource = Resource(description, list(meta.values())[0])
+            self._sample(connection, resource)
+            self.resources.append(resource)
+        connection.close()
+        if not self.resources:
+            raise ValueError('No resources to load')
+
+    def _sample(self, connection, resource):
+        """Read some primary key values of *resource* and estimate its number
+        of pages."""
+        status, page = self.request(
+            connection, 'GET', '{}?page=1'.format(resource.url))
+        if status == 200:
+            resource.ids = [
+                resource_dict[resource.primary_key]
+                for resource_dict in page.get('resources', [])
+                if resource.primary_key in resource_dict]
+        pages = 10
+        while resource.ids and self.request(
+                connection, 'GET', '{}?page={}'.format(
+                    resource.url, pages))[0] == 200:
+            resource.pages = pages
+            pages *= 10
+
+    def run(self):
+        """Send requests from concurrent connections until the duration or
+        number of requests of the run is reached.
+
+        :rtype: dict
+        """
+        if not self.resources:
+            self.discover()
+        deadline = time.time() + self.duration
+        start = time.time()
+        threads = [threading.Thread(target=self._work, args=(deadline,))
+                   for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.seconds = time.time() - start
+        return self.report()
+
+    def _work(self, deadline):
+        """Send requests on a connection of its own until the run ends."""
+        generator = random.Random()
+        connection = self._connection()
+        while time.time() < deadline and (
+                self.requests is None or next(self._sent) < self.requests):
+            resource = generator.choice(self.resources)
+            label, method, path, body, resource_id = self._next_request(
+                generator, resource)
+            started = time.time()
+            try:
+                status, data = self.request(connection, method, path, body)
+            except (HTTPException, socket.error):
+                connection.close()
+                connection = self._connection()
+                status, data = None, None
+            self._record(label, time.time() - started, status)
+            if method == 'POST' and status == 201 and data:
+                resource_id = data.get(resource.primary_key)
+            if method in ('POST', 'PATCH') and resource_id is not None:
+                with resource.lock:
+                    resource.created.append(resource_id)
+        connection.close()
+
+    def _next_request(self, generator, resource):
+        """Return the label, method, path and body of the next request to
+        *resource*, and the created resource it modifies (if any).
+
+        Resources being modified are taken out of *resource.created* until
+        their request completes, so no two requests modify the same one.
+        """
+        url = resource.url
+        if resource.writable and generator.random() < self.write_ratio:
+            operation = _choose(generator, WRITE_MIX)
+            resource_id = None
+            with resource.lock:
+                if operation != 'post' and resource.created:
+                    resource_id = resource.created.pop(
+                        generator.randrange(len(resource.created)))
+            if resource_id is None:
+                return ('POST {}'.format(url), 'POST', url,
+                        resource.payload(next(self._numbers)), None)
+            path = '{}/{}'.format(url, resource_id)
+            label = '{} {}/<id>'.format(operation.upper(), url)
+            if operation == 'delete':
+                return label, 'DELETE', path, None, resource_id
+            payload = resource.payload(next(self._numbers))
+            return label, 'PATCH', path, dict(
+                itertools.islice(payload.items(), 1)), resource_id
+        if _choose(generator, READ_MIX) == 'get' and resource.ids:
+            return ('GET {}/<id>'.format(url), 'GET', '{}/{}'.format(
+                url, generator.choice(resource.ids)), None, None)
+        return ('GET {}?page'.format(url), 'GET', '{}?page={}'.format(
+            url, generator.randint(1, resource.pages)), None, None)
+
+    def _record(self, label, seconds, status):
+        """Record the latency and status of a request to *label*."""
+        with self._lock:
+            if label not in self.stats:
+                self.stats[label] = EndpointStats()
+            self.stats[label].record(seconds, status)
+            self.total.record(seconds, status)
+
+    def report(self):
+        """Return the measurements of the run, in total and per endpoint.
+
+        :rtype: dict
+        """
+        return {
+            'seconds': self.seconds,
+            'concurrency': self.concurrency,
+            'total': (self.total.report(self.seconds)
+                      if self.total.latencies else None),
+            'endpoints': dict(
+                (label, stats.report(self.seconds))
+                for label, stats in sorted(self.stats.items())),
+            }
+
+
+def _choose(generator, mix):
+    """Return an operation of *mix*, chosen according to its shares."""
+    point = generator.random()
+    for operation, share in mix:
+        point -= share
+        if point < 0:
+            return operation
+    return mix[-1][0]
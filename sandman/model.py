@@ -7,6 +7,7 @@ from decimal import Decimal
 
 # Third-party imports
 from flask.ext.sqlalchemy import SQLAlchemy
+from sqlalchemy.types import CLOB, LargeBinary
 
 db = SQLAlchemy()  # pylint: disable=invalid-name
 
@@ -49,6 +50,84 @@ class Model(object):
 
     """
 
+    __database_json__ = False
+    """override :attr:`__database_json__` to have the database generate the
+    JSON for collections of this :class:`sandman.model.Model` on dialects that
+    support it (SQLite with JSON1 and PostgreSQL).
+
+    Default: ``False``
+
+    """
+
+    __updated_at__ = None
+    """override :attr:`__updated_at__` with the name of a column holding a
+    last-modified timestamp or a monotonically increasing value to provide
+    an incremental change feed for this :class:`sandman.model.Model`.
+
+    Default: ``None``
+
+    """
+
+    __group_commit__ = False
+    """override :attr:`__group_commit__` to have the resources POSTed to
+    this :class:`sandman.model.Model` inserted in groups, one transaction per
+    group (see :mod:`sandman.group_commit`), for high rates of small inserts.
+
+    Default: ``False``
+
+    """
+
+    __snapshot__ = None
+    """override :attr:`__snapshot__` with a number of seconds to have GET
+    requests to this :class:`sandman.model.Model` served from a local copy
+    of its table, refreshed when it is older than that (see
+    :mod:`sandman.snapshot`).
+
+    Default: ``None``
+
+    """
+
+    __snapshot_refresh__ = 'full'
+    """override :attr:`__snapshot_refresh__` with ``'key'`` to refresh this
+    :class:`sandman.model.Model`'s snapshot with the rows whose primary key
+    is greater than any copied (for tables only appended to), or with
+    ``'timestamp'`` to refresh it with the rows changed since the last
+    refresh according to :attr:`__updated_at__`, rather than copying the
+    whole table.
+
+    Default: ``'full'``
+
+    """
+
+    __snapshot_query__ = None
+    """override :attr:`__snapshot_query__` with a function taking the
+    model's table and returning the Core ``select()`` of the rows copied to
+    this :class:`sandman.model.Model`'s snapshot, selecting its
+    :meth:`inline_columns`, to copy only some of them.
+
+    Default: ``None``
+
+    """
+
+    __searchable__ = ()
+    """override :attr:`__searchable__` with the names of the text columns
+    searched by the ``q`` query parameter of this
+    :class:`sandman.model.Model`'s collection, which must have a full-text
+    index (see :mod:`sandman.search`). Left empty, it is set to the columns
+    of the table's index, if it has one, on the first search.
+
+    Default: ``()``
+
+    """
+
+    __url__ = None
+    """The base URL of the service serving this
+    :class:`sandman.model.Model`, set when the service is registered.
+
+    Default: ``None``
+
+    """
+
     __table__ = None
     """Will be populated by SQLAlchemy with the table's meta-information."""
 
@@ -75,7 +154,41 @@ class Model(object):
 
         """
         primary_key_value = getattr(self, self.primary_key(), None)
-        return '/{}/{}'.format(self.endpoint(), primary_key_value)
+        return self.uri_for(primary_key_value)
+
+    @classmethod
+    def uri_for(cls, primary_key_value):
+        """Return the URI of the resource with the given primary key value.
+
+        :param primary_key_value: The primary key value of the resource
+        :rtype: string
+
+        """
+        return '/{}/{}'.format(cls.endpoint(), primary_key_value)
+
+    @classmethod
+    def large_object_uri(cls, primary_key_value, column):
+        """Return the URI of the value of the large object *column* of the
+        resource with the given primary key value.
+
+        :param primary_key_value: The primary key value of the resource
+        :param str column: The name of the large object column
+        :rtype: string
+
+        """
+        return '{}/{}/{}'.format(
+            cls.service_url(), primary_key_value, column)
+
+    @classmethod
+    def service_url(cls):
+        """Return the base URL of the service serving the
+        :class:`sandman.model.Model` (under its :meth:`endpoint` if no
+        service was registered).
+
+        :rtype: string
+
+        """
+        return cls.__url__ or '/' + cls.endpoint()
 
     @classmethod
     def primary_key(cls):
@@ -87,6 +200,35 @@ class Model(object):
 
         return cls.__table__.primary_key.columns.values()[0].name
 
+    @classmethod
+    def large_object_columns(cls):
+        """Return the names of the table's large object (BLOB and CLOB)
+        columns, which are left out of queries and serialized as links to
+        the column's own endpoint.
+
+        :rtype: tuple
+
+        """
+        # computed once per table rather than for each resource serialized
+        cached = vars(cls).get('_large_object_columns')
+        if cached is None or cached[0] is not cls.__table__:
+            cached = (cls.__table__, tuple(
+                name for name, column in cls.__table__.columns.items()
+                if isinstance(column.type, (LargeBinary, CLOB))))
+            setattr(cls, '_large_object_columns', cached)
+        return cached[1]
+
+    @classmethod
+    def inline_columns(cls):
+        """Return the table's columns other than its large object columns.
+
+        :rtype: list
+
+        """
+        large_objects = cls.large_object_columns()
+        return [column for name, column in cls.__table__.columns.items()
+                if name not in large_objects]
+
     def links(self):
         """Return a list of links for endpoints related to the resource.
 
@@ -94,15 +236,28 @@ class Model(object):
 
         """
 
+        links = self.related_links(lambda column: getattr(self, column, None))
+        links.append({'rel': 'self', 'uri': self.resource_uri()})
+        return links
+
+    @classmethod
+    def related_links(cls, value_of):
+        """Return a list of links to the resources referred to by the table's
+        foreign keys.
+
+        :param value_of: A callable returning the value of the named column
+        :rtype: list
+
+        """
+
         links = []
-        for foreign_key in self.__table__.foreign_keys:
+        for foreign_key in cls.__table__.foreign_keys:
             column = foreign_key.column.name
-            column_value = getattr(self, column, None)
+            column_value = value_of(column)
             if column_value:
                 table = foreign_key.column.table.name
                 links.append({'rel': 'related', 'uri': '/{}/{}'.format(
                     table, column_value)})
-        links.append({'rel': 'self', 'uri': self.resource_uri()})
         return links
 
     def as_dict(self):
@@ -112,14 +267,43 @@ class Model(object):
         :rtype: dict
 
         """
+        large_objects = self.large_object_columns()
         result_dict = {column: getattr(self, column, None) for column in
-                       self.__table__.columns.keys()}
+                       self.__table__.columns.keys()
+                       if column not in large_objects}
         for column in result_dict:
             if isinstance(result_dict[column], Decimal):
                 result_dict[column] = str(result_dict[column])
+        for column in large_objects:
+            result_dict[column] = self.large_object_uri(
+                getattr(self, self.primary_key(), None), column)
         result_dict['_links'] = self.links()
         return result_dict
 
+    @classmethod
+    def row_as_dict(cls, row):
+        """Return the same dictionary as :meth:`as_dict` for a row fetched
+        with a Core ``select()`` of :meth:`inline_columns`, without creating
+        an ORM instance.
+
+        :param dict row: A mapping of column names to values
+        :rtype: dict
+
+        """
+        result_dict = {column: row.get(column) for column in
+                       cls.__table__.columns.keys()}
+        for column in result_dict:
+            if isinstance(result_dict[column], Decimal):
+                result_dict[column] = str(result_dict[column])
+        for column in cls.large_object_columns():
+            result_dict[column] = cls.large_object_uri(
+                row.get(cls.primary_key()), column)
+        links = cls.related_links(row.get)
+        links.append({'rel': 'self', 'uri': cls.uri_for(
+            row.get(cls.primary_key()))})
+        result_dict['_links'] = links
+        return result_dict
+
     def from_dict(self, dictionary):
         """Set a set of attributes which correspond to the
         :class:`sandman.model.Model`'s columns.
@@ -0,0 +1,251 @@
+"""Opt-in profiling of the requests dispatched to services, showing which
+Python frames are hot (serialization, ORM loading, ...) rather than only how
+long requests take.
+
+A profiled request runs under :mod:`cProfile` and, for flame graphs, under a
+sampler recording the request thread's stack at a regular interval. The
+most recent profiles are kept in memory; the ``X-Sandman-Profile-Id``
+response header names the profile of a profiled request, which is kept
+once the response's body has been sent. Profiles can be listed at
+``/_sandman/profiles`` and downloaded from ``/_sandman/profiles/<id>.pstats``
+(for :mod:`pstats`, snakeviz, ...) or ``/_sandman/profiles/<id>.collapsed``
+(for ``flamegraph.pl``, speedscope, ...).
+
+Profiling is configured with the following application settings, and costs
+nothing beyond a configuration lookup per request while both of the first
+two are unset:
+
+    SANDMAN_PROFILE_RATE: The fraction of requests profiled (default: 0)
+    SANDMAN_PROFILE_HEADER: The name of a request header asking for the
+        request to be profiled, or None to ignore such headers (default:
+        None)
+    SANDMAN_PROFILE_INTERVAL: The interval between stack samples, in seconds
+        (default: 0.005)
+    SANDMAN_PROFILE_LIMIT: The number of profiles kept (default: 20)
+"""
+
+# Standard library imports
+import collections
+import cProfile
+import datetime
+import itertools
+import marshal
+import random
+import sys
+import threading
+import time
+
+# Third-party imports
+from flask import current_app, g, request
+
+# Application imports
+from sandman.dispatch import request_service
+from sandman.service import Service
+
+
+class RequestProfiler(object):
+    """Profiles the calling thread between :meth:`start` and :meth:`stop`,
+    both deterministically and by sampling its stack.
+
+    :param float interval: The interval between stack samples, in seconds
+
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        """The number of samples taken of each stack, root frame first."""
+        self.seconds = None
+        """The duration of the profile, once stopped."""
+        self._profile = cProfile.Profile()
+        self._stopped = threading.Event()
+        self._sampler = None
+        self._started = None
+
+    def start(self):
+        """Start profiling the calling thread."""
+        thread_id = threading.current_thread().ident
+        self._sampler = threading.Thread(
+            target=self._sample, args=(thread_id,), name='sandman-profiler')
+        self._sampler.daemon = True
+        self._sampler.start()
+        self._started = time.time()
+        self._profile.enable()
+
+    def stop(self):
+        """Stop profiling."""
+        self._profile.disable()
+        self.seconds = time.time() - self._started
+        self._stopped.set()
+        self._sampler.join()
+
+    def _sample(self, thread_id):
+        """Record the stack of the thread *thread_id* until stopped."""
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()  # pylint: disable=protected-access
+            frame = frames.get(thread_id)
+            stack = []
+            while frame is not None:
+                stack.append('{}:{}'.format(
+                    frame.f_code.co_filename, frame.f_code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def pstats(self):
+        """Return the deterministic profile in the :mod:`pstats` file format.
+
+        :rtype: bytes
+        """
+        self._profile.create_stats()
+        return marshal.dumps(self._profile.stats)
+
+    def collapsed(self):
+        """Return the sampled stacks in the collapsed (folded) stack format,
+        one ``frame;frame;... count`` line per stack.
+
+        :rtype: str
+        """
+        return ''.join('{} {}\n'.format(stack, count)
+                       for stack, count in sorted(self.stacks.items()))
+
+
+class ProfileStore(object):
+    """Keeps the most recent profiles of an application.
+
+    :param int limit: The number of profiles kept
+
+    """
+
+    def __init__(self, limit):
+        self._profiles = collections.OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.limit = limit
+
+    def reserve(self):
+        """Return the id of a profile to be added once it is taken.
+
+        :rtype: int
+        """
+        with self._lock:
+            return next(self._ids)
+
+    def add(self, profiler, description, profile_id=None):
+        """Store the profile taken by *profiler* and return its id.
+
+        :param profiler: A stopped :class:`RequestProfiler`
+        :param dict description: What was profiled
+        :param int profile_id: The id returned by :meth:`reserve`, or None
+                               for a new id
+        :rtype: int
+        """
+        profile = dict(
+            description, seconds=profiler.seconds,
+            samples=sum(profiler.stacks.values()),
+            pstats=profiler.pstats(), collapsed=profiler.collapsed())
+        with self._lock:
+            if profile_id is None:
+                profile_id = next(self._ids)
+            profile['id'] = profile_id
+            self._profiles[profile_id] = profile
+            while len(self._profiles) > self.limit:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id):
+        """Return the profile *profile_id*, or None if it isn't kept.
+
+        :param int profile_id: The id returned by :meth:`add`
+        :rtype: dict
+        """
+        return self._profiles.get(profile_id)
+
+    def describe(self):
+        """Return what was profiled in each profile kept, newest first.
+
+        :rtype: list
+        """
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [dict((key, value) for key, value in profile.items()
+                     if key not in ('pstats', 'collapsed'))
+                for profile in reversed(profiles)]
+
+
+def _profiled():
+    """Return True if the current request should be profiled."""
+    config = current_app.config
+    rate, header = config['SANDMAN_PROFILE_RATE'], config[
+        'SANDMAN_PROFILE_HEADER']
+    if not rate and not header:
+        return False
+    if not (header and request.headers.get(header)) and not (
+            rate and random.random() < rate):
+        return False
+    view_class = request_service()
+    return isinstance(view_class, type) and issubclass(view_class, Service)
+
+
+def start_profile():
+    """Start profiling the current request, if it should be."""
+    if _profiled():
+        g.sandman_profiler = RequestProfiler(
+            current_app.config['SANDMAN_PROFILE_INTERVAL'])
+        g.sandman_profiler.start()
+
+
+def stop_profile(response):
+    """Name the current request's profile in *response*'s headers, and stop
+    profiling and store the profile once *response* is closed, after its
+    body (which may be streamed) is generated.
+
+    :param response: The :class:`flask.Response` to the request
+    :rtype flask.Response:
+    """
+    profiler = getattr(g, 'sandman_profiler', None)
+    if profiler is None:
+        return response
+    g.sandman_profiler = None
+    profiles = current_app.extensions['sandman_profiles']
+    profile_id = profiles.reserve()
+    description = {
+        'method': request.method,
+        'path': request.full_path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'time': datetime.datetime.utcnow().isoformat(),
+        }
+
+    def store():
+        """Stop profiling and store the profile."""
+        profiler.stop()
+        profiles.add(profiler, description, profile_id)
+
+    response.call_on_close(store)
+    response.headers['X-Sandman-Profile-Id'] = str(profile_id)
+    return response
+
+
+def discard_profile(exception=None):  # pylint: disable=unused-argument
+    """Stop profiling a request which failed before it had a response."""
+    profiler = getattr(g, 'sandman_profiler', None)
+    if profiler is not None:
+        g.sandman_profiler = None
+        profiler.stop()
+
+
+def register_profiling(app):
+    """Profile the service requests of *app* as configured.
+
+    :param app: An instance of a Flask application object
+    """
+    app.config.setdefault('SANDMAN_PROFILE_RATE', 0)
+    app.config.setdefault('SANDMAN_PROFILE_HEADER', None)
+    app.config.setdefault('SANDMAN_PROFILE_INTERVAL', 0.005)
+    app.config.setdefault('SANDMAN_PROFILE_LIMIT', 20)
+    app.extensions['sandman_profiles'] = ProfileStore(
+        app.config['SANDMAN_PROFILE_LIMIT'])
+    app.before_request(start_profile)
+    app.after_request(stop_profile)
+    app.teardown_request(discard_profile)
@@ -0,0 +1,154 @@
+"""Timing of the SQL statements executed while serving requests, for a
+slow-query log and for the ``?explain=1`` diagnostic mode of
+:class:`sandman.service.Service`.
+
+Query logging is configured with the following application settings:
+
+    SANDMAN_SLOW_QUERY_SECONDS: The duration above which statements are
+        logged as slow, or None to disable the slow-query log (default: None)
+    SANDMAN_SLOW_QUERY_LOG_SIZE: The number of recent slow queries kept for
+        the ``/_sandman/slow_queries`` endpoint (default: 100)
+    SANDMAN_EXPLAIN: Whether clients may request query plans with
+        ``?explain=1`` (default: False, as plans reveal the schema)
+"""
+
+# Standard library imports
+import collections
+import contextlib
+import datetime
+import logging
+import time
+
+# Third-party imports
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+    }
+"""The statement prefix returning the query plan, per dialect."""
+
+_STARTED = 'sandman_query_started'
+
+_PLAIN_TYPES = (int, float, bool, type(u''), str, type(None))
+
+
+def _before_cursor_execute(  # pylint: disable=too-many-arguments
+        connection, cursor, statement, parameters, context, executemany):
+    """Record the time a statement's execution starts."""
+    connection.info.setdefault(_STARTED, []).append(time.time())
+
+
+def _after_cursor_execute(  # pylint: disable=too-many-arguments
+        connection, cursor, statement, parameters, context, executemany):
+    """Record the statement just executed in the queries captured for the
+    current request and in the slow-query log, as needed."""
+    seconds = time.time() - connection.info[_STARTED].pop()
+    if not has_request_context():
+        return
+    captured = getattr(g, 'sandman_queries', None)
+    threshold = current_app.config.get('SANDMAN_SLOW_QUERY_SECONDS')
+    if captured is None and (threshold is None or seconds < threshold):
+        return
+    query = {
+        'statement': statement,
+        'parameters': parameters,
+        'seconds': seconds,
+        'endpoint': request.endpoint,
+        }
+    if captured is not None:
+        captured.append(query)
+    if threshold is not None and seconds >= threshold:
+        logger.warning('Slow query (%.3fs) for %s: %s %r', seconds,
+                       request.endpoint, statement, parameters)
+        slow_queries = current_app.extensions['sandman_slow_queries']
+        slow_queries.append(dict(
+            query, parameters=loggable(parameters),
+            time=datetime.datetime.utcnow().isoformat()))
+
+
+def _handle_error(context):
+    """Forget the start time of a statement which failed."""
+    started = context.connection.info.get(_STARTED) if (
+        context.connection is not None) else None
+    if started and context.cursor is not None:
+        started.pop()
+
+
+def loggable(parameters):
+    """Return a JSON-serializable copy of a statement's *parameters*, with
+    values of other types replaced by their representation.
+
+    :param parameters: The parameters, as passed to the DBAPI
+    """
+    if isinstance(parameters, dict):
+        return dict((key, loggable(value))
+                    for key, value in parameters.items())
+    if isinstance(parameters, (list, tuple)):
+        return [loggable(value) for value in parameters]
+    if isinstance(parameters, _PLAIN_TYPES):
+        return parameters
+    return repr(parameters)
+
+
+@contextlib.contextmanager
+def capture_queries():
+    """Return a context manager collecting the statements executed for the
+    current request while it is active, as a list of dictionaries with
+    ``statement``, ``parameters``, ``seconds`` and ``endpoint`` keys."""
+    g.sandman_queries = queries = []
+    try:
+        yield queries
+    finally:
+        g.sandman_queries = None
+
+
+def explain_plan(connection, query):
+    """Return the dialect's query plan for a captured *query*, as a list of
+    rows, or None if plans aren't available for it.
+
+    :param connection: The connection the query was executed on
+    :param dict query: A query returned by :func:`capture_queries`
+    :rtype: list
+    """
+    prefix = EXPLAIN_PREFIXES.get(connection.dialect.name)
+    words = query['statement'].lstrip().split(None, 1)
+    if prefix is None or not words or words[0].upper() not in (
+            'SELECT', 'WITH'):
+        return None
+    result = connection.execute(
+        prefix + query['statement'], query['parameters'])
+    if len(result.keys()) == 1:
+        return [row[0] for row in result]
+    return [dict(zip(result.keys(), row)) for row in result]
+
+
+def slow_queries(app):
+    """Return the slow queries most recently logged by *app*, oldest first.
+
+    :param app: An instance of a Flask application object
+    :rtype: list
+    """
+    return list(app.extensions['sandman_slow_queries'])
+
+
+def register_query_log(app):
+    """Time the statements executed while *app* serves requests.
+
+    :param app: An instance of a Flask application object
+    """
+    app.config.setdefault('SANDMAN_SLOW_QUERY_SECONDS', None)
+    app.config.setdefault('SANDMAN_SLOW_QUERY_LOG_SIZE', 100)
+    app.config.setdefault('SANDMAN_EXPLAIN', False)
+    app.extensions['sandman_slow_queries'] = collections.deque(
+        maxlen=app.config['SANDMAN_SLOW_QUERY_LOG_SIZE'])
+    if not event.contains(
+            Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
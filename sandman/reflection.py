@@ -0,0 +1,129 @@
+"""Reflection of a database's tables over concurrent connections, optionally
+restricted to some schemas and table name patterns.
+
+Reflecting a table takes several catalog queries (columns, keys, indexes,
+constraints...), which :meth:`sqlalchemy.schema.MetaData.reflect` runs one
+table at a time over a single connection. Here worker threads reflect
+different tables at the same time, each over a connection of its own and
+into metadata of its own (metadata isn't thread-safe); the tables are then
+copied into the shared metadata.
+"""
+
+# Standard library imports
+import fnmatch
+from multiprocessing.pool import ThreadPool
+
+# Third-party imports
+from sqlalchemy import MetaData, Table
+from sqlalchemy.engine.reflection import Inspector
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+
+DEFAULT_WORKERS = 8
+"""The number of tables reflected at the same time."""
+
+
+def select_tables(names, patterns):
+    """Return the *names* matching any of the shell-style *patterns*
+    (e.g. ``'invoice*'``), ignoring case, or all of them without patterns.
+
+    :param list names: Table names
+    :param list patterns: Shell-style patterns
+    :rtype: list
+    """
+    if not patterns:
+        return list(names)
+    return [name for name in names if any(
+        fnmatch.fnmatchcase(name.lower(), pattern.lower())
+        for pattern in patterns)]
+
+
+def _reflect(engine, keys):
+    """Reflect the tables *keys*, (schema, name) pairs, over a connection of
+    their own and return them with the keys of the tables they reference.
+    """
+    metadata = MetaData()
+    reflected = []
+    with engine.connect() as connection:
+        inspector = Inspector.from_engine(connection)
+        for schema, name in keys:
+            table = Table(name, metadata, schema=schema)
+            inspector.reflecttable(table, None, resolve_fks=False)
+            # cached by reflecttable
+            referenced = [
+                (foreign_key['referred_schema'], foreign_key['referred_table'])
+                for foreign_key in inspector.get_foreign_keys(name, schema)]
+            reflected.append((table, referenced))
+    return reflected
+
+
+def _parallel(engine):
+    """Return whether *engine*'s connections can be used from several
+    threads to see the same database (not the case of in-memory SQLite
+    databases, whose connections are per thread or shared)."""
+    return not isinstance(engine.pool, (SingletonThreadPool, StaticPool))
+
+
+def reflect_tables(engine, metadata, schemas=None, patterns=None,
+                   workers=DEFAULT_WORKERS, keys=None):
+    """Reflect the tables of *engine*'s database into *metadata*.
+
+    Tables referenced by the foreign keys of the tables selected are
+    reflected too, even if they don't match *patterns*. Tables already in
+    *metadata* are only extended with the columns they lack.
+
+    :param engine: The :class:`sqlalchemy.engine.Engine` to reflect
+    :param metadata: The :class:`sqlalchemy.schema.MetaData` to add the
+                     tables to
+    :param list schemas: The schemas to reflect (the default schema if None)
+    :param list patterns: Shell-style patterns selecting the tables to
+                          reflect by name (all tables if None)
+    :param int workers: The number of tables reflected at the same time
+    :param list keys: The (schema, name) pairs of the tables to reflect,
+                      instead of those selected by *schemas* and *patterns*
+    :returns: The tables reflected
+    :rtype: list
+    """
+    if keys is None:
+        inspector = Inspector.from_engine(engine)
+        keys = []
+        for schema in schemas or [None]:
+            keys.extend((schema, name) for name in select_tables(
+                inspector.get_table_names(schema), patterns))
+    seen = set()
+    keys = [key for key in keys if not (key in seen or seen.add(key))]
+    if not _parallel(engine):
+        workers = 1
+    pool = ThreadPool(workers) if workers > 1 else None
+    try:
+        tables = []
+        while keys:
+            batches = [batch for batch in (
+                keys[index::workers] for index in range(workers)) if batch]
+            results = (pool.imap(
+                lambda batch: _reflect(engine, batch), batches) if pool else
+                       [_reflect(engine, batch) for batch in batches])
+            keys = []
+            for reflected in results:
+                for table, referenced in reflected:
+                    tables.append(_copy(table, metadata))
+                    for key in referenced:
+                        # a table may be referenced several times
+                        if key not in seen:
+                            seen.add(key)
+                            keys.append(key)
+    finally:
+        if pool:
+            pool.close()
+    return tables
+
+
+def _copy(table, metadata):
+    """Return a copy of *table* in *metadata*, or the table of the same name
+    already there, extended with the columns it lacks."""
+    existing = metadata.tables.get(table.key)
+    if existing is None:
+        return table.tometadata(metadata)
+    for column in table.columns:
+        if column.key not in existing.columns:
+            existing.append_column(column.copy())
+    return existing
@@ -0,0 +1,126 @@
+"""Random samples of tables, taken in roughly constant time regardless of the
+table's size, for previewing large collections.
+
+A sample is requested with the ``sample`` query parameter of a collection,
+either as a number of rows (``?sample=50``) or as a percentage of the table
+(``?sample=1%``).
+
+PostgreSQL samples with ``TABLESAMPLE SYSTEM``. Other databases are sampled
+by probing random values of an integer primary key between its minimum and
+maximum; tables without one fall back to ``ORDER BY random()``, which reads
+the whole table.
+"""
+
+# Standard library imports
+import random
+
+# Third-party imports
+from sqlalchemy import func, select, tablesample, text, Integer
+
+MAX_SAMPLE_ROWS = 10000
+"""The largest sample which can be requested, or returned for a
+percentage."""
+
+PROBE_ROUNDS = 5
+"""The number of rounds of primary key probes made to fill a sample."""
+
+PROBE_BATCH = 500
+"""The number of primary key values looked up per statement."""
+
+
+def parse_sample(value):
+    """Return the ``(number, is_percentage)`` described by a ``sample`` query
+    parameter value.
+
+    :param str value: A row count or a percentage such as ``5%``
+    :rtype: tuple
+    :raises ValueError: if *value* isn't a valid sample size
+    """
+    if value.endswith('%'):
+        percentage = float(value[:-1])
+        if not 0 < percentage <= 100:
+            raise ValueError('Sample percentage must be between 0 and 100')
+        return percentage, True
+    rows = int(value)
+    if not 0 < rows <= MAX_SAMPLE_ROWS:
+        raise ValueError('Sample size must be between 1 and {}'.format(
+            MAX_SAMPLE_ROWS))
+    return rows, False
+
+
+def sample_rows(connection, table, size, is_percentage, columns=None):
+    """Return a random sample of *table*'s rows as dictionaries.
+
+    :param connection: The connection to read from
+    :param table: The :class:`sqlalchemy.Table` to sample
+    :param size: The number of rows, or the percentage of the table, to
+                 return
+    :param bool is_percentage: Whether *size* is a percentage
+    :param list columns: The columns to select (all of them by default)
+    :rtype: list
+    """
+    columns = columns or list(table.columns)
+    if connection.dialect.name == 'postgresql':
+        return _tablesample(connection, table, columns, size, is_percentage)
+    key_columns = list(table.primary_key.columns)
+    if len(key_columns) == 1 and isinstance(key_columns[0].type, Integer):
+        return _probe(
+            connection, columns, key_columns[0], size, is_percentage)
+    return _order_by_random(connection, table, columns, size, is_percentage)
+
+
+def _tablesample(connection, table, columns, size, is_percentage):
+    """Sample *table* with PostgreSQL's ``TABLESAMPLE SYSTEM``."""
+    if is_percentage:
+        percentage, limit = size, MAX_SAMPLE_ROWS
+    else:
+        # sample twice the rows needed, as block sampling is uneven
+        estimate = connection.execute(
+            text('SELECT reltuples FROM pg_class WHERE oid = CAST(:name AS '
+                 'regclass)'),
+            name=connection.dialect.identifier_preparer.format_table(
+                table)).scalar() or 0
+        percentage = min(100.0, 200.0 * size / estimate) if estimate else 100
+        limit = size
+    sampled = tablesample(table, func.system(percentage))
+    statement = select(
+        [sampled.columns[column.key] for column in columns]).limit(limit)
+    return [dict(zip(row.keys(), row))
+            for row in connection.execute(statement)]
+
+
+def _probe(connection, columns, key, size, is_percentage):
+    """Sample *table* by looking up random values of its integer primary
+    key *key*, retrying for keys which don't exist."""
+    low, high = connection.execute(
+        select([func.min(key), func.max(key)])).first()
+    if low is None:
+        return []
+    span = high - low + 1
+    if is_percentage:
+        size = max(1, int(span * size / 100))
+    size = min(size, span, MAX_SAMPLE_ROWS)
+    rows = {}
+    for _ in range(PROBE_ROUNDS):
+        needed = size - len(rows)
+        if not needed:
+            break
+        candidates = sorted(set(
+            random.randint(low, high) for _ in range(needed * 2)) - set(rows))
+        for start in range(0, len(candidates), PROBE_BATCH):
+            for row in connection.execute(select(columns).where(
+                    key.in_(candidates[start:start + PROBE_BATCH]))):
+                if len(rows) < size:
+                    rows[row[key.name]] = dict(zip(row.keys(), row))
+    return list(rows.values())
+
+
+def _order_by_random(connection, table, columns, size, is_percentage):
+    """Sample *table* by sorting it randomly."""
+    if is_percentage:
+        count = connection.execute(select([func.count()]).select_from(
+            table)).scalar()
+        size = min(max(1, int(count * size / 100)), MAX_SAMPLE_ROWS)
+    statement = select(columns).order_by(func.random()).limit(size)
+    return [dict(zip(row.keys(), row))
+            for row in connection.execute(statement)]
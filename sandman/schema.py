@@ -0,0 +1,312 @@
+"""Live schema reloads, adding the tables created and remapping the tables
+altered since a reflected application started, without restarting it.
+
+A reload compares the database's catalog with the tables loaded: it lists
+the tables of the schemas served (matching the table patterns served, if
+any) and their column names, in a single query where the database has an
+``information_schema``. Only the tables created or altered since they were
+loaded (and the tables they reference) are reflected again, into metadata of
+their own, and mapped:
+
+* the services of the tables created are registered with the running
+  application, as are their admin views;
+* the services of the tables altered are switched to their new model at
+  once. Requests being served keep the model they started with (see
+  :class:`sandman.service.Service`).
+
+Tables dropped since they were loaded keep their services, whose requests
+fail until the application restarts.
+
+A reload is triggered by a ``POST`` to ``/_sandman/schema/reload``, which
+returns the tables added and changed, by the ``SIGHUP`` signal when serving
+with ``sandmanctl``, or periodically with the following application setting:
+
+    SANDMAN_SCHEMA_RELOAD_INTERVAL: The time between schema checks, in
+        seconds, or None to only reload on demand (default: None); checks
+        run in the background, triggered by the first request after the
+        interval
+"""
+
+# Standard library imports
+import threading
+import time
+
+# Third-party imports
+from flask import current_app, jsonify
+from sqlalchemy import bindparam, MetaData, text
+from sqlalchemy.engine.reflection import Inspector
+from sqlalchemy.ext.automap import automap_base
+from sqlalchemy.ext.declarative import declarative_base
+
+# Application imports
+from sandman.admin import add_models
+from sandman.application import runtime_setup
+from sandman.changes import TOMBSTONE_TABLE
+from sandman.dispatch import register_service as register_dispatched
+from sandman.dispatch import services
+from sandman.model import db, Model
+from sandman.reflection import reflect_tables, select_tables
+from sandman.search import index_tables
+from sandman.service import Service
+
+INFORMATION_SCHEMA_DIALECTS = ('postgresql', 'mysql', 'mssql')
+"""The dialects whose columns are listed by a single ``information_schema``
+query (other dialects are inspected table by table)."""
+
+SETTINGS = tuple(sorted(
+    name for name in vars(Model)
+    if name.startswith('__') and name.endswith('__') and name not in (
+        '__module__', '__doc__', '__dict__', '__weakref__', '__tablename__',
+        '__table__', '__from_class__')))
+"""The attributes of :class:`sandman.model.Model` configuring a model, which
+a model's replacement inherits from it."""
+
+_LOCK = threading.Lock()
+
+
+def table_key(table):
+    """Return the (schema, name) pair identifying *table*.
+
+    :param table: A :class:`sqlalchemy.schema.Table`
+    :rtype: tuple
+    """
+    return table.schema, table.name
+
+
+def service_class(model):
+    """Return a new service class serving *model*, a reflected model.
+
+    :param model: A :class:`sandman.model.Model` class
+    :rtype: type
+    """
+    return type(
+        str(model.__table__.name) + 'Service',
+        (Service,),
+        {
+            '__model__': model,
+            '__endpoint__': str(model.__table__.name),
+            '__url__': '/' + str(model.__table__.name).lower(),
+            '__core_reads__': True,
+        })
+
+
+def register_schema(app, tables, schemas=None, patterns=None, workers=None,
+                    single_rule=False):
+    """Record the tables reflected into *app* and how, for later reloads.
+
+    :param app: An instance of a Flask application object
+    :param list tables: The :class:`sqlalchemy.schema.Table` objects loaded
+    :param list schemas: The schemas served (the default schema if None)
+    :param list patterns: Shell-style patterns selecting the tables served
+    :param int workers: The number of tables reflected at the same time
+    :param bool single_rule: Whether services are dispatched through a
+                             single URL rule
+    """
+    app.config.setdefault('SANDMAN_SCHEMA_RELOAD_INTERVAL', None)
+    app.extensions['sandman_schema'] = {
+        'schemas': schemas,
+        'patterns': patterns,
+        'workers': workers,
+        'single_rule': single_rule,
+        'columns': dict(
+            (table_key(table), frozenset(table.columns.keys()))
+            for table in tables),
+        'checked': time.time(),
+        }
+    app.add_url_rule('/_sandman/schema/reload', 'sandman_schema_reload',
+                     reload_view, methods=['POST'])
+    app.before_request(check_schema)
+
+
+def catalog_columns(engine, keys):
+    """Return the names of the columns of each table of *keys*, (schema,
+    name) pairs, as they are in the database.
+
+    :param engine: The :class:`sqlalchemy.engine.Engine` to inspect
+    :param list keys: The tables to inspect
+    :rtype: dict
+    """
+    columns = dict((key, set()) for key in keys)
+    inspector = Inspector.from_engine(engine)
+    if engine.dialect.name not in INFORMATION_SCHEMA_DIALECTS:
+        for schema, name in keys:
+            columns[schema, name].update(
+                column['name'] for column in inspector.get_columns(
+                    name, schema))
+        return columns
+    default = inspector.default_schema_name
+    query = text(
+        'SELECT table_schema, table_name, column_name '
+        'FROM information_schema.columns WHERE table_schema IN :schemas'
+        ).bindparams(bindparam('schemas', expanding=True))
+    schemas = sorted(set(schema or default for schema, _ in keys))
+    with engine.connect() as connection:
+        for schema, name, column in connection.execute(
+                query, schemas=schemas):
+            key = (None if schema == default and (None, name) in columns
+                   else schema, name)
+            if key in columns:
+                columns[key].add(column)
+    return columns
+
+
+def internal_tables(names):
+    """Return the names of the tables sandman itself creates among the
+    tables *names* (its tombstones and full-text indexes), which aren't
+    served as resources.
+
+    :param list names: The names of the tables of a schema
+    :rtype: set
+    """
+    internal = set([TOMBSTONE_TABLE])
+    for name in names:
+        internal.update(index_tables(name))
+    return internal
+
+
+def diff_schema(app):
+    """Return the tables created and the tables altered since *app* loaded
+    them, as lists of (schema, name) pairs.
+
+    :param app: An instance of a Flask application object
+    :rtype: tuple
+    """
+    state = app.extensions['sandman_schema']
+    engine = db.get_engine(app)
+    inspector = Inspector.from_engine(engine)
+    present = []
+    for schema in state['schemas'] or [None]:
+        names = inspector.get_table_names(schema)
+        internal = internal_tables(names)
+        present.extend((schema, name) for name in select_tables(
+            names, state['patterns']) if name not in internal)
+    loaded = state['columns']
+    added = sorted((key for key in present if key not in loaded),
+                   key=_sort_key)
+    columns = catalog_columns(
+        engine, [key for key in present if key in loaded])
+    changed = sorted(
+        (key for key, names in columns.items() if names != loaded[key]),
+        key=_sort_key)
+    return added, changed
+
+
+def _sort_key(key):
+    """Return a key sorting (schema, name) pairs, None schemas first."""
+    return key[0] or '', key[1]
+
+
+def reload_schema(app):
+    """Map the tables created and remap the tables altered since *app*
+    loaded them, and register or switch their services.
+
+    :param app: An instance of a Flask application object
+    :returns: The names of the tables added and changed
+    :rtype: dict
+    :raises KeyError: if *app* doesn't serve reflected tables
+    """
+    state = app.extensions['sandman_schema']
+    with _LOCK:
+        state['checked'] = time.time()
+        added, changed = diff_schema(app)
+        result = {'added': [], 'changed': []}
+        if not added and not changed:
+            return result
+        base = automap_base(declarative_base(
+            cls=(Model, db.Model), metadata=MetaData()))
+        tables = reflect_tables(
+            db.get_engine(app), base.metadata, workers=state['workers'],
+            keys=added + changed)
+        base.prepare()  # pylint:disable=maybe-no-member
+        serving = dict(
+            (table_key(service.__model__.__table__), service)
+            for service in services(app))
+        mapped = dict(
+            (cls.__table__, cls)
+            for cls in base.classes)  # pylint:disable=maybe-no-member
+        models = []
+        for table in tables:
+            key = table_key(table)
+            if key not in added and key not in changed:
+                continue
+            state['columns'][key] = frozenset(table.columns.keys())
+            model = mapped.get(table)
+            if model is None:
+                # tables without a primary key aren't mapped
+                continue
+            service = serving.get(key)
+            if service is None:
+                _register(app, service_class(model), state['single_rule'])
+                result['added'].append(table.name)
+            else:
+                _replace(app, service, model, state['single_rule'])
+                result['changed'].append(table.name)
+            app.class_references[table.name] = model
+            models.append(model)
+        add_models(app, models)
+    return result
+
+
+def _register(app, service, single_rule):
+    """Register *service* with the running *app*."""
+    if single_rule:
+        register_dispatched(app, service)
+        return
+    with runtime_setup(app):
+        service.register_service(app)
+
+
+def _replace(app, service, model, single_rule):
+    """Switch *service* to *model*, configured as its current model."""
+    current = service.__model__
+    for name in SETTINGS:
+        if name in vars(current):
+            setattr(model, name, getattr(current, name))
+    service.__model__ = model
+    if single_rule:
+        # converts primary key values to the type of the new model's
+        register_dispatched(app, service)
+
+
+def reload_view():
+    """Reload the schema of the current application and return the tables
+    added and changed as JSON.
+
+    :rtype flask.Response:
+    """
+    return jsonify(reload_schema(current_app._get_current_object()))
+
+
+def check_schema():
+    """Reload the schema in the background if it hasn't been checked for
+    ``SANDMAN_SCHEMA_RELOAD_INTERVAL`` seconds."""
+    interval = current_app.config['SANDMAN_SCHEMA_RELOAD_INTERVAL']
+    if not interval:
+        return
+    state = current_app.extensions['sandman_schema']
+    if time.time() - state['checked'] < interval or _LOCK.locked():
+        return
+    # checked again by the reload itself; this only keeps the requests
+    # following this one from starting reloads of their own
+    state['checked'] = time.time()
+    reload_in_background(current_app._get_current_object())
+
+
+def reload_in_background(app):
+    """Reload *app*'s schema on a thread of its own.
+
+    :param app: An instance of a Flask application object
+    :rtype: threading.Thread
+    """
+    def run():
+        """Reload the schema within an application context."""
+        with app.app_context():
+            try:
+                reload_schema(app)
+            except Exception:  # pylint: disable=broad-except
+                app.logger.exception('Schema reload failed')
+
+    thread = threading.Thread(target=run, name='sandman-schema-reload')
+    thread.daemon = True
+    thread.start()
+    return thread
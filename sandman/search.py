@@ -0,0 +1,293 @@
+"""Ranked full-text search of the text columns named in
+:attr:`sandman.model.Model.__searchable__`, backed by the database's own
+full-text engine rather than by clients downloading whole collections.
+
+A search is requested with the ``q`` query parameter of a collection, e.g.
+``/track?q=love+song``; every word must match, and resources are returned
+best match first, a page (``?page=``) at a time.
+
+SQLite searches an FTS5 virtual table, ``<table>_search``, whose content is
+the indexed table itself and which triggers keep up to date; PostgreSQL
+searches a GIN index on the columns' ``tsvector``. Indexes are built (and
+rebuilt) with :func:`build_index`, e.g. through ``sandmanctl index``.
+"""
+
+# Standard library imports
+import re
+
+# Third-party imports
+from sqlalchemy import (
+    bindparam,
+    func,
+    Index,
+    Integer,
+    literal_column,
+    select,
+    text,
+    )
+from sqlalchemy.sql import column, table as table_clause
+
+SUPPORTED_DIALECTS = ('sqlite', 'postgresql')
+"""The dialects for which full-text search is available."""
+
+SHADOW_SUFFIXES = ('', '_data', '_idx', '_docsize', '_config', '_content')
+"""The suffixes of the tables making up an FTS5 index, after its name."""
+
+TEXT_SEARCH_CONFIG = 'english'
+"""The PostgreSQL text search configuration documents are parsed with."""
+
+_COALESCED = re.compile(r'COALESCE\(\(?(?:"((?:[^"]|"")+)"|(\w+))')
+"""Matches the columns of a PostgreSQL index's definition (see
+:func:`_document`)."""
+
+
+def index_name(table):
+    """Return the name of *table*'s full-text index.
+
+    :param table: The indexed :class:`sqlalchemy.Table`
+    :rtype: str
+    """
+    return '{}_search'.format(table.name)
+
+
+def index_tables(name):
+    """Return the names of the tables SQLite's full-text index of the table
+    *name* is made of (the FTS5 virtual table and its shadow tables), which
+    aren't resources.
+
+    :param str name: The name of the indexed table
+    :rtype: list
+    """
+    return ['{}_search{}'.format(name, suffix) for suffix in SHADOW_SUFFIXES]
+
+
+def build_index(engine, table, columns):
+    """Create *table*'s full-text index on *columns* if it doesn't exist, and
+    (re)build its content from the table's rows.
+
+    :param engine: The SQLAlchemy engine of the database
+    :param table: The :class:`sqlalchemy.Table` to index
+    :param list columns: The names of the text columns to index
+    :raises ValueError: if the dialect or the table isn't supported
+    """
+    _check_supported(engine.dialect, table)
+    with engine.begin() as connection:
+        if engine.dialect.name == 'sqlite':
+            for statement in _sqlite_index_ddl(engine.dialect, table, columns):
+                connection.execute(text(statement))
+            name = _quote(engine.dialect, index_name(table))
+            connection.execute(text(
+                "INSERT INTO {0}({0}) VALUES ('rebuild')".format(name)))
+        else:
+            index = _postgresql_index(table, columns)
+            if not _postgresql_index_exists(connection, index.name):
+                index.create(bind=connection)
+
+
+def drop_index(engine, table):
+    """Drop *table*'s full-text index (and its triggers) if it exists.
+
+    :param engine: The SQLAlchemy engine of the database
+    :param table: The indexed :class:`sqlalchemy.Table`
+    """
+    name = _quote(engine.dialect, index_name(table))
+    with engine.begin() as connection:
+        if engine.dialect.name == 'sqlite':
+            for suffix in ('insert', 'delete', 'update'):
+                connection.execute(text('DROP TRIGGER IF EXISTS {}'.format(
+                    _quote(engine.dialect, '{}_{}'.format(
+                        index_name(table), suffix)))))
+            connection.execute(text('DROP TABLE IF EXISTS {}'.format(name)))
+        else:
+            connection.execute(text('DROP INDEX IF EXISTS {}'.format(name)))
+
+
+def optimize_index(engine, table):
+    """Merge the segments of *table*'s SQLite index, or rebuild its
+    PostgreSQL index, to keep searches fast after many writes.
+
+    :param engine: The SQLAlchemy engine of the database
+    :param table: The indexed :class:`sqlalchemy.Table`
+    """
+    name = _quote(engine.dialect, index_name(table))
+    with engine.begin() as connection:
+        if engine.dialect.name == 'sqlite':
+            connection.execute(text(
+                "INSERT INTO {0}({0}) VALUES ('optimize')".format(name)))
+        else:
+            connection.execute(text('REINDEX INDEX {}'.format(name)))
+
+
+def index_exists(connection, table):
+    """Return True if *table* has a full-text index.
+
+    :param connection: The connection to check with
+    :param table: The :class:`sqlalchemy.Table` to check
+    :rtype: bool
+    """
+    if connection.dialect.name == 'sqlite':
+        return connection.dialect.has_table(connection, index_name(table))
+    return _postgresql_index_exists(connection, index_name(table))
+
+
+def indexed_columns(connection, table):
+    """Return the names of the columns of *table* its full-text index was
+    built on, or an empty list if it has none, so that tables indexed with
+    ``sandmanctl index`` are searchable without setting
+    :attr:`sandman.model.Model.__searchable__`.
+
+    :param connection: The connection to check with
+    :param table: The :class:`sqlalchemy.Table` to check
+    :rtype: list
+    """
+    if connection.dialect.name == 'sqlite':
+        if not index_exists(connection, table):
+            return []
+        return [column['name'] for column in connection.dialect.get_columns(
+            connection, index_name(table))]
+    if connection.dialect.name != 'postgresql':
+        return []
+    definition = connection.execute(
+        text('SELECT indexdef FROM pg_indexes WHERE indexname = :name'),
+        name=index_name(table)).scalar()
+    if definition is None:
+        return []
+    return [quoted.replace('""', '"') if quoted else name
+            for quoted, name in _COALESCED.findall(definition)]
+
+
+def search_statement(model, dialect):
+    """Return a statement selecting the page of *model*'s resources matching
+    the ``query`` bound parameter, best match first, described by the
+    ``limit`` and ``offset`` bound parameters.
+
+    :param model: A :class:`sandman.model.Model` class with searchable columns
+    :param dialect: The SQLAlchemy dialect in use
+    :raises ValueError: if the dialect or the table isn't supported
+    """
+    table = model.__table__
+    _check_supported(dialect, table)
+    if dialect.name == 'sqlite':
+        index = table_clause(
+            index_name(table), column('rowid'), column('rank'))
+        key = list(table.primary_key.columns)[0]
+        statement = select(model.inline_columns()).select_from(
+            table.join(index, index.c.rowid == key)).where(
+                literal_column(_quote(dialect, index.name)).op('MATCH')(
+                    bindparam('query'))).order_by(index.c.rank)
+    else:
+        document = _document(table, model.__searchable__)
+        query = func.plainto_tsquery(_config(), bindparam('query'))
+        statement = select(model.inline_columns()).where(
+            document.op('@@')(query)).order_by(
+                func.ts_rank(document, query).desc())
+    return statement.limit(bindparam('limit')).offset(bindparam('offset'))
+
+
+def query_value(dialect, value):
+    """Return the value to bind as the ``query`` parameter of
+    :func:`search_statement` for the words a client searched for.
+
+    SQLite's query syntax is escaped by quoting each word, so that, as with
+    PostgreSQL's ``plainto_tsquery()``, every word must match and operators
+    are searched for as text.
+
+    :param dialect: The SQLAlchemy dialect in use
+    :param str value: The ``q`` query parameter value
+    :rtype: str
+    :raises ValueError: if *value* holds no words to search for
+    """
+    if not value.split():
+        raise ValueError('No words to search for')
+    if dialect.name != 'sqlite':
+        return value
+    return ' '.join(
+        '"{}"'.format(word.replace('"', '""')) for word in value.split())
+
+
+def _check_supported(dialect, table):
+    """Raise ValueError if *table* can't be searched with *dialect*."""
+    if dialect.name not in SUPPORTED_DIALECTS:
+        raise ValueError('Full-text search is not supported on {}'.format(
+            dialect.name))
+    key_columns = list(table.primary_key.columns)
+    if dialect.name == 'sqlite' and (
+            len(key_columns) != 1 or
+            not isinstance(key_columns[0].type, Integer)):
+        # the FTS5 rowid is the table's integer primary key
+        raise ValueError('{} has no integer primary key to index'.format(
+            table.name))
+
+
+def _quote(dialect, name):
+    """Return *name* quoted as an identifier."""
+    return dialect.identifier_preparer.quote_identifier(name)
+
+
+def _sqlite_index_ddl(dialect, table, columns):
+    """Return the statements creating *table*'s FTS5 index and the triggers
+    keeping it up to date."""
+    name = _quote(dialect, index_name(table))
+    source = _quote(dialect, table.name)
+    key_name = list(table.primary_key.columns)[0].name
+    key = _quote(dialect, key_name)
+    quoted = [_quote(dialect, column_name) for column_name in columns]
+    names = ', '.join(quoted)
+
+    def values(row):
+        """Return the indexed values of the trigger's *row*."""
+        return ', '.join('{}.{}'.format(row, column_name)
+                         for column_name in [key] + quoted)
+
+    delete = ("INSERT INTO {0}({0}, rowid, {1}) VALUES ('delete', {2});"
+              .format(name, names, values('old')))
+    insert = 'INSERT INTO {}(rowid, {}) VALUES ({});'.format(
+        name, names, values('new'))
+    trigger = 'CREATE TRIGGER IF NOT EXISTS {} AFTER {} ON {} BEGIN {} END'
+    return [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS {} USING fts5({}, content={}, "
+        "content_rowid={})".format(
+            name, names, _string(table.name), _string(key_name)),
+        trigger.format(_quote(dialect, index_name(table) + '_insert'),
+                       'INSERT', source, insert),
+        trigger.format(_quote(dialect, index_name(table) + '_delete'),
+                       'DELETE', source, delete),
+        trigger.format(_quote(dialect, index_name(table) + '_update'),
+                       'UPDATE', source, delete + ' ' + insert),
+        ]
+
+
+def _string(value):
+    """Return *value* as an SQL string literal."""
+    return "'{}'".format(value.replace("'", "''"))
+
+
+def _config():
+    """Return the text search configuration, as a constant so PostgreSQL
+    matches the indexed expression."""
+    return text("'{}'::regconfig".format(TEXT_SEARCH_CONFIG))
+
+
+def _document(table, columns):
+    """Return the ``tsvector`` expression of *table*'s *columns*."""
+    # literals rather than bound parameters, so PostgreSQL matches the
+    # indexed expression
+    values = [func.coalesce(table.columns[name], text("''"))
+              for name in columns]
+    document = values[0]
+    for value in values[1:]:
+        document = document + text("' '") + value
+    return func.to_tsvector(_config(), document)
+
+
+def _postgresql_index(table, columns):
+    """Return the GIN index on *table*'s *columns*."""
+    return Index(index_name(table), _document(table, columns),
+                 postgresql_using='gin')
+
+
+def _postgresql_index_exists(connection, name):
+    """Return True if the PostgreSQL index *name* exists."""
+    return connection.execute(
+        text('SELECT 1 FROM pg_indexes WHERE indexname = :name'),
+        name=name).scalar() is not None
@@ -2,14 +2,73 @@
 the REST endpoints for a given ORM model (i.e. database table)."""
 # pylint: disable=pointless-string-statement
 
+# Standard library imports
+import codecs
+from decimal import Decimal
+import time
+
 # Third-party imports
-from flask import jsonify, request, make_response
+from flask import (
+    current_app,
+    jsonify,
+    make_response,
+    request,
+    Response,
+    stream_with_context,
+    )
 from flask.views import MethodView
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import defer
+from sqlalchemy.types import LargeBinary
+from sqlalchemy.exc import IntegrityError, OperationalError
 
 # Application imports
+from sandman.aggregate import aggregate_statement, parse_aggregation
+from sandman.bulk import (
+    BulkFormatError,
+    Exporter,
+    FORMATS,
+    Importer,
+    MAX_PARTITIONS,
+    )
+from sandman.cache import statement_cache
+from sandman.changes import (
+    changes_since,
+    DEFAULT_LIMIT,
+    ensure_tombstones,
+    record_delete,
+    )
+from sandman.large_object import read_chunks, value_length
+from sandman.query_log import capture_queries, explain_plan, loggable
+from sandman.sample import parse_sample, sample_rows
+from sandman.search import (
+    index_exists,
+    indexed_columns,
+    query_value,
+    search_statement,
+    )
+from sandman.snapshot import add_headers, reading
+from sandman.sqlite import engines
+from sandman.tracing import span
+from sandman.database_json import (
+    JSON_BATCH_SIZE,
+    resource_json_statement,
+    supports_database_json,
+    )
 from sandman.model import db
-from sandman.exception import NotFoundException, BadRequestException
+from sandman.events import broker
+from sandman.group_commit import committer
+from sandman.exception import (
+    NotFoundException,
+    BadRequestException,
+    ForbiddenException,
+    NotImplementedException,
+    RangeNotSatisfiableException,
+    )
+
+COLLECTION_QUERIES = ('group_by', 'agg', 'sample', 'q')
+"""The query parameters selecting something other than the resources of a
+collection (aggregates, a sample or search results)."""
 
 
 class Service(MethodView):
@@ -27,11 +86,26 @@ class Service(MethodView):
     Methods:
         get: Handle HTTP GET calls to ``/<resource>`` and ``/<resource>/<id>``
         all_resources: Return all resources in a collection
+        collection: Return the resources selected by a request as
+            dictionaries
+        collection_rows: Return the resources of a collection as tuples
+        resource_dict: Return a resource as a dictionary
+        aggregate: Return aggregates of a collection computed by the database
+        sample: Return a random sample of a collection
+        search: Return the resources of a collection matching a search
+        explain: Return the query plans and timings of a GET request
         post: Handle HTTP POST calls to ``/<resource>``
         delete: Handle HTTP DELETE calls to ``/<resource>/<id>``
         put: Handle HTTP PUT calls to ``/<resource>/<id>``
         patch: Handle HTTP PATCH calls to ``/<resource>/<id>``
+        create, remove, replace, update: Create, delete, replace or update
+            a resource, as the HTTP handlers do
         resource: Return the resource with the provided primary key
+        export: Stream every resource in a bulk format
+        import_resources: Load resources from a streamed bulk upload
+        changes: Return the resources changed since a watermark
+        events: Stream the changes made to resources as Server-Sent Events
+        large_object: Stream the value of a large object column
         _no_content_response: Return an HTTP No Content response
         _created_response: Return an HTTP Created response
         register_service: Register the given service with the application
@@ -40,6 +114,8 @@ class Service(MethodView):
         __endpoint__: The name of the service's endpoint
         __url__: The base url for the service
         __model__: The associated ORM model (a :class:`sandman.Model` class)
+        __core_reads__: Serve GET requests without ORM object hydration
+        __per_page__: The number of resources returned per page
     """
 
     __endpoint__ = ''
@@ -64,63 +140,433 @@ class Service(MethodView):
     Default: None
     """
 
+    __core_reads__ = False
+    """Serve GET requests by executing a Core ``select()`` against the
+    model's table and serializing the rows directly, rather than loading ORM
+    instances into the session's identity map. Only suitable for models that
+    don't customize :meth:`sandman.model.Model.as_dict`.
+
+    Default: False
+    """
+
+    __per_page__ = 20
+    """The number of resources returned per page of a paginated collection.
+
+    Default: 20
+    """
+
+    def __init__(self):
+        super(Service, self).__init__()
+        # a request is served with the model current when it started, even
+        # if a schema reload replaces it meanwhile
+        self.__model__ = type(self).__model__
+
     def get(self, resource_id=None):
         """Return response to HTTP GET request.
 
         :param resource_id: Optional primary key value for resource.
         :rtype flask.Response:
         """
-        if 'meta' in request.url:
+        if request.args.get('explain', '').lower() in (
+                '1', 'true', 't', 'yes'):
+            return self.explain(resource_id)
+        return self._get(resource_id)
+
+    def _get(self, resource_id=None):
+        """Return response to HTTP GET request, without diagnostics, from
+        the model's snapshot if it has one.
+
+        :param resource_id: Optional primary key value for resource.
+        :rtype flask.Response:
+        """
+        with reading(self.__model__) as refreshed:
+            response = self._read(resource_id)
+        if refreshed is not None:
+            add_headers(response, refreshed)
+        return response
+
+    def _read(self, resource_id=None):
+        """Return response to HTTP GET request, read from the session's
+        database.
+
+        :param resource_id: Optional primary key value for resource.
+        :rtype flask.Response:
+        """
+        if resource_id is None and request.path == self.__url__ + '/meta':
             return self.meta()
         if resource_id is None:
             return self.all_resources()
-        else:
-            resource = self.resource(resource_id)
-            if not resource:
+        resource = self.resource_dict(resource_id)
+        with span('jsonify'):
+            return jsonify(resource)
+
+    def resource_dict(self, resource_id):
+        """Return the resource with primary key *resource_id* as a
+        dictionary.
+
+        :param resource_id: The primary key value of the resource
+        :rtype: dict
+        :raises: :class:`sandman.exception.NotFoundException` if there is no
+                 such resource
+        """
+        if self.__core_reads__:
+            resources = self._select_rows(
+                self._statement('resource', self._resource_statement),
+                {'resource_id': resource_id})
+            if not resources:
                 raise NotFoundException()
-            return jsonify(resource.as_dict())
+            return resources[0]
+        resource = self.resource(resource_id)
+        if not resource:
+            raise NotFoundException()
+        with span('serialize'):
+            return resource.as_dict()
+
+    def explain(self, resource_id=None):
+        """Serve the GET request, then return the query plan and duration of
+        each statement it executed and a breakdown of its duration, rather
+        than its response, as JSON.
+
+        :param resource_id: Optional primary key value for resource.
+        :rtype flask.Response:
+        """
+        if not current_app.config.get('SANDMAN_EXPLAIN'):
+            raise ForbiddenException('Query plans are disabled')
+        with capture_queries() as queries:
+            started = time.time()
+            response = self._get(resource_id)
+            body = response.get_data()
+            seconds = time.time() - started
+        connection = db.session.connection()
+        database_seconds = sum(query['seconds'] for query in queries)
+        return jsonify({'explain': {
+            'status': response.status_code,
+            'response_bytes': len(body),
+            'seconds': seconds,
+            'database_seconds': database_seconds,
+            'other_seconds': seconds - database_seconds,
+            'queries': [{
+                'statement': query['statement'],
+                'parameters': loggable(query['parameters']),
+                'seconds': query['seconds'],
+                'plan': explain_plan(connection, query),
+                } for query in queries],
+            }})
 
     def all_resources(self):
         """Return all resources of this type as a JSON list.
 
         :rtype flask.Response:
         """
+        if not set(request.args) & set(COLLECTION_QUERIES) and (
+                self.__model__.__database_json__ and supports_database_json(
+                    self.__model__, db.session.bind.dialect)):
+            return self._database_json_response()
+        resources = self.collection()
+        with span('jsonify'):
+            return jsonify(
+                {self.__model__.__top_level_json_name__: resources})
+
+    def collection(self):
+        """Return the resources of this type selected by the request's query
+        parameters (all of them, a page, aggregates, a sample or search
+        results) as dictionaries.
+
+        :rtype: list
+        """
+        if 'group_by' in request.args or 'agg' in request.args:
+            return self._aggregates()
+        if 'sample' in request.args:
+            return self._sample_rows()
+        if 'q' in request.args:
+            return self._search_rows()
+        if self.__core_reads__:
+            return self._all_rows()
+        query = self.__model__.query.options(*self._deferred_columns())
         if 'page' not in request.args:
-            resources = db.session.query(self.__model__).all()
+            resources = query.all()
         else:
-            resources = self.__model__.query.paginate(
-                int(request.args['page'])).items
+            resources = query.paginate(
+                int(request.args['page']), self.__per_page__).items
+        with span('serialize', rows=len(resources)):
+            return [resource.as_dict() for resource in resources]
+
+    def aggregate(self):
+        """Return the aggregates requested by the ``group_by`` and ``agg``
+        query parameters, computed by the database, as a JSON list.
+
+        :rtype flask.Response:
+        """
         return jsonify(
-            {self.__model__.__top_level_json_name__: [
-                resource.as_dict() for resource in resources]})
+            {self.__model__.__top_level_json_name__: self._aggregates()})
+
+    def _aggregates(self):
+        """Return the aggregates requested by the query parameters as
+        dictionaries."""
+        table = self.__model__.__table__
+        try:
+            shape = parse_aggregation(
+                table, request.args.get('group_by'), request.args.get('agg'))
+        except ValueError as exception:
+            raise BadRequestException(str(exception))
+        result = statement_cache.execute(self._statement(
+            ('aggregate', shape), lambda: aggregate_statement(table, shape)))
+        keys = result.keys()
+        return [{key: str(value) if isinstance(value, Decimal) else value
+                 for key, value in zip(keys, row)}
+                for row in result]
+
+    def sample(self):
+        """Return a random sample of the resources of this type, of the size
+        given by the ``sample`` query parameter (a number of rows or a
+        percentage), as a JSON list.
+
+        :rtype flask.Response:
+        """
+        return jsonify(
+            {self.__model__.__top_level_json_name__: self._sample_rows()})
+
+    def _sample_rows(self):
+        """Return the sample requested by the query parameters as
+        dictionaries."""
+        try:
+            size, is_percentage = parse_sample(request.args['sample'])
+        except ValueError as exception:
+            raise BadRequestException(str(exception))
+        model = self.__model__
+        rows = sample_rows(db.session.connection(), model.__table__, size,
+                           is_percentage, model.inline_columns())
+        return [model.row_as_dict(row) for row in rows]
+
+    def search(self):
+        """Return the page (``page`` query parameter, the first by default) of
+        resources of this type matching the words of the ``q`` query
+        parameter, best match first, as a JSON list.
+
+        :rtype flask.Response:
+        """
+        return jsonify(
+            {self.__model__.__top_level_json_name__: self._search_rows()})
+
+    def _search_rows(self):
+        """Return the search results requested by the query parameters as
+        dictionaries."""
+        model = self.__model__
+        if not model.__searchable__:
+            # reflected models are searchable once their table is indexed
+            model.__searchable__ = tuple(indexed_columns(
+                db.session.connection(), model.__table__))
+        if not model.__searchable__:
+            raise NotImplementedException(
+                '{} is not searchable'.format(model.__name__))
+        dialect = db.session.bind.dialect
+        try:
+            statement = self._statement(
+                ('search', dialect.name),
+                lambda: search_statement(model, dialect))
+        except ValueError as exception:
+            raise NotImplementedException(str(exception))
+        try:
+            query = query_value(dialect, request.args['q'])
+        except ValueError as exception:
+            raise BadRequestException(str(exception))
+        try:
+            params = self._page_params()
+            params['query'] = query
+            resources = self._select_rows(statement, params)
+        except OperationalError:
+            if index_exists(db.session.connection(), model.__table__):
+                raise
+            raise NotImplementedException(
+                '{} has no search index'.format(model.__name__))
+        return resources
+
+    def _all_rows(self):
+        """Return all (or the requested page of) resources of this type as
+        dictionaries, read with a Core ``select()``.
+
+        :rtype: list
+        """
+        resources = self._select_rows(*self._collection_statement())
+        if not resources and int(request.args.get('page', 1)) != 1:
+            raise NotFoundException()
+        return resources
+
+    def collection_rows(self):
+        """Return all (or the requested page of) resources of this type as
+        tuples of the values of the model's inline columns, in order.
+
+        :rtype: list
+        """
+        statement, params = self._collection_statement()
+        rows = [tuple(row)
+                for row in statement_cache.execute(statement, **params)]
+        if not rows and int(request.args.get('page', 1)) != 1:
+            raise NotFoundException()
+        return rows
+
+    def _collection_statement(self):
+        """Return the cached Core statement selecting all (or the requested
+        page of) resources of this type, and its parameter values.
+
+        :rtype: tuple
+        """
+        if 'page' not in request.args:
+            return self._statement(
+                'all', lambda: select(self.__model__.inline_columns())), {}
+        return (self._statement('page', self._page_statement),
+                self._page_params())
+
+    def _page_statement(self):
+        """Return a Core statement selecting the page of resources described
+        by the ``limit`` and ``offset`` bound parameters."""
+        return select(self.__model__.inline_columns()).limit(
+            bindparam('limit')).offset(bindparam('offset'))
+
+    def _page_params(self):
+        """Return the ``limit`` and ``offset`` parameter values for the page
+        requested in the query string (the first by default).
+
+        :rtype: dict
+        """
+        page = int(request.args.get('page', 1))
+        if page < 1:
+            raise NotFoundException()
+        return {
+            'limit': self.__per_page__,
+            'offset': (page - 1) * self.__per_page__,
+            }
+
+    def _database_json_response(self):
+        """Return all (or the requested page of) resources of this type as a
+        JSON list, each resource's JSON being generated by the database and
+        streamed to the client as it is fetched.
+
+        :rtype flask.Response:
+        """
+        dialect = db.session.bind.dialect
+        if 'page' not in request.args:
+            statement = self._statement(
+                ('json', dialect.name), lambda: resource_json_statement(
+                    self.__model__, dialect,
+                    select(self.__model__.inline_columns())))
+            params = {}
+        else:
+            statement = self._statement(
+                ('json_page', dialect.name), lambda: resource_json_statement(
+                    self.__model__, dialect, self._page_statement()))
+            params = self._page_params()
+        result = statement_cache.execute(statement, **params)
+        first = result.fetchone()
+        if first is None and int(request.args.get('page', 1)) != 1:
+            result.close()
+            raise NotFoundException()
+
+        def generate():
+            """Yield the response body, a batch of resources at a time."""
+            try:
+                yield '{{"{}": ['.format(
+                    self.__model__.__top_level_json_name__)
+                if first is not None:
+                    yield first[0]
+                while True:
+                    rows = result.fetchmany(JSON_BATCH_SIZE)
+                    if not rows:
+                        break
+                    yield ''.join(',' + row[0] for row in rows)
+                yield ']}'
+            finally:
+                result.close()
+        return Response(
+            stream_with_context(generate()), mimetype='application/json')
+
+    def _select_rows(self, statement, params=None):
+        """Execute *statement* and return its rows as resource dictionaries.
+
+        Rows are never hydrated into ORM instances, so nothing is added to the
+        session's identity map.
+
+        :param statement: A cached Core ``select()`` against the model's table
+        :param dict params: Values for the statement's bound parameters
+        :rtype: list
+        """
+        result = statement_cache.execute(statement, **(params or {}))
+        keys = result.keys()
+        with span('serialize') as serialize:
+            resources = [self.__model__.row_as_dict(dict(zip(keys, row)))
+                         for row in result]
+            if serialize is not None:
+                serialize.attributes['rows'] = len(resources)
+        return resources
 
     def post(self):
         """Return response to HTTP POST request.
 
         :rtype flask.Response:
         """
-        resource = self.__model__.query.filter_by(**request.json).first()
+        resource = self.create(request.json)
+        if resource is None:
+            return self._no_content_response()
+        return self._created_response(resource)
+
+    def create(self, values):
+        """Create a resource of this type with the column *values*, unless
+        an identical one exists.
+
+        :param dict values: The resource's column values
+        :returns: The resource created, as a dictionary, or None if it
+                  already existed
+        :raises: :class:`sandman.exception.BadRequestException` if the
+                 database rejects the resource
+        """
+        if self.__model__.__group_commit__:
+            resource = committer(current_app, self.__model__).submit(values)
+            if resource is not None:
+                self._publish('created', lambda: resource)
+            return resource
+        shape = tuple(sorted(
+            (column, value is None) for column, value in values.items()))
+        resource = self._statement(
+            ('exists', shape), lambda: self._exists_query(shape))(
+                db.session()).params(**{
+                    column: value for column, value in values.items()
+                    if value is not None}).first()
         # resource already exists; don't create it again
         if resource:
-            return self._no_content_response()
+            return None
         instance = self.__model__(  # pylint: disable=not-callable
-            **request.json)
+            **values)
         db.session.add(instance)
         try:
             db.session.commit()
         except IntegrityError as exception:
             raise BadRequestException(str(exception))
-        return self._created_response(instance)
+        self._publish('created', instance.as_dict)
+        return instance.as_dict()
 
     def delete(self, resource_id):
         """Return response to HTTP DELETE request.
 
         :rtype flask.Response:
         """
+        self.remove(resource_id)
+        return self._no_content_response()
+
+    def remove(self, resource_id):
+        """Delete the resource with primary key *resource_id*.
+
+        :param resource_id: The primary key value of the resource
+        """
+        if self.__model__.__updated_at__:
+            # before the session holds the only writer connection of SQLite's
+            # production mode
+            ensure_tombstones(self._engine(writer=True))
         instance = self.resource(resource_id)
+        if self.__model__.__updated_at__:
+            record_delete(db.session.connection(), self.__model__, resource_id)
         db.session.delete(instance)
         db.session.commit()
-        return self._no_content_response()
+        self._publish('deleted', lambda: {'resource_id': resource_id})
 
     def put(self, resource_id):
         """Return response to HTTP PUT request.
@@ -128,12 +574,23 @@ class Service(MethodView):
         :param resource_id: Optional primary key value for resource.
         :rtype flask.Response:
         """
+        return jsonify(self.replace(resource_id, request.json))
+
+    def replace(self, resource_id, values):
+        """Replace the column values of the resource with primary key
+        *resource_id* by *values*, and return it as a dictionary.
+
+        :param resource_id: The primary key value of the resource
+        :param dict values: The resource's new column values
+        :rtype: dict
+        """
         instance = self.resource(resource_id)
-        instance.replace(request.json)
+        instance.replace(values)
         setattr(instance, instance.primary_key(), resource_id)
         db.session.add(instance)
         db.session.commit()
-        return jsonify(instance.as_dict())
+        self._publish('updated', instance.as_dict)
+        return instance.as_dict()
 
     def patch(self, resource_id):
         """Return response to HTTP PATCH request.
@@ -141,18 +598,209 @@ class Service(MethodView):
         :param resource_id: Optional primary key value for resource.
         :rtype flask.Response:
         """
+        return jsonify(self.update(resource_id, request.json))
+
+    def update(self, resource_id, values):
+        """Update the resource with primary key *resource_id* with the
+        column *values*, and return it as a dictionary.
+
+        :param resource_id: The primary key value of the resource
+        :param dict values: The column values to change
+        :rtype: dict
+        """
         resource = self.resource(resource_id)
-        resource.from_dict(request.json)
+        resource.from_dict(values)
         db.session.add(resource)
         db.session.commit()
-        return jsonify(resource.as_dict())
+        self._publish('updated', resource.as_dict)
+        return resource.as_dict()
+
+    def large_object(self, resource_id, column):
+        """Return a streamed response containing the value of the large object
+        *column* of the resource with primary key *resource_id*, honoring
+        any *Range* requested of a binary column (byte ranges don't map to
+        the character offsets text values are read by, so text values are
+        always returned whole).
+
+        :param resource_id: The primary key value of the resource
+        :param str column: The name of the large object column
+        :rtype flask.Response:
+        """
+        model = self.__model__
+        if column not in model.large_object_columns():
+            raise NotFoundException()
+        table = model.__table__
+        key = table.columns[model.primary_key()]
+        length = value_length(
+            db.session.connection(), table.columns[column], key, resource_id)
+        if length is None:
+            raise NotFoundException()
+        is_binary = isinstance(table.columns[column].type, LargeBinary)
+        start, stop, status_code = 0, length, 200
+        if is_binary and request.range is not None:
+            bounds = request.range.range_for_length(length)
+            if bounds is None:
+                raise RangeNotSatisfiableException(
+                    'Requested range not satisfiable', {'length': length})
+            (start, stop), status_code = bounds, 206
+        response = Response(
+            read_chunks(self._engine(), table.columns[column], key,
+                        resource_id, start, stop),
+            status=status_code,
+            mimetype='application/octet-stream' if is_binary else
+            'text/plain')
+        if is_binary:
+            response.headers['Accept-Ranges'] = 'bytes'
+            response.content_length = stop - start
+        if status_code == 206:
+            response.content_range = request.range.make_content_range(length)
+        return response
+
+    def events(self):
+        """Return a Server-Sent Events stream of the changes made to
+        resources of this type.
+
+        :rtype flask.Response:
+        """
+        response = Response(
+            broker.stream(self.__model__.__table__.name),
+            mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    def _publish(self, event_type, get_data):
+        """Publish a change event to the subscribers of this type's events.
+
+        :param str event_type: The type of the change
+        :param get_data: A callable returning the event's payload, only
+                         called if there are subscribers
+        """
+        topic = self.__model__.__table__.name
+        if broker.has_subscribers(topic):
+            broker.publish(topic, event_type, get_data())
 
     def resource(self, resource_id):
         """Return resource represented by this *resource_id*.
 
         :param resource_id: Optional primary key value for resource.
         """
-        return db.session.query(self.__model__).get(resource_id)
+        return self._statement('get', self._baked_query)(
+            db.session()).get(resource_id)
+
+    def _statement(self, shape, build):
+        """Return the cached statement for this service's model and the given
+        query *shape*, calling *build* to create it on a cache miss.
+
+        :param shape: A hashable description of the query
+        :param build: A callable returning the statement
+        """
+        return statement_cache.statement((self.__model__, shape), build)
+
+    def _baked_query(self):
+        """Return a baked query loading this service's model.
+
+        :rtype: :class:`sqlalchemy.ext.baked.BakedQuery`
+        """
+        model = self.__model__
+        options = self._deferred_columns()
+        return statement_cache.bakery(
+            lambda session: session.query(model).options(*options), model)
+
+    def _deferred_columns(self):
+        """Return the query options deferring the loading of the model's large
+        object columns.
+
+        :rtype: list
+        """
+        return [defer(name) for name in self.__model__.large_object_columns()]
+
+    def _exists_query(self, shape):
+        """Return a baked query finding a resource whose columns equal the
+        bound parameters described by *shape*.
+
+        :param tuple shape: ``(column, is_null)`` pairs, sorted by column
+        :rtype: :class:`sqlalchemy.ext.baked.BakedQuery`
+        """
+        query = self._baked_query()
+        query.add_criteria(lambda query: query.filter_by(**{
+            column: None if is_null else bindparam(column)
+            for column, is_null in shape}), shape)
+        return query
+
+    def _resource_statement(self):
+        """Return a Core statement selecting the resource whose primary key
+        equals the ``resource_id`` bound parameter."""
+        table = self.__model__.__table__
+        return select(self.__model__.inline_columns()).where(
+            table.columns[self.__model__.primary_key()] ==
+            bindparam('resource_id'))
+
+    def export(self):
+        """Return a streamed response containing every resource of this type,
+        in the format named by the ``format`` query parameter (``ndjson`` by
+        default), read concurrently in ``partitions`` primary key ranges (at
+        most :data:`sandman.bulk.MAX_PARTITIONS`).
+
+        :rtype flask.Response:
+        """
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in FORMATS:
+            raise BadRequestException(
+                'Unsupported export format {}'.format(fmt))
+        exporter = Exporter(
+            self._engine(), self.__model__.__table__, fmt,
+            partitions=self._count_arg('partitions', 4, MAX_PARTITIONS))
+        return Response(exporter, mimetype=FORMATS[fmt])
+
+    def import_resources(self):
+        """Load the resources in the request body, in the format named by the
+        ``format`` query parameter (``ndjson`` by default), and return a
+        summary of the import.
+
+        The body is parsed as it is read and written in batches of
+        ``batch_size`` rows, each committed in its own transaction.
+
+        :rtype flask.Response:
+        """
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in FORMATS:
+            raise BadRequestException(
+                'Unsupported import format {}'.format(fmt))
+        importer = Importer(
+            self._engine(writer=True), self.__model__.__table__, fmt,
+            batch_size=self._count_arg('batch_size', 5000))
+        try:
+            importer.load(codecs.getreader('utf-8')(request.stream))
+        except (BulkFormatError, IntegrityError) as exception:
+            raise BadRequestException(str(exception), {
+                'rows': importer.rows, 'batches': importer.batches})
+        return jsonify({
+            'rows': importer.rows,
+            'batches': importer.batches,
+            'seconds': importer.seconds,
+            })
+
+    def changes(self):
+        """Return up to ``limit`` resources changed since the ``since`` and
+        ``since_key`` watermarks and resources deleted since the
+        ``deleted_since`` watermark, along with the watermarks to use for the
+        next request (see :func:`sandman.changes.changes_since`).
+
+        :rtype flask.Response:
+        """
+        if not self.__model__.__updated_at__:
+            raise NotImplementedException(
+                '{} has no change feed'.format(self.__model__.__name__))
+        try:
+            feed = changes_since(
+                db.session.connection(), self.__model__,
+                request.args.get('since'), request.args.get('deleted_since'),
+                request.args.get('since_key'),
+                request.args.get('limit', DEFAULT_LIMIT))
+        except ValueError as exception:
+            raise BadRequestException(str(exception))
+        return jsonify(feed)
 
     def meta(self):
         """Return a description of the resource's fields and their associated
@@ -162,6 +810,44 @@ class Service(MethodView):
         """
         return jsonify(self.__model__.meta())
 
+    @staticmethod
+    def _engine(writer=False):
+        """Return the engine to read (or, if *writer*, write) this type's
+        table with directly, outside the request's session: the writer or a
+        reader engine of SQLite's production mode (see
+        :mod:`sandman.sqlite`), if it applies, or the application's engine.
+
+        :param bool writer: Whether the engine is written with
+        """
+        pair = engines(current_app)
+        if pair is None:
+            return db.get_engine(current_app)
+        return pair[0] if writer else pair[1]
+
+    @staticmethod
+    def _count_arg(name, default, maximum=None):
+        """Return the query parameter *name*, a positive number, or *default*
+        if it isn't given.
+
+        :param str name: The name of the query parameter
+        :param int default: The value if the parameter isn't given
+        :param int maximum: The largest value returned, if any
+        :rtype: int
+        :raises: :class:`sandman.exception.BadRequestException` if the value
+                 isn't a positive integer
+        """
+        value = request.args.get(name)
+        if value is None:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            value = 0
+        if value < 1:
+            raise BadRequestException(
+                '{} must be a positive integer'.format(name))
+        return value if maximum is None else min(value, maximum)
+
     @staticmethod
     def _no_content_response():
         """Return an HTTP 204 "No Content" response.
@@ -176,9 +862,10 @@ class Service(MethodView):
     def _created_response(resource):
         """Return an HTTP 201 "Created" response.
 
+        :param dict resource: The resource created
         :rtype flask.Response:
         """
-        response = jsonify(resource.as_dict())
+        response = jsonify(resource)
         response.status_code = 201
         return response
 
@@ -194,6 +881,7 @@ class Service(MethodView):
                                      field
         """
         view_func = cls.as_view(cls.__endpoint__)  # pylint: disable=no-member
+        cls.__model__.__url__ = cls.__url__
         methods = set(cls.__model__.__methods__)  # pylint: disable=no-member
         if 'GET' in methods:  # pylint: disable=no-member
             app.add_url_rule(
@@ -204,9 +892,14 @@ class Service(MethodView):
                 '{resource}/meta'.format(resource=cls.__url__),
                 view_func=view_func,
                 methods=['GET'])
+            cls._add_action_rule(app, 'export', ['GET'])
+            cls._add_action_rule(app, 'changes', ['GET'])
+            cls._add_action_rule(app, 'events', ['GET'])
         if 'POST' in methods:  # pylint: disable=no-member
             app.add_url_rule(
                 cls.__url__, view_func=view_func, methods=['POST', ])
+            cls._add_action_rule(
+                app, 'import', ['POST'], handler='import_resources')
 
         app.add_url_rule(
             '{resource}/<{pk_type}:{pk}>'.format(
@@ -214,3 +907,32 @@ class Service(MethodView):
                 pk=primary_key, pk_type=primary_key_type),
             view_func=view_func,
             methods=methods - set('POST'))
+        if 'GET' in methods:  # pylint: disable=no-member
+            cls._add_action_rule(
+                app, 'large_object', ['GET'],
+                rule='<{pk_type}:{pk}>/<column>'.format(
+                    pk=primary_key, pk_type=primary_key_type))
+
+    @classmethod
+    def _add_action_rule(cls, app, action, methods, handler=None, rule=None):
+        """Register the URL ``<__url__>/<action>``, handled by the service
+        method of the same name.
+
+        :param app: An instance of a Flask application object
+        :param str action: The name of the URL
+        :param list methods: The HTTP methods the URL accepts
+        :param str handler: The name of the service method handling the URL,
+                            if it differs from *action*
+        :param str rule: The URL rule to register under ``__url__``, if it
+                         differs from *action*
+        """
+        def view_func(**kwargs):
+            """Dispatch the request to the service's handler method."""
+            return getattr(cls(), handler or action)(**kwargs)
+        view_func.view_class = cls
+        app.add_url_rule(
+            '{resource}/{rule}'.format(
+                resource=cls.__url__, rule=rule or action),
+            '{endpoint}_{action}'.format(
+                endpoint=cls.__endpoint__, action=action),
+            view_func, methods=methods)
@@ -0,0 +1,378 @@
+"""Local snapshots of the tables of slow, remote or rate-limited databases,
+serving their GET requests without reading from those databases.
+
+For models whose :attr:`sandman.model.Model.__snapshot__` is set, the rows
+of the table (or of :attr:`sandman.model.Model.__snapshot_query__`) are
+copied into a SQLite database file of their own the first time the model is
+read, and GET requests (for resources, pages, aggregates...) are then
+served from that copy. Once the snapshot is older than ``__snapshot__``
+seconds, the next GET request starts a refresh in the background and is
+served from the current snapshot meanwhile, so no request waits for the
+source database but the first. A refresh copies the whole table again, or
+only the rows added or changed since the last refresh (see
+:attr:`sandman.model.Model.__snapshot_refresh__`); with timestamps, the
+deletes recorded in sandman's tombstones are applied as well.
+
+Responses served from a snapshot tell how stale they may be: the ``Age``
+header holds the number of seconds since the snapshot's data was read, and
+``X-Sandman-Snapshot-Time`` the time it was read at, in UTC.
+
+Snapshots are configured with the following application settings:
+
+    SANDMAN_SNAPSHOT_DIRECTORY: The directory of the snapshot files, or None
+        for a temporary directory (default: None)
+    SANDMAN_SNAPSHOT_BATCH_SIZE: The number of rows copied at a time
+        (default: 1000)
+    SANDMAN_SNAPSHOT_READERS: The number of read-only connections kept open
+        to each snapshot (default: 4)
+"""
+
+# Standard library imports
+import contextlib
+import datetime
+import itertools
+import os
+import tempfile
+import threading
+import time
+
+# Third-party imports
+from flask import current_app
+from sqlalchemy import cast, Column, func, MetaData, select, String, Table
+from sqlalchemy.sql import sqltypes
+
+# Application imports
+from sandman.changes import TOMBSTONE_TABLE, tombstones
+from sandman.model import db
+from sandman.sqlite import create_engines, DEFAULT_PRAGMAS
+
+REFRESH_MODES = ('full', 'key', 'timestamp')
+"""The ways snapshots are refreshed: by copying the whole table again, the
+rows with greater primary keys, or the rows changed since the last
+refresh."""
+
+_LOCK = threading.Lock()
+_NUMBERS = itertools.count()
+
+
+def _local_type(column_type):
+    """Return the generic type storing the values of *column_type* in
+    SQLite, or None if they can only be stored as text."""
+    # pylint: disable=protected-access
+    affinity = column_type._type_affinity
+    if affinity is None or affinity.__module__ != sqltypes.__name__ or (
+            affinity is sqltypes.NullType):
+        return None
+    try:
+        return affinity()
+    except TypeError:
+        return None
+
+
+class Snapshot(object):
+    """A local copy of the rows of a model's table.
+
+    :param source: The :class:`sqlalchemy.engine.Engine` of the table
+    :param model: The :class:`sandman.model.Model` class copied
+    :param str path: The path of the SQLite database file of the copy
+    :param int batch_size: The number of rows copied at a time
+    :param int readers: The number of read-only connections kept open
+
+    """
+
+    def __init__(self, source, model, path, batch_size=1000, readers=4):
+        if model.__snapshot_refresh__ not in REFRESH_MODES:
+            raise ValueError('Unknown snapshot refresh mode {!r}'.format(
+                model.__snapshot_refresh__))
+        self.source = source
+        self.model = model
+        self.path = path
+        self.batch_size = batch_size
+        self.writer, self.reader = create_engines(
+            path, DEFAULT_PRAGMAS, readers, 60)
+        self.table = Table(model.__table__.name, MetaData())
+        self._as_text = set()
+        for column in model.inline_columns():
+            column_type = _local_type(column.type)
+            if column_type is None:
+                column_type = String()
+                self._as_text.add(column.name)
+            self.table.append_column(Column(
+                column.name, column_type, primary_key=column.primary_key))
+        self.table.drop(self.writer, checkfirst=True)
+        self.table.create(self.writer)
+        self.refreshed = None
+        """The time (since the epoch) the snapshot's data was read at."""
+        self.refreshes = 0
+        """The number of refreshes done."""
+        self._watermark = None
+        self._deleted_watermark = 0
+        self._lock = threading.Lock()
+
+    @property
+    def age(self):
+        """The number of seconds since the snapshot's data was read."""
+        return time.time() - self.refreshed
+
+    @property
+    def refreshing(self):
+        """Whether a refresh is in progress."""
+        return self._lock.locked()
+
+    def refresh(self):
+        """Copy the rows of the table, or those added or changed since the
+        last refresh, into the snapshot, in a single local transaction."""
+        with self._lock:
+            started = time.time()
+            incremental = self.refreshed is not None and (
+                self.model.__snapshot_refresh__ != 'full')
+            watermarks = self._watermark, self._deleted_watermark
+            try:
+                with self.source.connect() as source, \
+                        self.writer.begin() as local:
+                    self._fill(source, local, incremental)
+            except Exception:
+                # the rows read were rolled back, so read them again next time
+                self._watermark, self._deleted_watermark = watermarks
+                raise
+            self.refreshed = started
+            self.refreshes += 1
+
+    def _fill(self, source, local, incremental):
+        """Copy the rows to copy from the *source* connection to the *local*
+        one."""
+        if not incremental:
+            local.execute(self.table.delete())
+        result = source.execution_options(stream_results=True).execute(
+            self._source_statement(local, incremental))
+        keys = result.keys()
+        while True:
+            rows = result.fetchmany(self.batch_size)
+            if not rows:
+                break
+            self._copy(
+                local, [dict(zip(keys, row)) for row in rows], incremental)
+        if self.model.__snapshot_refresh__ == 'timestamp':
+            self._apply_deletes(source, local)
+
+    def _source_statement(self, local, incremental):
+        """Return the statement reading the rows to copy from the source."""
+        model = self.model
+        table = model.__table__
+        if model.__snapshot_query__ is not None:
+            statement = model.__snapshot_query__(table)
+        else:
+            statement = select(model.inline_columns())
+        if not incremental:
+            return statement
+        if model.__snapshot_refresh__ == 'key':
+            key = table.columns[model.primary_key()]
+            largest = local.execute(select([func.max(
+                self.table.columns[key.name])])).scalar()
+            return statement if largest is None else statement.where(
+                key > largest)
+        if self._watermark is None:
+            return statement
+        # rows changed in the same instant as the last ones copied may have
+        # been committed since
+        return statement.where(
+            table.columns[model.__updated_at__] >= self._watermark)
+
+    def _copy(self, local, rows, incremental):
+        """Insert (or replace, if *incremental*) *rows* in the snapshot."""
+        for row in rows:
+            for column in self._as_text:
+                if row[column] is not None:
+                    row[column] = str(row[column])
+        if incremental:
+            key = self.table.columns[self.model.primary_key()]
+            local.execute(self.table.delete().where(
+                key.in_([row[key.name] for row in rows])))
+        local.execute(self.table.insert(), rows)
+        if self.model.__snapshot_refresh__ == 'timestamp':
+            column = self.model.__updated_at__
+            changed = [row[column] for row in rows if row[column] is not None]
+            if changed and (self._watermark is None or
+                            max(changed) > self._watermark):
+                self._watermark = max(changed)
+
+    def _apply_deletes(self, source, local):
+        """Delete the resources whose deletion sandman recorded since the last
+        refresh from the snapshot."""
+        if not source.dialect.has_table(source, TOMBSTONE_TABLE):
+            return
+        key = self.table.columns[self.model.primary_key()]
+        for row in source.execute(select([tombstones]).where(
+                (tombstones.c.table_name == self.model.__table__.name) &
+                (tombstones.c.id > self._deleted_watermark)).order_by(
+                    tombstones.c.id)):
+            local.execute(self.table.delete().where(
+                cast(key, String) == row.resource_id))
+            self._deleted_watermark = row.id
+
+    def refresh_in_background(self, app):
+        """Refresh the snapshot on a thread of its own, unless a refresh is
+        in progress.
+
+        :param app: The Flask application object logging failures
+        """
+        def run():
+            """Refresh the snapshot, logging failures."""
+            try:
+                self.refresh()
+            except Exception:  # pylint: disable=broad-except
+                app.logger.exception(
+                    'Refreshing the snapshot of %s failed',
+                    self.model.__table__.name)
+
+        if self.refreshing:
+            return
+        thread = threading.Thread(
+            target=run,
+            name='sandman-snapshot-{}'.format(self.model.__table__.name))
+        thread.daemon = True
+        thread.start()
+
+    @contextlib.contextmanager
+    def bound(self, session):
+        """Bind *session* to the snapshot for the duration of the context, so
+        statements about the model read from it.
+
+        :param session: A :class:`sqlalchemy.orm.session.Session`
+        """
+        schema = self.model.__table__.schema
+        reader = self.reader
+        if schema is not None:
+            reader = reader.execution_options(
+                schema_translate_map={schema: None})
+        bind = session.bind
+        session.bind = reader
+        try:
+            yield
+        finally:
+            session.bind = bind
+
+    def close(self):
+        """Close the snapshot's connections and delete its database file."""
+        self.writer.dispose()
+        self.reader.dispose()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.unlink(self.path + suffix)
+
+
+def snapshot(app, model):
+    """Return the snapshot of *model* in *app*, up to date enough, or None if
+    *model* isn't served from a snapshot.
+
+    The snapshot is created, and filled from the source database, on first
+    use; afterwards, a snapshot older than the model's interval is
+    refreshed in the background.
+
+    :param app: An instance of a Flask application object
+    :param model: A :class:`sandman.model.Model` class
+    :rtype: :class:`Snapshot`
+    """
+    return _snapshot(app, model)[0]
+
+
+def _snapshot(app, model):
+    """Return the snapshot of *model* in *app* (or None) and the time its
+    data was read at, as of before any refresh :func:`snapshot` starts."""
+    if not model.__snapshot__:
+        return None, None
+    snapshots = app.extensions['sandman_snapshots']
+    if model not in snapshots:
+        with _LOCK:
+            lock = app.extensions['sandman_snapshot_locks'].setdefault(
+                model, threading.Lock())
+        # the first fill of a model's snapshot only holds up the requests
+        # for that model
+        with lock:
+            if model not in snapshots:
+                snapshots[model] = _create(app, model)
+        found = snapshots[model]
+        return found, found.refreshed
+    found = snapshots[model]
+    refreshed = found.refreshed
+    if time.time() - refreshed >= model.__snapshot__:
+        found.refresh_in_background(app)
+    return found, refreshed
+
+
+def _create(app, model):
+    """Return a new snapshot of *model* in *app*, filled from the source
+    database."""
+    with _LOCK:
+        directory = app.config['SANDMAN_SNAPSHOT_DIRECTORY']
+        if directory is None:
+            directory = app.config['SANDMAN_SNAPSHOT_DIRECTORY'] = (
+                tempfile.mkdtemp(prefix='sandman-snapshots-'))
+        number = next(_NUMBERS)
+    created = Snapshot(
+        db.get_engine(app), model, os.path.join(
+            directory, '{}.{}.sqlite3'.format(model.__table__.name, number)),
+        app.config['SANDMAN_SNAPSHOT_BATCH_SIZE'],
+        app.config['SANDMAN_SNAPSHOT_READERS'])
+    try:
+        created.refresh()
+    except Exception:
+        created.close()
+        raise
+    return created
+
+
+def current_snapshot(model):
+    """Return the snapshot of *model* in the current application, or None if
+    *model* isn't served from a snapshot.
+
+    :param model: A :class:`sandman.model.Model` class
+    :rtype: :class:`Snapshot`
+    """
+    return snapshot(current_app._get_current_object(), model)
+
+
+@contextlib.contextmanager
+def reading(model):
+    """Bind the session to the snapshot of *model* for the duration of the
+    context, if *model* is served from a snapshot, and yield the time (since
+    the epoch) the snapshot's data was read at when the context started, or
+    None.
+
+    A refresh completing within the context may make the data read newer
+    than that time, never older, so the staleness reported from it is an
+    upper bound.
+
+    :param model: A :class:`sandman.model.Model` class
+    """
+    found, refreshed = _snapshot(current_app._get_current_object(), model)
+    if found is None:
+        yield None
+        return
+    with found.bound(db.session()):
+        yield refreshed
+
+
+def add_headers(response, refreshed):
+    """Tell how stale the data of *response*, served from a snapshot whose
+    data was read at the time *refreshed* (since the epoch), may be in its
+    headers.
+
+    :param response: A :class:`flask.Response`
+    :param float refreshed: The value yielded by :func:`reading`
+    """
+    response.headers['Age'] = str(max(0, int(time.time() - refreshed)))
+    response.headers['X-Sandman-Snapshot-Time'] = (
+        datetime.datetime.utcfromtimestamp(refreshed).isoformat() + 'Z')
+
+
+def register_snapshots(app):
+    """Register the snapshots of the models served from them with *app*.
+
+    :param app: An instance of a Flask application object
+    """
+    app.config.setdefault('SANDMAN_SNAPSHOT_DIRECTORY', None)
+    app.config.setdefault('SANDMAN_SNAPSHOT_BATCH_SIZE', 1000)
+    app.config.setdefault('SANDMAN_SNAPSHOT_READERS', 4)
+    app.extensions['sandman_snapshots'] = {}
+    app.extensions['sandman_snapshot_locks'] = {}
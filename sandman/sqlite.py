@@ -0,0 +1,169 @@
+"""A production mode for SQLite databases, in which reads never wait for
+writes.
+
+In this mode every connection is tuned with pragmas (write-ahead logging
+above all, so readers see a consistent snapshot while a write is in
+progress), and each request's session is bound to one of two engines: safe
+requests (``GET``, ``HEAD`` and ``OPTIONS``) use a pool of read-only
+connections, other requests share a single writer connection, so writes are
+serialized by the pool instead of failing with "database is locked".
+
+The mode is configured with the following application settings:
+
+    SANDMAN_SQLITE_TUNING: Whether the mode is enabled (default: False);
+        it only applies to SQLite database files
+    SANDMAN_SQLITE_PRAGMAS: The pragmas applied to every connection, as a
+        dictionary (default: :data:`DEFAULT_PRAGMAS`)
+    SANDMAN_SQLITE_READERS: The number of read-only connections kept open
+        (default: 8)
+    SANDMAN_SQLITE_WRITE_TIMEOUT: The time a request waits for the writer
+        connection, in seconds (default: 30)
+"""
+
+# Standard library imports
+import sqlite3
+import threading
+
+# Third-party imports
+from flask import current_app, request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
+
+# Application imports
+from sandman.model import db
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'busy_timeout': 5000,
+    }
+"""The pragmas applied unless ``SANDMAN_SQLITE_PRAGMAS`` is set: write-ahead
+logging, syncing only at checkpoints (safe with WAL), a 64MB page cache,
+256MB of memory-mapped I/O and waiting up to 5s for locks."""
+
+WRITER_ONLY_PRAGMAS = ('journal_mode', 'synchronous')
+"""The pragmas which only the writer connection applies: they change the
+database file, which read-only connections can't do."""
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+"""The methods of the requests served by read-only connections."""
+
+_LOCK = threading.Lock()
+
+
+def database_path(uri):
+    """Return the path of the SQLite database file at *uri*, or None if
+    *uri* isn't a SQLite file database.
+
+    :param str uri: A SQLAlchemy database URI
+    :rtype: str
+    """
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite' or url.database in (
+            None, '', ':memory:'):
+        return None
+    return url.database
+
+
+def _apply_pragmas(connection, pragmas):
+    """Execute the ``PRAGMA`` statements of *pragmas* on the DB-API
+    *connection*."""
+    cursor = connection.cursor()
+    for name, value in sorted(pragmas.items()):
+        cursor.execute('PRAGMA {} = {}'.format(name, value))
+    cursor.close()
+
+
+def create_engines(path, pragmas, readers, write_timeout):
+    """Return the writer and reader engines of the SQLite database at
+    *path*.
+
+    :param str path: The path of the database file
+    :param dict pragmas: The pragmas applied to every connection
+    :param int readers: The number of read-only connections kept open
+                        (more are opened during bursts)
+    :param float write_timeout: The time to wait for the writer connection
+    :rtype: tuple
+    """
+    def connect_writer():
+        """Open the writer connection."""
+        return sqlite3.connect(path, check_same_thread=False)
+
+    def connect_reader():
+        """Open a read-only connection."""
+        return sqlite3.connect('file:{}?mode=ro'.format(path), uri=True,
+                               check_same_thread=False)
+
+    writer = create_engine(
+        'sqlite+pysqlite://', creator=connect_writer, poolclass=QueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=write_timeout)
+    reader = create_engine(
+        'sqlite+pysqlite://', creator=connect_reader, poolclass=QueuePool,
+        pool_size=readers)
+    reader_pragmas = dict(
+        (name, value) for name, value in pragmas.items()
+        if name not in WRITER_ONLY_PRAGMAS)
+    reader_pragmas['query_only'] = 1
+
+    @event.listens_for(writer, 'connect')
+    def tune_writer(connection, record):  # pylint: disable=unused-variable
+        """Apply the pragmas to the writer connection."""
+        # pylint: disable=unused-argument
+        _apply_pragmas(connection, pragmas)
+
+    @event.listens_for(reader, 'connect')
+    def tune_reader(connection, record):  # pylint: disable=unused-variable
+        """Apply the pragmas to a read-only connection."""
+        # pylint: disable=unused-argument
+        _apply_pragmas(connection, reader_pragmas)
+
+    # switch the file to write-ahead logging before any reader opens it
+    writer.connect().close()
+    return writer, reader
+
+
+def engines(app):
+    """Return the writer and reader engines of *app*, creating them on first
+    use, or None if the mode doesn't apply to *app*.
+
+    :param app: An instance of a Flask application object
+    :rtype: tuple
+    """
+    config = app.config
+    if not config['SANDMAN_SQLITE_TUNING']:
+        return None
+    path = database_path(config['SQLALCHEMY_DATABASE_URI'])
+    if path is None:
+        return None
+    with _LOCK:
+        if 'sandman_sqlite' not in app.extensions:
+            app.extensions['sandman_sqlite'] = create_engines(
+                path, config['SANDMAN_SQLITE_PRAGMAS'],
+                config['SANDMAN_SQLITE_READERS'],
+                config['SANDMAN_SQLITE_WRITE_TIMEOUT'])
+    return app.extensions['sandman_sqlite']
+
+
+def bind_session():
+    """Bind the request's session to the reader engine if the request is
+    safe, or to the writer engine otherwise."""
+    pair = engines(current_app)
+    if pair is None:
+        return
+    writer, reader = pair
+    db.session().bind = reader if request.method in SAFE_METHODS else writer
+
+
+def register_sqlite(app):
+    """Register the SQLite production mode with *app*.
+
+    :param app: An instance of a Flask application object
+    """
+    app.config.setdefault('SANDMAN_SQLITE_TUNING', False)
+    app.config.setdefault('SANDMAN_SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+    app.config.setdefault('SANDMAN_SQLITE_READERS', 8)
+    app.config.setdefault('SANDMAN_SQLITE_WRITE_TIMEOUT', 30)
+    app.before_request(bind_session)
@@ -0,0 +1,403 @@
+"""Span-based tracing of requests, showing where a single request spends its
+time: routing, waiting for a pooled connection, each SQL statement,
+serialization and writing the response body.
+
+Traces continue the W3C Trace Context of the caller, read from the
+``traceparent`` request header, so sandman's spans can be correlated with
+the caller's; the ``traceresponse`` response header names the request's
+span. Each finished trace is written as one line of OTLP/JSON (the
+``ExportTraceServiceRequest`` JSON encoding), which OpenTelemetry collectors
+and most tracing backends can ingest.
+
+Tracing is configured with the following application settings:
+
+    SANDMAN_TRACE_EXPORT: The file traces are appended to, ``-`` for
+        standard output, or None to disable tracing (default: None)
+    SANDMAN_TRACE_RATE: The fraction of requests traced, unless the caller's
+        trace context says whether to trace (default: 1.0)
+    SANDMAN_TRACE_SERVICE_NAME: The ``service.name`` of the traces
+        (default: ``sandman``)
+"""
+
+# Standard library imports
+import binascii
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+# Third-party imports
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Application imports
+from sandman.dispatch import request_service
+from sandman.model import db
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_CODE_ERROR = 2
+
+TRACEPARENT = re.compile(
+    r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+"""The format of version 00 of the ``traceparent`` header."""
+
+_TRACE = 'sandman.trace'
+_SPANS = 'sandman_spans'
+
+
+def _random_id(size):
+    """Return a random identifier of *size* bytes as hexadecimal."""
+    return binascii.hexlify(os.urandom(size)).decode('ascii')
+
+
+class Span(object):
+    """A timed operation of a trace.
+
+    :param str name: What the operation is
+    :param str parent_id: The id of the enclosing span, if any
+    :param int kind: The OTLP span kind
+    :param dict attributes: Attributes describing the operation
+
+    """
+
+    def __init__(self, name, parent_id=None, kind=SPAN_KIND_INTERNAL,
+                 attributes=None):
+        self.name = name
+        self.span_id = _random_id(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.start = int(time.time() * 1e9)
+        self.end = None
+        self.error = None
+
+    def finish(self, error=None):
+        """Record the end of the operation.
+
+        :param str error: A description of the error it failed with, if any
+        """
+        self.end = int(time.time() * 1e9)
+        self.error = error
+
+    def as_otlp(self, trace_id):
+        """Return the span as an OTLP/JSON ``Span``.
+
+        :param str trace_id: The id of the span's trace
+        :rtype: dict
+        """
+        otlp = {
+            'traceId': trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end),
+            'attributes': _otlp_attributes(self.attributes),
+            'status': {},
+            }
+        if self.parent_id:
+            otlp['parentSpanId'] = self.parent_id
+        if self.error:
+            otlp['status'] = {'code': STATUS_CODE_ERROR,
+                              'message': self.error}
+        return otlp
+
+
+class Trace(object):
+    """The spans of a single request, nested as they are started and
+    finished.
+
+    :param str trace_id: The id of the trace, if continuing a caller's
+    :param str parent_id: The id of the caller's span, if any
+
+    """
+
+    def __init__(self, trace_id=None, parent_id=None):
+        self.trace_id = trace_id or _random_id(16)
+        self.spans = []
+        self.routing = None
+        """The span of the request's routing, until it is finished."""
+        self._open = [parent_id] if parent_id else []
+
+    def start(self, name, kind=SPAN_KIND_INTERNAL, **attributes):
+        """Start a span nested in the innermost open span, and return it.
+
+        :param str name: What the operation is
+        :param int kind: The OTLP span kind
+        :rtype: :class:`Span`
+        """
+        started = Span(name, self._open[-1] if self._open else None, kind,
+                       attributes)
+        self.spans.append(started)
+        self._open.append(started.span_id)
+        return started
+
+    def finish(self, started, error=None):
+        """Finish the span *started*.
+
+        :param started: A span returned by :meth:`start`
+        :param str error: A description of the error it failed with, if any
+        """
+        started.finish(error)
+        self._open.remove(started.span_id)
+
+    def as_otlp(self, service_name):
+        """Return the trace as an OTLP/JSON ``ExportTraceServiceRequest``.
+
+        :param str service_name: The name of the traced service
+        :rtype: dict
+        """
+        return {'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes(
+                {'service.name': service_name})},
+            'scopeSpans': [{
+                'scope': {'name': 'sandman'},
+                'spans': [started.as_otlp(self.trace_id)
+                          for started in self.spans
+                          if started.end is not None],
+                }],
+            }]}
+
+
+def _otlp_attributes(attributes):
+    """Return *attributes* as a list of OTLP/JSON ``KeyValue``."""
+    values = []
+    for key, value in sorted(attributes.items()):
+        if isinstance(value, bool):
+            value = {'boolValue': value}
+        elif isinstance(value, int):
+            value = {'intValue': str(value)}
+        elif isinstance(value, float):
+            value = {'doubleValue': value}
+        else:
+            value = {'stringValue': str(value)}
+        values.append({'key': key, 'value': value})
+    return values
+
+
+class JsonLinesExporter(object):
+    """Writes each trace as a line of OTLP/JSON to a file or to standard
+    output.
+
+    :param str destination: The path of the file, or ``-``
+
+    """
+
+    def __init__(self, destination):
+        self.destination = destination
+        self._lock = threading.Lock()
+
+    def export(self, trace, service_name):
+        """Write *trace*.
+
+        :param trace: A finished :class:`Trace`
+        :param str service_name: The name of the traced service
+        """
+        line = json.dumps(trace.as_otlp(service_name), sort_keys=True) + '\n'
+        with self._lock:
+            if self.destination == '-':
+                sys.stdout.write(line)
+                sys.stdout.flush()
+            else:
+                with io.open(self.destination, 'a', encoding='utf-8') as out:
+                    out.write(type(u'')(line))
+
+
+def current_trace():
+    """Return the trace of the current request, or None if it isn't traced.
+
+    :rtype: :class:`Trace`
+    """
+    if not has_request_context():
+        return None
+    return request.environ.get(_TRACE)
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """Return a context manager recording a span around its block if the
+    current request is traced, yielding the :class:`Span` (or None).
+
+    :param str name: What the operation is
+    """
+    trace = current_trace()
+    if trace is None:
+        yield None
+        return
+    traced = trace.start(name, **attributes)
+    try:
+        yield traced
+    except Exception as exception:
+        trace.finish(traced, error=repr(exception))
+        raise
+    trace.finish(traced)
+
+
+class TracingMiddleware(object):
+    """WSGI middleware starting the trace of each sampled request and
+    exporting it once its response has been written.
+
+    :param app: An instance of a Flask application object
+
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        self._exporters = {}
+
+    def __call__(self, environ, start_response):
+        config = self.app.config
+        if not config['SANDMAN_TRACE_EXPORT']:
+            return self.wsgi_app(environ, start_response)
+        match = TRACEPARENT.match(environ.get('HTTP_TRACEPARENT', ''))
+        if match:
+            if not int(match.group(3), 16) & 1:
+                return self.wsgi_app(environ, start_response)
+            trace = Trace(match.group(1), match.group(2))
+        elif random.random() < config['SANDMAN_TRACE_RATE']:
+            trace = Trace()
+        else:
+            return self.wsgi_app(environ, start_response)
+
+        root = trace.start(
+            '{} {}'.format(environ['REQUEST_METHOD'], environ['PATH_INFO']),
+            kind=SPAN_KIND_SERVER, **{
+                'http.method': environ['REQUEST_METHOD'],
+                'http.target': environ['PATH_INFO'],
+                })
+        trace.routing = trace.start('flask.routing')
+        environ[_TRACE] = trace
+
+        def traced_start_response(status, headers, exc_info=None):
+            """Record the status and name the request's span."""
+            root.attributes['http.status_code'] = int(status.split()[0])
+            headers = list(headers) + [('traceresponse', '00-{}-{}-01'.format(
+                trace.trace_id, root.span_id))]
+            return start_response(status, headers, exc_info)
+
+        try:
+            body = self.wsgi_app(environ, traced_start_response)
+        except Exception as exception:
+            trace.finish(root, error=repr(exception))
+            self._export(trace)
+            raise
+        return TracedBody(body, trace, root, self._export)
+
+    def _export(self, trace):
+        """Export a finished *trace* as configured."""
+        destination = self.app.config['SANDMAN_TRACE_EXPORT']
+        if destination not in self._exporters:
+            self._exporters[destination] = JsonLinesExporter(destination)
+        self._exporters[destination].export(
+            trace, self.app.config['SANDMAN_TRACE_SERVICE_NAME'])
+
+
+class TracedBody(object):
+    """Iterates over a response body within a span, finishing the trace once
+    the body has been written.
+
+    :param body: The WSGI application's response body
+    :param trace: The request's :class:`Trace`
+    :param root: The request's :class:`Span`
+    :param export: A callable exporting the finished trace
+
+    """
+
+    def __init__(self, body, trace, root, export):
+        self.body = body
+        self.trace = trace
+        self.root = root
+        self.export = export
+        self.written = 0
+        self._write = None
+
+    def __iter__(self):
+        self._write = self.trace.start('response.write')
+        for chunk in self.body:
+            self.written += len(chunk)
+            yield chunk
+
+    def close(self):
+        """Close the body and export the trace."""
+        if hasattr(self.body, 'close'):
+            self.body.close()
+        if self._write is not None:
+            self._write.attributes['http.response_content_length'] = (
+                self.written)
+            self.trace.finish(self._write)
+        self.trace.finish(self.root)
+        self.export(self.trace)
+
+
+def finish_routing():
+    """Finish the routing span of a traced request and, for service
+    requests, time the wait for a pooled database connection."""
+    trace = current_trace()
+    if trace is None or trace.routing is None:
+        return
+    trace.routing.attributes['http.route'] = (
+        request.url_rule.rule if request.url_rule else '')
+    trace.finish(trace.routing)
+    trace.routing = None
+    if getattr(request_service(), '__model__', None):
+        with span('db.pool.wait'):
+            db.session.connection()
+
+
+def _before_cursor_execute(  # pylint: disable=too-many-arguments
+        connection, cursor, statement, parameters, context, executemany):
+    """Start the span of a statement executed for a traced request."""
+    trace = current_trace()
+    if trace is not None:
+        connection.info.setdefault(_SPANS, []).append((trace, trace.start(
+            'sql', kind=SPAN_KIND_CLIENT, **{
+                'db.system': connection.dialect.name,
+                'db.statement': statement,
+                })))
+
+
+def _after_cursor_execute(  # pylint: disable=too-many-arguments
+        connection, cursor, statement, parameters, context, executemany):
+    """Finish the span of a statement executed for a traced request."""
+    spans = connection.info.get(_SPANS)
+    if spans:
+        trace, statement_span = spans.pop()
+        if cursor.rowcount >= 0:
+            statement_span.attributes['db.rows_affected'] = cursor.rowcount
+        trace.finish(statement_span)
+
+
+def _handle_error(context):
+    """Finish the span of a statement which failed."""
+    spans = context.connection.info.get(_SPANS) if (
+        context.connection is not None) else None
+    if spans and context.cursor is not None:
+        trace, statement_span = spans.pop()
+        trace.finish(statement_span, error=repr(context.original_exception))
+
+
+def register_tracing(app):
+    """Trace the requests served by *app* as configured.
+
+    :param app: An instance of a Flask application object
+    """
+    app.config.setdefault('SANDMAN_TRACE_EXPORT', None)
+    app.config.setdefault('SANDMAN_TRACE_RATE', 1.0)
+    app.config.setdefault('SANDMAN_TRACE_SERVICE_NAME', 'sandman')
+    app.wsgi_app = TracingMiddleware(app)
+    app.before_request(finish_routing)
+    if not event.contains(
+            Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
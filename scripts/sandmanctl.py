@@ -1,17 +1,39 @@
 #! /usr/bin/env python
 """sandmanctl is a command-line script used to create a RESTful API service
-from a legacy database without requiring the writing of code."""
+from a legacy database without requiring the writing of code.
+
+Besides serving the API (the default), it provides the following commands:
+
+    export: Write a whole table to a file in a bulk format
+    import: Load a file in a bulk format into a table
+    index: Build, optimize or drop a table's full-text search index
+    bench: Put a running service under load and report its performance
+"""
 
 # Standard library imports
 import argparse
+import io
+import json
+import signal
 import sys
 
+# Third-party imports
+from sqlalchemy import create_engine, MetaData, Table
+
 # Application imports
 from sandman import reflect_all_app
+from sandman.bulk import BulkFormatError, Exporter, FORMATS, Importer
+from sandman.loadgen import LoadGenerator
+from sandman.reflection import DEFAULT_WORKERS
+from sandman.schema import reload_in_background
+from sandman.search import build_index, drop_index, optimize_index
 
 
 def main():
     """Main entry point for script."""
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        return COMMANDS[sys.argv[1]](sys.argv[2:])
+
     arguments = argparse.ArgumentParser(
         description='Start an auto-generated REST API for an existing'
         'database')
@@ -26,11 +48,232 @@ def main():
     arguments.add_argument(
         '-m', '--host', default='0.0.0.0', required=False,
         help='Hostname for the sandman API service to serve on.')
+    arguments.add_argument(
+        '--sqlite-tuning', action='store_true',
+        help='Serve a SQLite database file with write-ahead logging, a pool '
+        'of read-only connections and a single writer connection.')
+
+    arguments.add_argument(
+        '-s', '--schema', action='append', dest='schemas',
+        help='A schema to serve the tables of (may be repeated; the '
+        'default schema by default).')
+    arguments.add_argument(
+        '-t', '--table', action='append', dest='tables',
+        help='A shell-style pattern of the names of the tables to serve, '
+        'e.g. "invoice*" (may be repeated; all tables by default).')
+    arguments.add_argument(
+        '--reflection-workers', default=DEFAULT_WORKERS, type=int,
+        help='The number of tables reflected at the same time.')
+    arguments.add_argument(
+        '--single-rule', action='store_true',
+        help='Route requests to every table through a single URL rule, '
+        'for databases with thousands of tables.')
+    arguments.add_argument(
+        '--admin', default='lazy', choices=['eager', 'lazy', 'none'],
+        help='Build the admin views of all tables at startup, of each table '
+        'when first visited (the default), or serve no admin interface.')
+    arguments.add_argument(
+        '--schema-reload-interval', type=float,
+        help='Check for created and altered tables every given number of '
+        'seconds (they are also checked for on SIGHUP).')
 
     args = arguments.parse_args()
 
-    app = reflect_all_app(args.URI)
-    app.run(args.host, args.port)
+    app = reflect_all_app(
+        args.URI, args.schemas, args.tables, args.reflection_workers,
+        args.single_rule, None if args.admin == 'none' else args.admin)
+    app.config['SANDMAN_SQLITE_TUNING'] = args.sqlite_tuning
+    app.config['SANDMAN_SCHEMA_RELOAD_INTERVAL'] = args.schema_reload_interval
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP,
+                      lambda signum, frame: reload_in_background(app))
+    # event streams hold their connection open, so serve each request on
+    # its own thread
+    app.run(args.host, args.port, threaded=True)
+
+
+def _reflect_table(uri, name):
+    """Return the engine for *uri* and the reflected table called *name*."""
+    engine = create_engine(uri)
+    return engine, Table(name, MetaData(), autoload=True, autoload_with=engine)
+
+
+def export(argv):
+    """Export a table in a bulk format."""
+    arguments = argparse.ArgumentParser(
+        prog='sandmanctl export',
+        description='Export every row of a table as NDJSON or CSV')
+    arguments.add_argument('URI', help='The URI of the database.')
+    arguments.add_argument('table', help='The name of the table to export.')
+    arguments.add_argument(
+        '-f', '--format', default='ndjson', choices=sorted(FORMATS),
+        help='The output format.')
+    arguments.add_argument(
+        '-o', '--output', default='-',
+        help='The file to write to (standard output by default).')
+    arguments.add_argument(
+        '-j', '--partitions', default=4, type=int,
+        help='The number of primary key ranges to read concurrently.')
+    arguments.add_argument(
+        '-b', '--batch-size', default=1000, type=int,
+        help='The number of rows to fetch at a time.')
+    args = arguments.parse_args(argv)
+
+    engine, table = _reflect_table(args.URI, args.table)
+    exporter = Exporter(
+        engine, table, args.format, args.partitions, args.batch_size,
+        workers=args.partitions)
+    if args.output == '-':
+        output = sys.stdout
+    else:
+        output = io.open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        for chunk in exporter:
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    sys.stderr.write('Exported {} rows in {:.2f}s ({:.0f} rows/sec)\n'.format(
+        exporter.rows, exporter.seconds, exporter.rows_per_second))
+
+
+def import_(argv):
+    """Import a file in a bulk format into a table."""
+    arguments = argparse.ArgumentParser(
+        prog='sandmanctl import',
+        description='Load NDJSON or CSV rows into a table')
+    arguments.add_argument('URI', help='The URI of the database.')
+    arguments.add_argument('table', help='The name of the table to load.')
+    arguments.add_argument(
+        '-f', '--format', default='ndjson', choices=sorted(FORMATS),
+        help='The input format.')
+    arguments.add_argument(
+        '-i', '--input', default='-',
+        help='The file to read from (standard input by default).')
+    arguments.add_argument(
+        '-b', '--batch-size', default=5000, type=int,
+        help='The number of rows to write per transaction.')
+    args = arguments.parse_args(argv)
+
+    def progress(importer):
+        """Report the import's progress."""
+        sys.stderr.write('{} rows ({:.0f} rows/sec)\n'.format(
+            importer.rows, importer.rows_per_second))
+
+    engine, table = _reflect_table(args.URI, args.table)
+    importer = Importer(
+        engine, table, args.format, args.batch_size, progress=progress)
+    if args.input == '-':
+        source = sys.stdin
+    else:
+        source = io.open(args.input, encoding='utf-8', newline='')
+    try:
+        importer.load(source)
+    except BulkFormatError as exception:
+        sys.stderr.write('Import failed at {}\n'.format(exception))
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    sys.stderr.write('Imported {} rows in {:.2f}s ({:.0f} rows/sec)\n'.format(
+        importer.rows, importer.seconds, importer.rows_per_second))
+
+
+def index(argv):
+    """Build, optimize or drop a table's full-text search index."""
+    arguments = argparse.ArgumentParser(
+        prog='sandmanctl index',
+        description='Maintain the full-text index searched by the q query '
+        'parameter')
+    arguments.add_argument('URI', help='The URI of the database.')
+    arguments.add_argument('table', help='The name of the table to index.')
+    arguments.add_argument(
+        '-c', '--column', action='append', dest='columns', default=[],
+        help='A text column to index (may be repeated).')
+    action = arguments.add_mutually_exclusive_group()
+    action.add_argument(
+        '--optimize', action='store_true',
+        help='Optimize the existing index instead of building it.')
+    action.add_argument(
+        '--drop', action='store_true', help='Drop the index.')
+    args = arguments.parse_args(argv)
+
+    engine, table = _reflect_table(args.URI, args.table)
+    if args.drop:
+        drop_index(engine, table)
+    elif args.optimize:
+        optimize_index(engine, table)
+    else:
+        if not args.columns:
+            arguments.error('at least one --column is required')
+        try:
+            build_index(engine, table, args.columns)
+        except ValueError as exception:
+            sys.stderr.write('{}\n'.format(exception))
+            return 1
+    sys.stderr.write('Done\n')
+
+
+def bench(argv):
+    """Put a running service under load and report its performance."""
+    arguments = argparse.ArgumentParser(
+        prog='sandmanctl bench',
+        description='Send a mix of reads and writes to a running sandman '
+        'service and report throughput, latency and errors per endpoint')
+    arguments.add_argument(
+        'URL', help='The URL of the service, e.g. http://localhost:5000.')
+    arguments.add_argument(
+        '-r', '--resource', action='append', dest='resources',
+        help='A resource to load, by name or URL (may be repeated; all by '
+        'default).')
+    arguments.add_argument(
+        '-c', '--concurrency', default=8, type=int,
+        help='The number of concurrent connections.')
+    arguments.add_argument(
+        '-d', '--duration', default=10.0, type=float,
+        help='The duration of the run, in seconds.')
+    arguments.add_argument(
+        '-n', '--requests', default=None, type=int,
+        help='The maximum number of requests of the run.')
+    arguments.add_argument(
+        '-w', '--writes', default=0.1, type=float,
+        help='The fraction of requests which are writes (0 to 1).')
+    arguments.add_argument(
+        '--json', action='store_true',
+        help='Write the results as JSON instead of a table.')
+    args = arguments.parse_args(argv)
+
+    generator = LoadGenerator(
+        args.URL, args.resources, args.concurrency, args.duration,
+        args.requests, args.writes)
+    try:
+        results = generator.run()
+    except (ValueError, IOError) as exception:
+        sys.stderr.write('{}\n'.format(exception))
+        return 1
+    if args.json:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+        return 0
+    rows = sorted(results['endpoints'].items())
+    if results['total']:
+        rows.append(('total', results['total']))
+    for label, measured in rows:
+        sys.stdout.write(
+            '{:<32} {:>7} {:>9.1f} req/s  p50 {:>7.2f}ms  p90 {:>7.2f}ms  '
+            'p99 {:>7.2f}ms  {:>6.2%} errors\n'.format(
+                label, measured['requests'], measured['requests_per_second'],
+                measured['latency']['p50'] * 1000,
+                measured['latency']['p90'] * 1000,
+                measured['latency']['p99'] * 1000, measured['error_rate']))
+    return 0
+
+COMMANDS = {
+    'export': export,
+    'import': import_,
+    'index': index,
+    'bench': bench,
+    }
 
 if __name__ == '__main__':
     sys.exit(main())
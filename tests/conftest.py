@@ -0,0 +1,54 @@
+"""Fixtures shared by the sandman test modules."""
+from __future__ import absolute_import
+import sys
+
+import json
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), os.path.pardir))
+
+from sandman import reflect_all_app
+
+
+def execute(*statements):
+    """Execute *statements* on the test database, outside sandman."""
+    connection = sqlite3.connect('chinook.sqlite3')
+    for statement in statements:
+        connection.execute(statement)
+    connection.commit()
+    connection.close()
+
+
+def response_json(response):
+    """Return the decoded JSON body of *response*."""
+    return json.loads(response.get_data(as_text=True))
+
+
+@pytest.yield_fixture(scope='function')  # pylint: disable=no-member
+def database():
+    """Yield the URI of a copy of the test database."""
+    shutil.copy2(
+        os.path.join('tests', 'data', 'chinook.sqlite3'), 'chinook.sqlite3')
+
+    yield 'sqlite+pysqlite:///chinook.sqlite3'
+
+    os.unlink('chinook.sqlite3')
+
+
+@pytest.yield_fixture(scope='function')  # pylint: disable=no-member
+def full_app(database):  # pylint: disable=redefined-outer-name
+    """Return the test application instance."""
+    application = reflect_all_app(database)
+    application.testing = True
+
+    yield application
+
+
+@pytest.yield_fixture(scope='function')  # pylint: disable=no-member
+def app(full_app):  # pylint: disable=redefined-outer-name
+    """Return a test client for the test application instance."""
+    yield full_app.test_client()
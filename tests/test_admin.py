@@ -0,0 +1,47 @@
+"""Tests for the admin interface and its views built on first use."""
+from __future__ import absolute_import
+
+from sandman import reflect_all_app
+
+
+def _endpoints(application):
+    """Return the endpoints of *application*'s URL rules."""
+    return set(rule.endpoint for rule in application.url_map.iter_rules())
+
+
+def test_lazy_views(database):  # pylint: disable=redefined-outer-name
+    """Are model views only built when first visited?"""
+    application = reflect_all_app(database)
+    client = application.test_client()
+    assert 'albumview.index_view' not in _endpoints(application)
+
+    response = client.get('/admin/')
+    assert response.status_code == 200
+    assert b'/admin/albumview/' in response.get_data()
+
+    response = client.get('/admin/albumview/')
+    assert response.status_code == 200
+    assert b'For Those About To Rock' in response.get_data()
+    assert 'albumview.index_view' in _endpoints(application)
+    assert 'artistview.index_view' not in _endpoints(application)
+    # links relative to the view's blueprint are built
+    assert b'/admin/albumview/edit/?id=1' in response.get_data()
+    assert client.get('/admin/artistview/?page=1').status_code == 200
+    assert client.get('/admin/nothingview/').status_code == 404
+
+
+def test_eager_views(database):  # pylint: disable=redefined-outer-name
+    """Are all model views built at startup in the eager mode?"""
+    application = reflect_all_app(database, admin='eager')
+
+    assert 'albumview.index_view' in _endpoints(application)
+    assert application.test_client().get(
+        '/admin/albumview/').status_code == 200
+
+
+def test_without_admin(database):  # pylint: disable=redefined-outer-name
+    """Can applications serve only the API?"""
+    client = reflect_all_app(database, admin=None).test_client()
+
+    assert client.get('/admin/').status_code == 404
+    assert client.get('/artist/1').status_code == 200
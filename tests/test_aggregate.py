@@ -0,0 +1,32 @@
+"""Tests for aggregation queries on collections."""
+from __future__ import absolute_import
+
+import json
+
+
+def test_group_by(app):  # pylint: disable=redefined-outer-name
+    """Can we count and sum rows per group?"""
+    response = app.get('/track?group_by=GenreId&agg=count,sum:UnitPrice')
+
+    assert response.status_code == 200
+    groups = json.loads(response.get_data(as_text=True))['resources']
+    assert len(groups) == 25
+    assert groups[0] == {
+        'GenreId': 1, 'count': 1297, 'sum_UnitPrice': '1284.03'}
+    assert sum(group['count'] for group in groups) == 3503
+
+
+def test_aggregate_whole_table(app):  # pylint: disable=redefined-outer-name
+    """Can we aggregate a collection without grouping it?"""
+    response = app.get('/track?agg=count,max:Milliseconds')
+
+    groups = json.loads(response.get_data(as_text=True))['resources']
+    assert groups == [{'count': 3503, 'max_Milliseconds': 5286953}]
+
+
+def test_aggregate_unknown_column(app):  # pylint: disable=redefined-outer-name
+    """Do we reject aggregates of columns the table doesn't have?"""
+    response = app.get('/track?group_by=Genre&agg=count')
+
+    assert response.status_code == 400
+    assert app.get('/track?agg=median:Bytes').status_code == 400
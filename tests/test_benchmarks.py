@@ -0,0 +1,64 @@
+"""Tests for the benchmark suite."""
+from __future__ import absolute_import
+
+import os
+import sqlite3
+
+import pytest
+
+from benchmarks.compare import compare
+from benchmarks.dataset import database_scale, generate, table_sizes
+from benchmarks.run import run, SCENARIOS
+
+
+def test_table_sizes():
+    """Are tables scaled in proportion, except lookup tables?"""
+    sizes = table_sizes(100000)
+
+    assert 95000 < sum(sizes.values()) <= 100000
+    assert sizes['Genre'] == 25
+    assert sizes['Track'] > 10 * sizes['Album'] / 2
+
+
+def test_generate(tmpdir):
+    """Do generated databases respect keys?"""
+    path = str(tmpdir.join('bench.sqlite3'))
+    sizes = generate(path, 2000)
+
+    connection = sqlite3.connect(path)
+    assert connection.execute(
+        'SELECT count(*) FROM Track').fetchone()[0] == sizes['Track']
+    assert connection.execute(
+        'SELECT count(*) FROM Track WHERE AlbumId NOT IN '
+        '(SELECT AlbumId FROM Album)').fetchone()[0] == 0
+    assert connection.execute(
+        'SELECT count(DISTINCT PlaylistId || \'-\' || TrackId) FROM '
+        'PlaylistTrack').fetchone()[0] == sizes['PlaylistTrack']
+
+
+def test_run(tmpdir):
+    """Do all scenarios run without errors, and can results be compared?"""
+    results = run(str(tmpdir.join('bench.sqlite3')), 2000, 5, 5.0, repeat=1)
+
+    assert results['rows'] > 1000
+    assert results['startup_seconds'] > 0
+    for scenario in SCENARIOS:
+        assert results['scenarios'][scenario]['requests'] == 5
+        assert results['scenarios'][scenario]['errors'] == 0
+    rows, regressed = compare(results, results, 0.1)
+    assert rows and not regressed
+    assert os.path.exists(str(tmpdir.join('bench.sqlite3')))
+    assert results['peak_memory_kb'] > 0
+
+
+def test_run_existing(tmpdir):
+    """Are existing databases only reused at the scale they were generated
+    with?"""
+    path = str(tmpdir.join('bench.sqlite3'))
+    sizes = generate(path, 2000)
+    assert database_scale(path) == 2000
+
+    results = run(path, 2000, 1, 5.0, ('get_by_id',), repeat=1)
+    assert results['rows'] == sum(sizes.values())
+    with pytest.raises(ValueError):
+        run(path, 5000, 1, 5.0, ('get_by_id',), repeat=1)
@@ -0,0 +1,120 @@
+"""Tests for bulk export and import of whole tables."""
+from __future__ import absolute_import
+
+import csv
+import io
+import json
+
+from sqlalchemy import create_engine, MetaData, Table
+
+from sandman.bulk import Exporter, partition_ranges
+
+
+def test_export_ndjson(app):  # pylint: disable=redefined-outer-name
+    """Can we export a whole table as NDJSON?"""
+    response = app.get('/track/export?partitions=3')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in
+            response.get_data(as_text=True).splitlines()]
+    assert sorted(row['TrackId'] for row in rows) == list(range(1, 3504))
+    assert all(isinstance(row['UnitPrice'], str) for row in rows)
+
+
+def test_export_csv(app):  # pylint: disable=redefined-outer-name
+    """Can we export a whole table as CSV?"""
+    response = app.get('/artist/export?format=csv')
+
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ['ArtistId', 'Name']
+    assert len(rows) == 276
+
+
+def test_export_unknown_format(app):  # pylint: disable=redefined-outer-name
+    """Do we reject unknown export formats?"""
+    response = app.get('/artist/export?format=xml')
+
+    assert response.status_code == 400
+
+
+def test_export_partitions(app):  # pylint: disable=redefined-outer-name
+    """Do we reject invalid partition counts and cap large ones?"""
+    for partitions in ('abc', '0', '-2'):
+        response = app.get('/artist/export?partitions={}'.format(partitions))
+        assert response.status_code == 400
+
+    response = app.get('/artist/export?partitions=100000')
+    assert response.status_code == 200
+    assert len(response.get_data(as_text=True).splitlines()) == 275
+
+
+def test_partition_ranges():
+    """Do partitions cover every primary key exactly once?"""
+    engine = create_engine('sqlite+pysqlite:///tests/data/chinook.sqlite3')
+    table = Table('Artist', MetaData(), autoload=True, autoload_with=engine)
+    with engine.connect() as connection:
+        ranges = partition_ranges(connection, table, 4)
+
+    assert len(ranges) == 4
+    assert ranges[0][0] == 1 and ranges[-1][1] == 276
+    assert all(previous[1] == current[0]
+               for previous, current in zip(ranges, ranges[1:]))
+
+    exporter = Exporter(engine, table, partitions=4, batch_size=50)
+    assert sum(chunk.count('\n') for chunk in exporter) == 275
+    assert exporter.rows == 275
+
+    exporter = Exporter(engine, table, partitions=16, batch_size=50,
+                        workers=2)
+    assert sum(chunk.count('\n') for chunk in exporter) == 275
+
+
+def test_import_ndjson(app):  # pylint: disable=redefined-outer-name
+    """Can we load a stream of NDJSON rows?"""
+    body = '\n'.join(json.dumps({'ArtistId': artist_id, 'Name': str(artist_id)})
+                     for artist_id in range(276, 1276))
+    response = app.post(
+        '/artist/import?batch_size=300', data=body,
+        headers={'Content-type': 'application/x-ndjson'})
+
+    assert response.status_code == 200
+    summary = json.loads(response.get_data(as_text=True))
+    assert summary['rows'] == 1000
+    assert summary['batches'] == 4
+    assert app.get('/artist/1275').status_code == 200
+
+
+def test_import_csv(app):  # pylint: disable=redefined-outer-name
+    """Can we load CSV rows, converting values to the columns' types?"""
+    body = ('InvoiceLineId,InvoiceId,TrackId,UnitPrice,Quantity\n'
+            '2241,1,1,0.99,2\n')
+    response = app.post('/invoiceline/import?format=csv', data=body)
+
+    assert response.status_code == 200
+    resource = json.loads(
+        app.get('/invoiceline/2241').get_data(as_text=True))
+    assert resource['Quantity'] == 2
+    assert resource['UnitPrice'] == '0.99'
+
+
+def test_import_unknown_column(app):  # pylint: disable=redefined-outer-name
+    """Do we reject rows with columns the table doesn't have?"""
+    body = '{"ArtistId": 276, "Name": "Jeff Knupp"}\n{"Nmae": "Typo"}\n'
+    response = app.post('/artist/import', data=body)
+
+    assert response.status_code == 400
+    error = json.loads(response.get_data(as_text=True))
+    assert error['message'] == 'line 2: unknown columns Nmae'
+    assert error['rows'] == 0
+
+
+def test_import_batch_size(app):  # pylint: disable=redefined-outer-name
+    """Do we reject batch sizes which aren't a positive number of rows?"""
+    for batch_size in ('abc', '0', '-5'):
+        response = app.post(
+            '/artist/import?batch_size={}'.format(batch_size),
+            data=json.dumps({'Name': 'Batch'}))
+
+        assert response.status_code == 400
@@ -0,0 +1,35 @@
+"""Tests for the statement cache used by sandman services."""
+from __future__ import absolute_import
+
+import json
+
+from sandman.cache import statement_cache
+
+
+def test_repeated_reads_hit_cache(app):  # pylint: disable=redefined-outer-name
+    """Do repeated GETs reuse the cached statement?"""
+    statement_cache.clear()
+    app.get('/artist/1')
+    app.get('/artist/2')
+
+    stats = json.loads(app.get('/_sandman/stats').get_data(as_text=True))
+    assert stats['statement_cache']['misses'] == 1
+    assert stats['statement_cache']['hits'] == 1
+    assert stats['statement_cache']['hit_rate'] == 0.5
+
+
+def test_cached_duplicate_check(app):  # pylint: disable=redefined-outer-name
+    """Does the cached duplicate check still match by value?"""
+    statement_cache.clear()
+    for artist_id, status_code in ((275, 204), (276, 201), (276, 204)):
+        response = app.post(
+            '/artist',
+            data=json.dumps({
+                'Name': 'Philip Glass Ensemble' if artist_id == 275 else
+                        'Jeff Knupp',
+                'ArtistId': artist_id
+                }),
+            headers={'Content-type': 'application/json'})
+        assert response.status_code == status_code
+
+    assert statement_cache.hits == 2
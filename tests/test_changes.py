@@ -0,0 +1,143 @@
+"""Tests for incremental change feeds."""
+from __future__ import absolute_import
+
+import json
+import os
+import shutil
+
+import pytest
+
+from sandman import reflect_all_app
+from sandman.sqlite import engines
+
+
+@pytest.yield_fixture(scope='function')  # pylint: disable=no-member
+def feed_app(full_app):  # pylint: disable=redefined-outer-name
+    """Return a test client for an application whose invoices have a change
+    feed."""
+    model = full_app.class_references['Invoice']
+    model.__updated_at__ = 'InvoiceDate'
+    yield full_app.test_client()
+    model.__updated_at__ = None
+
+
+def test_changes_since(feed_app):  # pylint: disable=redefined-outer-name
+    """Do we return the rows changed since the watermark, including those
+    changed at the watermark itself?"""
+    response = feed_app.get('/invoice/changes?since=2013-12-06')
+
+    assert response.status_code == 200
+    feed = json.loads(response.get_data(as_text=True))
+    assert [resource['InvoiceId'] for resource in feed['resources']] == [
+        409, 410, 411, 412]
+    assert feed['watermark'] == '2013-12-22T00:00:00'
+    assert feed['watermark_key'] is None
+    assert not feed['more']
+
+    # rows changed at the watermark may have committed since
+    response = feed_app.get(
+        '/invoice/changes?since={}'.format(feed['watermark']))
+    assert [resource['InvoiceId'] for resource in json.loads(
+        response.get_data(as_text=True))['resources']] == [412]
+
+
+def test_changes_pages(feed_app):  # pylint: disable=redefined-outer-name
+    """Do we page through the changes, including rows sharing an updated-at
+    value across pages?"""
+    url = '/invoice/changes?since=2013-11-03&limit=3'
+    pages = []
+    while True:
+        feed = json.loads(feed_app.get(url).get_data(as_text=True))
+        pages.append([resource['InvoiceId']
+                      for resource in feed['resources']])
+        if not feed['more']:
+            break
+        url = '/invoice/changes?since={}&since_key={}&limit=3'.format(
+            feed['watermark'], feed['watermark_key'])
+
+    assert pages == [
+        [399, 400, 401], [402, 403, 404], [405, 406, 407], [408, 409, 410],
+        [411, 412]]
+    assert feed['watermark_key'] is None
+
+
+def test_changes_ties(feed_app):  # pylint: disable=redefined-outer-name
+    """Does a page ending inside a run of rows changed at the same time
+    resume with the rest of them?"""
+    response = feed_app.get('/invoice/changes?since=2013-11-03&limit=1')
+    feed = json.loads(response.get_data(as_text=True))
+    assert [resource['InvoiceId'] for resource in feed['resources']] == [399]
+    assert feed['more']
+
+    response = feed_app.get(
+        '/invoice/changes?since={}&since_key={}&limit=1'.format(
+            feed['watermark'], feed['watermark_key']))
+    assert [resource['InvoiceId'] for resource in json.loads(
+        response.get_data(as_text=True))['resources']] == [400]
+
+
+def test_changes_tombstones(feed_app):  # pylint: disable=redefined-outer-name
+    """Are deletes made through sandman reported in the feed?"""
+    assert feed_app.delete('/invoice/412').status_code == 204
+
+    response = feed_app.get('/invoice/changes?since=2013-12-06')
+    feed = json.loads(response.get_data(as_text=True))
+    assert [resource['InvoiceId'] for resource in feed['resources']] == [
+        409, 410, 411]
+    assert [tombstone['resource_id'] for tombstone in feed['deleted']] == [
+        '412']
+
+    response = feed_app.get(
+        '/invoice/changes?since={}&deleted_since={}'.format(
+            feed['watermark'], feed['deleted_watermark']))
+    assert json.loads(response.get_data(as_text=True))['deleted'] == []
+
+
+def test_changes_not_configured(app):  # pylint: disable=redefined-outer-name
+    """Do we refuse change feeds for models without an updated-at column?"""
+    response = app.get('/artist/changes')
+
+    assert response.status_code == 501
+
+
+def test_invalid_watermark(feed_app):  # pylint: disable=redefined-outer-name
+    """Do we reject watermarks which don't match the column's type?"""
+    response = feed_app.get('/invoice/changes?since=yesterday')
+
+    assert response.status_code == 400
+
+
+def test_invalid_limit(feed_app):  # pylint: disable=redefined-outer-name
+    """Do we reject limits which aren't a positive number of changes?"""
+    for limit in ('0', 'all', '100000'):
+        response = feed_app.get('/invoice/changes?limit={}'.format(limit))
+
+        assert response.status_code == 400
+
+
+def test_changes_read_only(tmpdir):
+    """Are feeds served from the read-only connections of the SQLite
+    production mode, before and after a delete created the tombstones?"""
+    path = str(tmpdir.join('chinook.sqlite3'))
+    shutil.copy2(os.path.join('tests', 'data', 'chinook.sqlite3'), path)
+    application = reflect_all_app('sqlite+pysqlite:///{}'.format(path))
+    application.testing = True
+    application.config['SANDMAN_SQLITE_TUNING'] = True
+    model = application.class_references['Invoice']
+    model.__updated_at__ = 'InvoiceDate'
+    client = application.test_client()
+    try:
+        response = client.get('/invoice/changes?since=2013-12-05')
+        assert response.status_code == 200
+        assert json.loads(response.get_data(as_text=True))['deleted'] == []
+
+        assert client.delete('/invoice/412').status_code == 204
+        response = client.get('/invoice/changes?since=2013-12-05')
+        assert response.status_code == 200
+        feed = json.loads(response.get_data(as_text=True))
+        assert [tombstone['resource_id']
+                for tombstone in feed['deleted']] == ['412']
+    finally:
+        model.__updated_at__ = None
+        for engine in engines(application):
+            engine.dispose()
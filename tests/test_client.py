@@ -0,0 +1,65 @@
+"""Tests for the in-process client."""
+from __future__ import absolute_import
+
+import json
+
+import pytest
+from werkzeug.exceptions import MethodNotAllowed
+
+from sandman import reflect_all_app
+from sandman.client import Client
+from sandman.exception import NotFoundException
+
+
+def test_get_and_list(full_app, app):
+    # pylint: disable=redefined-outer-name
+    """Does the client return what the HTTP API serves, without HTTP?"""
+    client = Client(full_app)
+    response = app.get('/artist/1')
+    assert client.get('artist', 1) == json.loads(
+        response.get_data(as_text=True))
+    assert client.get('Artist', 1)['Name'] == 'AC/DC'
+    assert len(client.list('artist')) == 275
+    page = client.list('artist', page=2)
+    assert [artist['ArtistId'] for artist in page] == list(range(21, 41))
+    assert client.rows('artist', page=1)[0] == (1, 'AC/DC')
+    groups = client.list('track', group_by='GenreId', agg='count')
+    assert {'GenreId': 1, 'count': 1297} in groups
+    with pytest.raises(NotFoundException):
+        client.get('artist', 1000)
+    with pytest.raises(NotFoundException):
+        client.list('artist', page=100)
+    with pytest.raises(NotFoundException):
+        client.list('nothing')
+
+
+def test_writes(full_app):  # pylint: disable=redefined-outer-name
+    """Are resources created, updated, replaced and deleted?"""
+    client = Client(full_app)
+    created = client.create('artist', {'Name': 'Nick Cave'})
+    assert created['Name'] == 'Nick Cave'
+    assert client.create('artist', {'Name': 'Nick Cave'}) is None
+    artist_id = created['ArtistId']
+    assert client.update('artist', artist_id, {'Name': 'Nick'})['Name'] == (
+        'Nick')
+    assert client.replace(
+        'artist', artist_id, {'Name': 'Warren'})['Name'] == 'Warren'
+    client.delete('artist', artist_id)
+    with pytest.raises(NotFoundException):
+        client.get('artist', artist_id)
+
+
+def test_methods(full_app):
+    # pylint: disable=redefined-outer-name,unused-argument
+    """Are the methods a model doesn't allow refused?"""
+    application = reflect_all_app(
+        'sqlite+pysqlite:///chinook.sqlite3', single_rule=True)
+    model = application.class_references['Genre']
+    model.__methods__ = ('GET',)
+    try:
+        client = Client(application)
+        assert client.get('genre', 1)['Name'] == 'Rock'
+        with pytest.raises(MethodNotAllowed):
+            client.delete('genre', 1)
+    finally:
+        del model.__methods__
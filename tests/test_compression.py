@@ -0,0 +1,40 @@
+"""Tests for gzip compression of responses."""
+from __future__ import absolute_import
+
+import gzip
+import json
+
+
+def test_compressed_collection(app):  # pylint: disable=redefined-outer-name
+    """Do we gzip large responses for clients which accept it?"""
+    response = app.get('/artist', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    collection = json.loads(gzip.decompress(response.get_data()).decode())
+    assert len(collection['resources']) == 275
+
+
+def test_small_uncompressed(app):  # pylint: disable=redefined-outer-name
+    """Do we skip compressing responses below the size threshold?"""
+    response = app.get('/artist/1', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_no_accept_encoding(app):  # pylint: disable=redefined-outer-name
+    """Do we leave responses alone for clients which don't accept gzip?"""
+    response = app.get('/artist')
+
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_compressed_stream(app):  # pylint: disable=redefined-outer-name
+    """Do we compress streamed responses as they are sent?"""
+    response = app.get(
+        '/track/export', headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    lines = gzip.decompress(response.get_data()).decode().splitlines()
+    assert len(lines) == 3503
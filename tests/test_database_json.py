@@ -0,0 +1,34 @@
+"""Tests for database-side JSON generation of collections."""
+from __future__ import absolute_import
+
+import json
+
+
+def test_database_json_matches_python(full_app):
+    """Does the database generate the same collection JSON as Python?"""
+    client = full_app.test_client()
+    model = full_app.class_references['Track']
+    for url in ('/track', '/track?page=3'):
+        expected = json.loads(client.get(url).get_data(as_text=True))
+        model.__database_json__ = True
+        try:
+            response = client.get(url)
+        finally:
+            model.__database_json__ = False
+
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == 'application/json'
+        assert json.loads(response.get_data(as_text=True)) == expected
+
+
+def test_database_json_page_out_of_range(full_app):
+    """Do we 404 on pages past the end of the collection?"""
+    model = full_app.class_references['Artist']
+    model.__database_json__ = True
+    try:
+        response = full_app.test_client().get('/artist?page=100')
+    finally:
+        model.__database_json__ = False
+
+    assert response.status_code == 404
@@ -0,0 +1,151 @@
+"""Tests for the single-rule dispatch of service requests."""
+from __future__ import absolute_import
+
+import json
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from sandman import reflect_all_app
+from sandman.dispatch import ENDPOINT
+
+
+@pytest.yield_fixture(scope='function')  # pylint: disable=no-member
+def dispatched_app():
+    """Return an application routing the test database's services through
+    a single rule."""
+    shutil.copy2(
+        os.path.join('tests', 'data', 'chinook.sqlite3'), 'chinook.sqlite3')
+    application = reflect_all_app(
+        'sqlite+pysqlite:///chinook.sqlite3', single_rule=True)
+    application.testing = True
+
+    yield application
+
+    os.unlink('chinook.sqlite3')
+
+
+@pytest.yield_fixture(scope='function')  # pylint: disable=no-member
+def client(dispatched_app):  # pylint: disable=redefined-outer-name
+    """Return a test client for the dispatched application."""
+    yield dispatched_app.test_client()
+
+
+def test_single_rule(dispatched_app):  # pylint: disable=redefined-outer-name
+    """Do all services share one rule?"""
+    rules = [rule for rule in dispatched_app.url_map.iter_rules()
+             if rule.endpoint == ENDPOINT]
+    assert len(rules) == 1
+    assert not [rule for rule in dispatched_app.url_map.iter_rules()
+                if rule.rule.startswith('/artist')]
+
+
+def test_reads(client):  # pylint: disable=redefined-outer-name
+    """Are collections, resources and meta descriptions served?"""
+    response = client.get('/artist/1')
+    assert response.status_code == 200
+    assert json.loads(response.get_data(as_text=True))['Name'] == 'AC/DC'
+    response = client.get('/artist?page=2')
+    assert len(json.loads(response.get_data(as_text=True))['resources']) == 20
+    response = client.get('/artist/meta')
+    assert 'Artist' in json.loads(response.get_data(as_text=True))
+    assert client.get('/artist/export').status_code == 200
+
+
+def test_writes(client):  # pylint: disable=redefined-outer-name
+    """Are resources created, updated and deleted?"""
+    response = client.post('/artist', data=json.dumps({'Name': 'Dispatch'}),
+                           content_type='application/json')
+    assert response.status_code == 201
+    artist_id = json.loads(response.get_data(as_text=True))['ArtistId']
+    response = client.patch(
+        '/artist/{}'.format(artist_id), data=json.dumps({'Name': 'Patched'}),
+        content_type='application/json')
+    assert response.status_code == 200
+    assert client.delete('/artist/{}'.format(artist_id)).status_code == 204
+    assert client.get('/artist/{}'.format(artist_id)).status_code == 404
+
+
+def test_errors(client):  # pylint: disable=redefined-outer-name
+    """Are unknown paths not found and unsupported methods refused?"""
+    assert client.get('/nothing').status_code == 404
+    assert client.get('/artist/one').status_code == 404
+    assert client.get('/artist/1/Name/more').status_code == 404
+    response = client.delete('/artist')
+    assert response.status_code == 405
+    assert response.headers['Allow'] == 'GET, HEAD, POST'
+    assert client.post('/artist/1').status_code == 405
+
+
+def test_primary_key_types(tmpdir):
+    """Are primary key values converted to the type of their column?"""
+    path = str(tmpdir.join('codes.sqlite3'))
+    connection = sqlite3.connect(path)
+    connection.execute(
+        'CREATE TABLE Code (Code VARCHAR(8) PRIMARY KEY, Label TEXT)')
+    connection.execute("INSERT INTO Code VALUES ('ABC-1', 'first')")
+    connection.commit()
+    connection.close()
+    application = reflect_all_app(
+        'sqlite+pysqlite:///{}'.format(path), tables=['Code'],
+        single_rule=True)
+    response = application.test_client().get('/code/ABC-1')
+
+    assert response.status_code == 200
+    assert json.loads(response.get_data(as_text=True))['Label'] == 'first'
+
+
+def test_reserved_names(tmpdir):
+    """Do action names take precedence over primary key values?"""
+    path = str(tmpdir.join('codes.sqlite3'))
+    connection = sqlite3.connect(path)
+    connection.execute(
+        'CREATE TABLE Code (Code VARCHAR(8) PRIMARY KEY, Label TEXT)')
+    connection.executemany('INSERT INTO Code VALUES (?, ?)', [
+        ('meta', 'reserved'), ('metadata', 'free')])
+    connection.commit()
+    connection.close()
+    client = reflect_all_app(
+        'sqlite+pysqlite:///{}'.format(path), tables=['Code'],
+        single_rule=True).test_client()
+
+    response = client.get('/code/meta')
+    assert 'Code' in json.loads(response.get_data(as_text=True))
+    response = client.get('/code/metadata')
+    assert json.loads(response.get_data(as_text=True))['Label'] == 'free'
+    assert client.delete('/code/meta').status_code == 405
+    response = client.get('/code')
+    assert sorted(resource['Code'] for resource in json.loads(
+        response.get_data(as_text=True))['resources']) == ['meta', 'metadata']
+
+
+@pytest.mark.parametrize('single_rule', [False, True])
+def test_table_named_meta(tmpdir, single_rule):
+    """Is the collection of a table named meta served, and its meta
+    description at /meta/meta?"""
+    path = str(tmpdir.join('meta.sqlite3'))
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE Meta (MetaId INTEGER PRIMARY KEY, '
+                       'Label TEXT)')
+    connection.execute("INSERT INTO Meta VALUES (1, 'first')")
+    connection.commit()
+    connection.close()
+    client = reflect_all_app(
+        'sqlite+pysqlite:///{}'.format(path),
+        single_rule=single_rule).test_client()
+
+    response = client.get('/meta')
+    assert [resource['Label'] for resource in json.loads(
+        response.get_data(as_text=True))['resources']] == ['first']
+    response = client.get('/meta/meta')
+    assert 'Meta' in json.loads(response.get_data(as_text=True))
+
+
+def test_resources_listing(client):  # pylint: disable=redefined-outer-name
+    """Are dispatched services listed for discovery?"""
+    response = client.get('/_sandman/resources')
+    urls = [resource['url'] for resource in json.loads(
+        response.get_data(as_text=True))['resources']]
+    assert '/artist' in urls
@@ -0,0 +1,55 @@
+"""Tests for Server-Sent Events streams of resource changes."""
+from __future__ import absolute_import
+
+import json
+
+from sandman.events import broker
+
+
+def _event(stream):
+    """Return the type and payload of the next event in *stream*."""
+    message = next(stream)
+    if isinstance(message, bytes):
+        message = message.decode('utf-8')
+    if message.startswith(':'):
+        return _event(stream)
+    fields = dict(line.split(': ', 1) for line in message.strip().split('\n'))
+    return fields['event'], json.loads(fields['data'])
+
+
+def test_event_stream(app):  # pylint: disable=redefined-outer-name
+    """Are changes pushed to clients of the event stream?"""
+    response = app.get('/artist/events', buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    stream = iter(response.response)
+
+    app.post(
+        '/artist',
+        data=json.dumps({'Name': 'Jeff Knupp', 'ArtistId': 276}),
+        headers={'Content-type': 'application/json'})
+    event_type, data = _event(stream)
+    assert event_type == 'created'
+    assert data['Name'] == 'Jeff Knupp'
+
+    app.delete('/artist/276')
+    assert _event(stream) == ('deleted', {'resource_id': 276})
+    response.close()
+    assert not broker.has_subscribers('Artist')
+
+
+def test_event_fan_out(app):  # pylint: disable=redefined-outer-name
+    """Is one change delivered to every subscriber?"""
+    streams = [broker.stream('Artist') for _ in range(3)]
+
+    app.patch(
+        '/artist/275',
+        data=json.dumps({'Name': 'Jeff Knupp'}),
+        headers={'Content-type': 'application/json'})
+
+    for stream in streams:
+        event_type, data = _event(stream)
+        assert event_type == 'updated'
+        assert data['ArtistId'] == 275
+        stream.close()
+    assert not broker.has_subscribers('Artist')
@@ -0,0 +1,76 @@
+"""Tests for the group commit of the resources posted."""
+from __future__ import absolute_import
+
+import json
+import threading
+
+from sandman.client import Client
+
+
+def _post(client, values):
+    """POST *values* to ``/genre`` and return the response."""
+    return client.post('/genre', data=json.dumps(values),
+                       content_type='application/json')
+
+
+def test_concurrent_posts(full_app):  # pylint: disable=redefined-outer-name
+    """Are concurrent POSTs committed in groups and each acknowledged?"""
+    model = full_app.class_references['Genre']
+    model.__group_commit__ = True
+    full_app.config['SANDMAN_GROUP_COMMIT_DELAY'] = 0.05
+    try:
+        responses = []
+
+        def post(number):
+            """POST a new genre from a client of its own."""
+            responses.append(_post(
+                full_app.test_client(), {'Name': 'Genre {}'.format(number)}))
+        threads = [threading.Thread(target=post, args=(number,))
+                   for number in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert [response.status_code for response in responses] == [201] * 20
+        created = [json.loads(response.get_data(as_text=True))
+                   for response in responses]
+        assert len(set(genre['GenreId'] for genre in created)) == 20
+        committer = full_app.extensions['sandman_group_commit'][model]
+        assert committer.resources == 20
+        assert committer.groups < 20
+        client = full_app.test_client()
+        genre = created[0]
+        response = client.get('/genre/{}'.format(genre['GenreId']))
+        assert json.loads(response.get_data(as_text=True)) == genre
+        assert _post(client, {'Name': genre['Name']}).status_code == 204
+    finally:
+        del model.__group_commit__
+
+
+def test_failed_resources(full_app):
+    # pylint: disable=redefined-outer-name
+    """Does a resource the database rejects only fail its own request?"""
+    model = full_app.class_references['Genre']
+    model.__group_commit__ = True
+    full_app.config['SANDMAN_GROUP_COMMIT_DELAY'] = 0.05
+    try:
+        statuses = {}
+
+        def post(values):
+            """POST *values* from a client of its own."""
+            statuses[values['Name']] = _post(
+                full_app.test_client(), values).status_code
+        threads = [
+            threading.Thread(target=post, args=(values,)) for values in (
+                {'Name': 'Good'}, {'GenreId': 1, 'Name': 'Duplicate'},
+                {'Name': 'Unknown', 'Color': 'red'}, {'Name': 'Fine'})]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert statuses == {
+            'Good': 201, 'Duplicate': 400, 'Unknown': 400, 'Fine': 201}
+        created = Client(full_app).create('genre', {'Name': 'In-process'})
+        assert created['Name'] == 'In-process'
+    finally:
+        del model.__group_commit__
@@ -0,0 +1,132 @@
+"""Tests for deferred large object columns and byte-range streaming."""
+from __future__ import absolute_import
+
+import json
+import os
+import shutil
+import sqlite3
+
+import pytest
+from sqlalchemy.types import CLOB
+
+from sandman import reflect_all_app
+
+PAYLOAD = bytes(bytearray(range(256))) * 1024
+
+
+@pytest.yield_fixture(scope='function')  # pylint: disable=no-member
+def blob_app():
+    """Return a test client for an application with a BLOB column."""
+    shutil.copy2(
+        os.path.join('tests', 'data', 'chinook.sqlite3'), 'chinook.sqlite3')
+    connection = sqlite3.connect('chinook.sqlite3')
+    connection.execute('CREATE TABLE Attachment (AttachmentId INTEGER '
+                       'PRIMARY KEY, Name VARCHAR(40), Data BLOB)')
+    connection.execute('INSERT INTO Attachment VALUES (1, ?, ?)',
+                       ('cover.png', sqlite3.Binary(PAYLOAD)))
+    connection.execute('INSERT INTO Attachment VALUES (2, ?, NULL)',
+                       ('empty.png',))
+    connection.commit()
+    connection.close()
+    application = reflect_all_app('sqlite+pysqlite:///chinook.sqlite3')
+    application.testing = True
+
+    yield application.test_client()
+
+    os.unlink('chinook.sqlite3')
+
+
+def test_large_object_linked(blob_app):  # pylint: disable=redefined-outer-name
+    """Are large object columns replaced by links in resources?"""
+    response = blob_app.get('/attachment/1')
+
+    resource = json.loads(response.get_data(as_text=True))
+    assert resource['Name'] == 'cover.png'
+    assert resource['Data'] == '/attachment/1/Data'
+    assert blob_app.get(resource['Data']).get_data() == PAYLOAD
+
+    response = blob_app.get('/attachment')
+    resources = json.loads(response.get_data(as_text=True))['resources']
+    assert resources[0]['Data'] == resource['Data']
+
+
+def test_large_object_read(blob_app):  # pylint: disable=redefined-outer-name
+    """Can we download a whole large object value?"""
+    response = blob_app.get('/attachment/1/Data')
+
+    assert response.status_code == 200
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['Content-Length'] == str(len(PAYLOAD))
+    assert response.get_data() == PAYLOAD
+
+
+def test_large_object_range(blob_app):  # pylint: disable=redefined-outer-name
+    """Can we download part of a large object value?"""
+    response = blob_app.get(
+        '/attachment/1/Data', headers={'Range': 'bytes=70000-200000'})
+
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == 'bytes 70000-200000/{}'.format(
+        len(PAYLOAD))
+    assert response.get_data() == PAYLOAD[70000:200001]
+
+    response = blob_app.get(
+        '/attachment/1/Data', headers={'Range': 'bytes=-10'})
+    assert response.get_data() == PAYLOAD[-10:]
+
+
+def test_large_object_errors(blob_app):  # pylint: disable=redefined-outer-name
+    """Do we reject unsatisfiable ranges and missing values?"""
+    response = blob_app.get(
+        '/attachment/1/Data', headers={'Range': 'bytes=999999-'})
+    assert response.status_code == 416
+    assert blob_app.get('/attachment/2/Data').status_code == 404
+    assert blob_app.get('/attachment/3/Data').status_code == 404
+    assert blob_app.get('/attachment/1/Name').status_code == 404
+
+
+def test_large_object_database_json(blob_app):
+    """Do collections generated by the database link to large objects the
+    same way?"""
+    # pylint: disable=redefined-outer-name
+    expected = json.loads(blob_app.get('/attachment').get_data(as_text=True))
+    model = blob_app.application.class_references['Attachment']
+    model.__database_json__ = True
+    try:
+        response = blob_app.get('/attachment')
+    finally:
+        model.__database_json__ = False
+
+    resources = json.loads(response.get_data(as_text=True))['resources']
+    assert resources == expected['resources']
+    assert resources[0]['Data'] == '/attachment/1/Data'
+
+
+def test_large_object_text(blob_app):  # pylint: disable=redefined-outer-name
+    """Are text large objects returned whole, whatever the range requested?"""
+    model = blob_app.application.class_references['Attachment']
+    column = model.__table__.columns['Name']
+    column_type, column.type = column.type, CLOB()
+    # the columns found before the type changed
+    if '_large_object_columns' in vars(model):
+        delattr(model, '_large_object_columns')
+    try:
+        response = blob_app.get(
+            '/attachment/1/Name', headers={'Range': 'bytes=2-4'})
+    finally:
+        column.type = column_type
+        delattr(model, '_large_object_columns')
+
+    assert response.status_code == 200
+    assert 'Accept-Ranges' not in response.headers
+    assert 'Content-Range' not in response.headers
+    assert response.get_data(as_text=True) == 'cover.png'
+
+
+def test_large_object_columns_cached(blob_app):
+    """Are a model's large object columns found once, not per resource?"""
+    # pylint: disable=redefined-outer-name
+    model = blob_app.application.class_references['Attachment']
+
+    assert model.large_object_columns() == ('Data',)
+    assert model.large_object_columns() is model.large_object_columns()
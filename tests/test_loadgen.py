@@ -0,0 +1,87 @@
+"""Tests for the load generator behind ``sandmanctl bench``."""
+from __future__ import absolute_import
+
+import json
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+from sandman.loadgen import EndpointStats, LoadGenerator, Resource
+
+
+@pytest.yield_fixture(scope='function')  # pylint: disable=no-member
+def server(full_app):
+    """Serve the test application over HTTP and yield its URL."""
+    http_server = make_server('127.0.0.1', 0, full_app, threaded=True)
+    thread = threading.Thread(target=http_server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    yield 'http://127.0.0.1:{}'.format(http_server.server_port)
+
+    http_server.shutdown()
+
+
+def test_resources_listing(app):
+    """Are the resources and their meta routes listed?"""
+    response = app.get('/_sandman/resources')
+    resources = dict((resource['name'], resource) for resource in json.loads(
+        response.get_data(as_text=True))['resources'])
+
+    assert resources['Artist']['url'] == '/artist'
+    assert resources['Artist']['meta'] == '/artist/meta'
+    assert resources['Artist']['primary_key'] == 'ArtistId'
+    assert 'POST' in resources['Artist']['methods']
+
+
+def test_discover(server):
+    """Are resources discovered with their columns and some ids?"""
+    generator = LoadGenerator(server, names=['Artist', 'track'])
+    generator.discover()
+    resources = dict((resource.url, resource)
+                     for resource in generator.resources)
+
+    assert sorted(resources) == ['/artist', '/track']
+    assert resources['/artist'].writable
+    assert resources['/artist'].columns['Name'] == 'nvarchar(120)'
+    assert len(resources['/track'].ids) == 20
+    assert resources['/track'].pages == 100
+
+
+def test_run(server):
+    """Are reads and writes sent and measured per endpoint?"""
+    generator = LoadGenerator(server, names=['Artist'], concurrency=4,
+                              duration=30.0, requests=200, write_ratio=0.5)
+    results = generator.run()
+
+    assert results['total']['requests'] == 200
+    assert results['total']['errors'] == 0
+    assert 'GET /artist/<id>' in results['endpoints']
+    assert 'POST /artist' in results['endpoints']
+    assert sum(bucket['count'] for bucket in
+               results['total']['histogram']) == 200
+
+
+def test_unwritable_resources():
+    """Are resources with date columns only read?"""
+    resource = Resource(
+        {'url': '/invoice', 'primary_key': 'InvoiceId',
+         'methods': ['GET', 'POST']},
+        {'InvoiceId': 'integer', 'InvoiceDate': 'datetime'})
+
+    assert not resource.writable
+
+
+def test_endpoint_stats():
+    """Are percentiles, histograms and error rates computed?"""
+    stats = EndpointStats()
+    for milliseconds in range(1, 101):
+        stats.record(milliseconds / 1000.0, 200 if milliseconds > 10 else 500)
+    report = stats.report(2.0)
+
+    assert report['requests_per_second'] == 50
+    assert report['error_rate'] == 0.1
+    assert report['latency']['p50'] == 0.051
+    assert report['histogram'][0] == {'le_ms': 1, 'count': 1}
+    assert report['histogram'][-1] == {'le_ms': None, 'count': 0}
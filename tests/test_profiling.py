@@ -0,0 +1,73 @@
+"""Tests for request profiling."""
+from __future__ import absolute_import
+
+import json
+import marshal
+
+
+def _profiles(client):
+    """Return the description of the profiles kept."""
+    return json.loads(client.get('/_sandman/profiles').get_data(
+        as_text=True))['profiles']
+
+
+def test_profiling_disabled(app):  # pylint: disable=redefined-outer-name
+    """Are requests left alone unless profiling is configured?"""
+    response = app.get('/track?page=1', headers={'X-Profile': '1'})
+
+    assert 'X-Sandman-Profile-Id' not in response.headers
+    assert _profiles(app) == []
+
+
+def test_profile_header(full_app):
+    """Can clients ask for a request to be profiled and download it?"""
+    full_app.config['SANDMAN_PROFILE_HEADER'] = 'X-Profile'
+    full_app.config['SANDMAN_PROFILE_INTERVAL'] = 0.001
+    client = full_app.test_client()
+    assert 'X-Sandman-Profile-Id' not in client.get('/track').headers
+
+    # profiles are stored once the server closes the response
+    response = client.get('/track', headers={'X-Profile': '1'}, buffered=True)
+
+    profile_id = response.headers['X-Sandman-Profile-Id']
+    profile, = _profiles(client)
+    assert profile['id'] == int(profile_id)
+    assert profile['endpoint'] == 'Track'
+    assert profile['status'] == 200
+    stats = marshal.loads(client.get(
+        '/_sandman/profiles/{}.pstats'.format(profile_id)).get_data())
+    assert any(function == 'as_dict' or function == 'row_as_dict'
+               for _, _, function in stats)
+    collapsed = client.get(
+        '/_sandman/profiles/{}.collapsed'.format(profile_id)).get_data(
+            as_text=True)
+    for line in collapsed.splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0 and stack
+
+
+def test_profile_rate(full_app):
+    """Are only service requests sampled, and only the latest kept?"""
+    full_app.config['SANDMAN_PROFILE_RATE'] = 1
+    full_app.extensions['sandman_profiles'].limit = 2
+    client = full_app.test_client()
+    for _ in range(3):
+        client.get('/artist/1', buffered=True)
+    client.get('/_sandman/stats')
+
+    profiles = _profiles(client)
+    assert [profile['id'] for profile in profiles] == [3, 2]
+    assert client.get('/_sandman/profiles/1.pstats').status_code == 404
+
+
+def test_profile_streamed(full_app):
+    """Is the generation of a streamed body profiled?"""
+    full_app.config['SANDMAN_PROFILE_HEADER'] = 'X-Profile'
+    client = full_app.test_client()
+    response = client.get(
+        '/track/export', headers={'X-Profile': '1'}, buffered=True)
+
+    assert response.status_code == 200
+    stats = marshal.loads(client.get('/_sandman/profiles/{}.pstats'.format(
+        response.headers['X-Sandman-Profile-Id'])).get_data())
+    assert any(function == 'partition_ranges' for _, _, function in stats)
@@ -0,0 +1,66 @@
+"""Tests for query plans and the slow-query log."""
+from __future__ import absolute_import
+
+import json
+
+from sandman.query_log import loggable
+
+
+def _json(response):
+    """Return the JSON body of *response*."""
+    return json.loads(response.get_data(as_text=True))
+
+
+def test_explain_disabled(app):  # pylint: disable=redefined-outer-name
+    """Are query plans refused unless enabled?"""
+    assert app.get('/track?explain=1').status_code == 403
+
+
+def test_explain(full_app):
+    """Do we return the plan and timing of each statement executed?"""
+    full_app.config['SANDMAN_EXPLAIN'] = True
+    response = full_app.test_client().get('/track/5?explain=1')
+
+    assert response.status_code == 200
+    explain = _json(response)['explain']
+    assert explain['status'] == 200
+    assert explain['response_bytes'] > 0
+    assert explain['seconds'] >= explain['database_seconds']
+    query, = explain['queries']
+    assert query['statement'].startswith('SELECT')
+    assert query['parameters'] == [5]
+    assert 'Track' in json.dumps(query['plan'])
+
+
+def test_explain_off(full_app):
+    """Is a false explain parameter ignored?"""
+    full_app.config['SANDMAN_EXPLAIN'] = True
+    client = full_app.test_client()
+    for value in ('0', 'false', 'no', ''):
+        response = client.get('/track/5?explain={}'.format(value))
+        assert response.status_code == 200
+        assert 'explain' not in _json(response)
+
+
+def test_slow_query_log(full_app):
+    """Are statements over the threshold logged with their endpoint?"""
+    full_app.config['SANDMAN_SLOW_QUERY_SECONDS'] = 0
+    client = full_app.test_client()
+    client.get('/artist/3')
+
+    slow_queries = _json(client.get('/_sandman/slow_queries'))['slow_queries']
+    assert slow_queries[-1]['endpoint'] == 'Artist'
+    assert slow_queries[-1]['parameters'] == [3]
+    assert 'FROM "Artist"' in slow_queries[-1]['statement']
+
+
+def test_slow_query_log_default(app):  # pylint: disable=redefined-outer-name
+    """Is nothing logged by default?"""
+    app.get('/artist/3')
+
+    assert _json(app.get('/_sandman/slow_queries'))['slow_queries'] == []
+
+
+def test_loggable():
+    """Are parameters of other types made serializable?"""
+    assert loggable({'a': (1, b'x')}) == {'a': [1, repr(b'x')]}
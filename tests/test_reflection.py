@@ -0,0 +1,98 @@
+"""Tests for the parallel reflection of database tables."""
+from __future__ import absolute_import
+
+import os
+import shutil
+
+from sqlalchemy import (
+    Column, create_engine, ForeignKey, Integer, MetaData, Table)
+
+from sandman import reflect_all_app
+from sandman.reflection import reflect_tables, select_tables
+
+
+def _describe(table):
+    """Return the columns, keys and indexes of *table*."""
+    return (
+        [(column.name, repr(column.type), column.nullable,
+          column.primary_key) for column in table.columns],
+        sorted(key.target_fullname for key in table.foreign_keys),
+        sorted(index.name for index in table.indexes))
+
+
+def test_parallel_reflection(tmpdir):
+    """Are tables reflected in parallel as SQLAlchemy reflects them?"""
+    path = str(tmpdir.join('chinook.sqlite3'))
+    shutil.copy2(os.path.join('tests', 'data', 'chinook.sqlite3'), path)
+    engine = create_engine('sqlite+pysqlite:///{}'.format(path))
+    expected = MetaData()
+    expected.reflect(engine)
+    metadata = MetaData()
+
+    tables = reflect_tables(engine, metadata, workers=4)
+
+    assert len(tables) == len(expected.tables)
+    for name, table in expected.tables.items():
+        assert _describe(metadata.tables[name]) == _describe(table)
+
+
+def test_patterns(tmpdir):
+    """Are tables selected by pattern, with the tables they reference?"""
+    path = str(tmpdir.join('chinook.sqlite3'))
+    shutil.copy2(os.path.join('tests', 'data', 'chinook.sqlite3'), path)
+    metadata = MetaData()
+
+    reflect_tables(create_engine('sqlite+pysqlite:///{}'.format(path)),
+                   metadata, patterns=['track'])
+
+    assert sorted(metadata.tables) == [
+        'Album', 'Artist', 'Genre', 'MediaType', 'Track']
+    assert select_tables(['Invoice', 'InvoiceLine', 'Track'],
+                         ['invoice*']) == ['Invoice', 'InvoiceLine']
+
+
+def test_tables_referenced_twice(tmpdir):
+    """Are tables referenced by several foreign keys reflected once?"""
+    engine = create_engine('sqlite+pysqlite:///{}'.format(
+        tmpdir.join('graph.sqlite3')))
+    source = MetaData()
+    Table('node', source, Column('id', Integer, primary_key=True))
+    Table('edge', source, Column('id', Integer, primary_key=True),
+          Column('source_id', Integer, ForeignKey('node.id')),
+          Column('target_id', Integer, ForeignKey('node.id')))
+    source.create_all(engine)
+
+    tables = reflect_tables(engine, MetaData(), patterns=['edge'], workers=4)
+
+    assert sorted(table.name for table in tables) == ['edge', 'node']
+
+
+def test_in_memory_database():
+    """Are in-memory databases, whose connections are per thread,
+    reflected?"""
+    engine = create_engine('sqlite://')
+    source = MetaData()
+    Table('parent', source, Column('id', Integer, primary_key=True))
+    Table('child', source, Column('id', Integer, primary_key=True),
+          Column('parent_id', Integer, ForeignKey('parent.id')))
+    source.create_all(engine)
+    metadata = MetaData()
+
+    reflect_tables(engine, metadata)
+
+    assert sorted(metadata.tables) == ['child', 'parent']
+
+
+def test_selected_services():
+    """Are only the tables selected served?"""
+    shutil.copy2(
+        os.path.join('tests', 'data', 'chinook.sqlite3'), 'chinook.sqlite3')
+    try:
+        application = reflect_all_app(
+            'sqlite+pysqlite:///chinook.sqlite3', tables=['album'])
+        client = application.test_client()
+        assert client.get('/album/1').status_code == 200
+        assert client.get('/artist/1').status_code == 200
+        assert client.get('/track/1').status_code == 404
+    finally:
+        os.unlink('chinook.sqlite3')
@@ -0,0 +1,65 @@
+"""Tests for random samples of collections."""
+from __future__ import absolute_import
+
+import json
+
+from sqlalchemy import create_engine, MetaData, Table
+
+from sandman import sample
+from sandman.sample import parse_sample, sample_rows
+
+
+def test_sample_rows(app):  # pylint: disable=redefined-outer-name
+    """Can we get a sample of a given number of distinct resources?"""
+    response = app.get('/track?sample=25')
+
+    assert response.status_code == 200
+    resources = json.loads(response.get_data(as_text=True))['resources']
+    assert len(resources) == 25
+    assert len(set(resource['TrackId'] for resource in resources)) == 25
+    assert all('_links' in resource for resource in resources)
+
+
+def test_sample_percentage(app):  # pylint: disable=redefined-outer-name
+    """Can we get a sample of a percentage of a collection?"""
+    response = app.get('/track?sample=10%')
+
+    resources = json.loads(response.get_data(as_text=True))['resources']
+    assert len(resources) == 350
+
+
+def test_sample_without_integer_key():
+    """Can we sample tables whose primary key can't be probed?"""
+    engine = create_engine('sqlite+pysqlite:///tests/data/chinook.sqlite3')
+    table = Table(
+        'PlaylistTrack', MetaData(), autoload=True, autoload_with=engine)
+    with engine.connect() as connection:
+        rows = sample_rows(connection, table, 5, False)
+
+    assert len(rows) == 5
+    assert set(rows[0]) == set(['PlaylistId', 'TrackId'])
+
+
+def test_percentage_capped(monkeypatch):
+    """Are samples of a percentage of a table capped, however sampled?"""
+    monkeypatch.setattr(sample, 'MAX_SAMPLE_ROWS', 100)
+    engine = create_engine('sqlite+pysqlite:///tests/data/chinook.sqlite3')
+    metadata = MetaData()
+    with engine.connect() as connection:
+        for name in ('PlaylistTrack', 'Track'):
+            table = Table(name, metadata, autoload=True,
+                          autoload_with=engine)
+            assert len(sample_rows(connection, table, 100, True)) == 100
+
+
+def test_invalid_sample(app):  # pylint: disable=redefined-outer-name
+    """Do we reject invalid sample sizes?"""
+    assert app.get('/track?sample=0').status_code == 400
+    assert app.get('/track?sample=150%').status_code == 400
+    assert app.get('/track?sample=some').status_code == 400
+
+
+def test_parse_sample():
+    """Do we tell row counts and percentages apart?"""
+    assert parse_sample('40') == (40, False)
+    assert parse_sample('2.5%') == (2.5, True)
@@ -202,3 +202,18 @@ def test_custom_json_name_honored(custom_app):
 
     collection = json.loads(response.get_data(as_text=True))
     assert len(collection['singers']) == 275
+
+
+def test_core_reads_match_orm_reads(full_app):
+    """Do Core reads serialize resources exactly as ORM reads do?"""
+    client = full_app.test_client()
+    core_collection = client.get('/track?page=2').get_data(as_text=True)
+    core_resource = client.get('/track/1').get_data(as_text=True)
+    service = full_app.view_functions['Track'].view_class
+    service.__core_reads__ = False
+    try:
+        assert client.get('/track?page=2').get_data(
+            as_text=True) == core_collection
+        assert client.get('/track/1').get_data(as_text=True) == core_resource
+    finally:
+        service.__core_reads__ = True
@@ -0,0 +1,87 @@
+"""Tests for live schema reloads."""
+from __future__ import absolute_import
+
+import json
+import threading
+
+import pytest
+
+from sandman import reflect_all_app
+from sandman.schema import reload_schema
+
+from conftest import execute, response_json
+
+
+@pytest.mark.parametrize('single_rule', [False, True])
+def test_reload_adds_table(database, single_rule):
+    # pylint: disable=redefined-outer-name
+    """Are tables created after startup served once the schema reloads?"""
+    application = reflect_all_app(database, single_rule=single_rule)
+    client = application.test_client()
+    assert client.get('/album/1').status_code == 200
+    execute(
+        'CREATE TABLE Label (LabelId INTEGER PRIMARY KEY, Name TEXT)',
+        "INSERT INTO Label VALUES (1, 'Atlantic')")
+    assert client.get('/label/1').status_code == 404
+
+    response = client.post('/_sandman/schema/reload')
+    assert response.status_code == 200
+    assert response_json(response) == {'added': ['Label'], 'changed': []}
+    assert response_json(client.get('/label/1'))['Name'] == 'Atlantic'
+    assert client.post('/label', data=json.dumps({'Name': 'Island'}),
+                       content_type='application/json').status_code == 201
+    assert client.get('/label/2').status_code == 200
+    assert 'Label' in application.class_references
+    assert client.get('/admin/labelview/').status_code == 200
+    assert response_json(client.post('/_sandman/schema/reload')) == {
+        'added': [], 'changed': []}
+
+
+def test_reload_changes_table(database):
+    # pylint: disable=redefined-outer-name
+    """Are altered tables remapped, keeping the settings of their model?"""
+    application = reflect_all_app(database)
+    client = application.test_client()
+    model = application.class_references['Artist']
+    model.__searchable__ = ('Name',)
+    assert 'Country' not in response_json(client.get('/artist/1'))
+    execute('ALTER TABLE Artist ADD COLUMN Country TEXT',
+            "UPDATE Artist SET Country = 'Australia' WHERE ArtistId = 1")
+
+    assert reload_schema(application) == {
+        'added': [], 'changed': ['Artist']}
+    assert application.class_references['Artist'] is not model
+    assert response_json(client.get('/artist/1'))['Country'] == 'Australia'
+    assert application.class_references['Artist'].__searchable__ == (
+        'Name',)
+    assert reload_schema(application) == {'added': [], 'changed': []}
+
+
+def test_reload_selected_tables(database):
+    # pylint: disable=redefined-outer-name
+    """Are only the tables matching the patterns served added?"""
+    application = reflect_all_app(database, tables=['Album*', 'Label*'])
+    execute(
+        'CREATE TABLE Label (LabelId INTEGER PRIMARY KEY, Name TEXT)',
+        'CREATE TABLE Studio (StudioId INTEGER PRIMARY KEY, Name TEXT)',
+        'CREATE TABLE LabelLog (Line TEXT)')
+    assert reload_schema(application) == {
+        'added': ['Label'], 'changed': []}
+    # a table without a primary key isn't reflected again
+    assert reload_schema(application) == {'added': [], 'changed': []}
+
+
+def test_periodic_reload(database):
+    # pylint: disable=redefined-outer-name
+    """Are schema changes picked up in the background periodically?"""
+    application = reflect_all_app(database)
+    application.config['SANDMAN_SCHEMA_RELOAD_INTERVAL'] = 0.01
+    client = application.test_client()
+    execute('CREATE TABLE Label (LabelId INTEGER PRIMARY KEY, Name TEXT)')
+    state = application.extensions['sandman_schema']
+    state['checked'] -= 1
+    assert client.get('/album/1').status_code == 200
+    for thread in threading.enumerate():
+        if thread.name == 'sandman-schema-reload':
+            thread.join()
+    assert client.get('/label').status_code == 200
@@ -0,0 +1,141 @@
+"""Tests for full-text search of collections."""
+from __future__ import absolute_import
+
+import json
+
+import pytest
+from sqlalchemy import create_engine, MetaData, Table
+from sqlalchemy.dialects import postgresql
+
+from sandman import reflect_all_app
+from sandman.model import db
+from sandman.search import build_index, drop_index, index_tables, query_value
+
+
+@pytest.yield_fixture(scope='function')  # pylint: disable=no-member
+def search_app(full_app):
+    """Return a test client for an application with a searchable,
+    indexed Track table."""
+    full_app.class_references['Track'].__searchable__ = ('Name', 'Composer')
+    with full_app.app_context():
+        table = full_app.class_references['Track'].__table__
+        build_index(db.engine, table, ['Name', 'Composer'])
+    yield full_app.test_client()
+
+
+def _names(response):
+    """Return the names of the resources in *response*."""
+    return [resource['Name'] for resource in
+            json.loads(response.get_data(as_text=True))['resources']]
+
+
+def test_search(search_app):  # pylint: disable=redefined-outer-name
+    """Are all words matched, in any of the indexed columns?"""
+    names = _names(search_app.get('/track?q=love'))
+
+    assert len(names) == 20
+    assert names[0] == 'Love'
+    assert all('love' in name.lower() for name in names[:5])
+    assert _names(search_app.get('/track?q=bites love')) == ['Love Bites']
+
+
+def test_search_pages(search_app):  # pylint: disable=redefined-outer-name
+    """Are search results paginated?"""
+    first = _names(search_app.get('/track?q=love'))
+    second = _names(search_app.get('/track?q=love&page=2'))
+
+    assert len(second) == 20
+    assert not set(first) & set(second)
+
+
+def test_search_syntax(search_app):  # pylint: disable=redefined-outer-name
+    """Are query operators searched for as text?"""
+    response = search_app.get('/track?q=love"%20OR%20NEAR(')
+
+    assert response.status_code == 200
+    assert _names(response) == []
+
+
+def test_search_nothing(search_app):  # pylint: disable=redefined-outer-name
+    """Do we reject queries without words to search for?"""
+    for query in ('', '%20', '%20%09'):
+        response = search_app.get('/track?q={}'.format(query))
+
+        assert response.status_code == 400
+
+
+def test_new_resources(search_app):  # pylint: disable=redefined-outer-name
+    """Are new resources indexed?"""
+    response = search_app.post('/track', data=json.dumps({
+        'Name': 'Zyxwvut', 'MediaTypeId': 1, 'Milliseconds': 1,
+        'UnitPrice': 0.99}), content_type='application/json')
+    assert response.status_code == 201
+
+    assert _names(search_app.get('/track?q=zyxwvut')) == ['Zyxwvut']
+
+
+def test_search_unavailable(app):  # pylint: disable=redefined-outer-name
+    """Do we refuse to search unsearchable or unindexed collections?"""
+    assert app.get('/album?q=love').status_code == 501
+
+
+def test_search_without_index(full_app):
+    """Do we report a missing index?"""
+    full_app.class_references['Album'].__searchable__ = ('Title',)
+    with full_app.app_context():
+        drop_index(db.engine, full_app.class_references['Album'].__table__)
+
+    response = full_app.test_client().get('/album?q=love')
+    assert response.status_code == 501
+    assert 'index' in json.loads(response.get_data(as_text=True))['message']
+
+
+def test_index_tables_hidden(full_app):  # pylint: disable=unused-argument
+    """Are the tables of full-text indexes kept out of the API, at startup
+    and on schema reloads?"""
+    engine = create_engine('sqlite+pysqlite:///chinook.sqlite3')
+    metadata = MetaData()
+    build_index(engine, Table('Track', metadata, autoload=True,
+                              autoload_with=engine), ['Name'])
+    application = reflect_all_app('sqlite+pysqlite:///chinook.sqlite3')
+    client = application.test_client()
+    for name in index_tables('Track'):
+        assert name not in application.class_references
+        assert client.get('/{}'.format(name.lower())).status_code == 404
+
+    build_index(engine, Table('Album', metadata, autoload=True,
+                              autoload_with=engine), ['Title'])
+    response = client.post('/_sandman/schema/reload')
+    assert json.loads(response.get_data(as_text=True)) == {
+        'added': [], 'changed': []}
+
+
+def test_index_enables_search(full_app):
+    """Are reflected models searchable once their table is indexed, without
+    naming their searchable columns?"""
+    model = full_app.class_references['Track']
+    model.__searchable__ = ()
+    client = full_app.test_client()
+    assert client.get('/track?q=love').status_code == 501
+    with full_app.app_context():
+        build_index(db.engine, model.__table__, ['Name', 'Composer'])
+
+    assert 'Real Love' in _names(client.get('/track?q=love'))
+    assert model.__searchable__ == ('Name', 'Composer')
+    assert client.get('/genre?q=rock').status_code == 501
+
+
+def test_index_requires_integer_key():
+    """Do we refuse to index SQLite tables without an integer key?"""
+    engine = create_engine('sqlite+pysqlite:///tests/data/chinook.sqlite3')
+    table = Table(
+        'PlaylistTrack', MetaData(), autoload=True, autoload_with=engine)
+    with pytest.raises(ValueError):
+        build_index(engine, table, ['PlaylistId'])
+
+
+def test_query_value():
+    """Are words quoted for SQLite and left alone otherwise?"""
+    assert query_value(create_engine('sqlite://').dialect,
+                       'a "b') == '"a" """b"'
+    assert query_value(postgresql.dialect(), 'a "b') == 'a "b'
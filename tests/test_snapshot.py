@@ -0,0 +1,164 @@
+"""Tests for the local snapshots of slow tables."""
+from __future__ import absolute_import
+
+import threading
+
+import pytest
+
+from sandman import reflect_all_app
+from sandman.client import Client
+
+from conftest import execute, response_json
+
+
+@pytest.yield_fixture(scope='function')  # pylint: disable=no-member
+def snapshot_model(full_app):  # pylint: disable=redefined-outer-name
+    """Yield a function configuring a model to be served from a snapshot,
+    and restore the model afterwards."""
+    configured = []
+
+    def configure(name, **settings):
+        """Set the snapshot *settings* of the model *name*."""
+        model = full_app.class_references[name]
+        model.__snapshot__ = 60
+        for setting, value in settings.items():
+            setattr(model, '__snapshot_{}__'.format(setting), value)
+        configured.append(model)
+        return model
+
+    yield configure
+
+    for model in configured:
+        for setting in ('__snapshot__', '__snapshot_refresh__',
+                        '__snapshot_query__', '__updated_at__'):
+            if setting in vars(model):
+                delattr(model, setting)
+
+
+def _refresh_in_background(full_app, model, path):
+    """Make the snapshot of *model* stale, and wait for the refresh the next
+    request (to *path*) starts."""
+    snapshot = full_app.extensions['sandman_snapshots'][model]
+    snapshot.refreshed -= 120
+    response = full_app.test_client().get(path)
+    assert int(response.headers['Age']) >= 120
+    for thread in threading.enumerate():
+        if thread.name.startswith('sandman-snapshot-'):
+            thread.join()
+
+
+def test_served_from_snapshot(full_app, app, snapshot_model):
+    # pylint: disable=redefined-outer-name
+    """Are GET requests served from the snapshot, reporting its age?"""
+    model = snapshot_model('Artist')
+    response = app.get('/artist/1')
+    assert response_json(response)['Name'] == 'AC/DC'
+    assert response.headers['Age'] == '0'
+    assert response.headers['X-Sandman-Snapshot-Time'].endswith('Z')
+    assert len(response_json(app.get('/artist'))['resources']) == 275
+    assert 'Age' not in app.get('/album/1').headers
+    execute("UPDATE Artist SET Name = 'ACDC' WHERE ArtistId = 1")
+    assert response_json(app.get('/artist/1'))['Name'] == 'AC/DC'
+    assert Client(full_app).get('artist', 1)['Name'] == 'AC/DC'
+
+    _refresh_in_background(full_app, model, '/artist/1')
+    response = app.get('/artist/1')
+    assert response_json(response)['Name'] == 'ACDC'
+    assert int(response.headers['Age']) < 60
+    snapshot = full_app.extensions['sandman_snapshots'][model]
+    assert snapshot.refreshes == 2
+
+
+def test_age_of_read(full_app, app, snapshot_model):
+    # pylint: disable=redefined-outer-name
+    """Is the age reported that of the snapshot the read started on, even if
+    a refresh completes during the request?"""
+    model = snapshot_model('Artist')
+    app.get('/artist/1')
+    snapshot = full_app.extensions['sandman_snapshots'][model]
+    snapshot.refreshed -= 120
+    # complete the refresh before the request reads the snapshot
+    snapshot.refresh_in_background = lambda app: snapshot.refresh()
+
+    response = app.get('/artist/1')
+
+    assert snapshot.refreshes == 2
+    assert int(response.headers['Age']) >= 120
+
+
+def test_key_refresh(full_app, app, snapshot_model):
+    # pylint: disable=redefined-outer-name
+    """Are rows with greater keys added by key refreshes?"""
+    model = snapshot_model('Artist', refresh='key')
+    assert app.get('/artist/276').status_code == 404
+    execute("INSERT INTO Artist VALUES (276, 'Nick Cave')",
+            "UPDATE Artist SET Name = 'ACDC' WHERE ArtistId = 1")
+    full_app.extensions['sandman_snapshots'][model].refresh()
+    assert response_json(app.get('/artist/276'))['Name'] == 'Nick Cave'
+    # rows already copied aren't read again
+    assert response_json(app.get('/artist/1'))['Name'] == 'AC/DC'
+
+
+def test_timestamp_refresh(full_app):
+    # pylint: disable=redefined-outer-name,unused-argument
+    """Are changed and deleted rows applied by timestamp refreshes?"""
+    execute('CREATE TABLE Reading (ReadingId INTEGER PRIMARY KEY, '
+            'Value TEXT, UpdatedAt INTEGER)',
+            "INSERT INTO Reading VALUES (1, 'low', 1)",
+             "INSERT INTO Reading VALUES (2, 'high', 2)")
+    application = reflect_all_app('sqlite+pysqlite:///chinook.sqlite3')
+    model = application.class_references['Reading']
+    model.__updated_at__ = 'UpdatedAt'
+    model.__snapshot__ = 60
+    model.__snapshot_refresh__ = 'timestamp'
+    client = application.test_client()
+    try:
+        assert response_json(client.get('/reading/1'))['Value'] == 'low'
+        assert client.delete('/reading/2').status_code == 204
+        execute("UPDATE Reading SET Value = 'medium', UpdatedAt = 3 "
+                'WHERE ReadingId = 1')
+        assert client.get('/reading/2').status_code == 200
+        application.extensions['sandman_snapshots'][model].refresh()
+        assert response_json(client.get('/reading/1'))['Value'] == 'medium'
+        assert client.get('/reading/2').status_code == 404
+    finally:
+        for setting in ('__updated_at__', '__snapshot__',
+                        '__snapshot_refresh__'):
+            delattr(model, setting)
+
+
+def test_snapshot_query(app, snapshot_model):
+    # pylint: disable=redefined-outer-name
+    """Are only the rows of the model's snapshot query copied?"""
+    snapshot_model('Artist', query=lambda table: table.select().where(
+        table.c.ArtistId <= 10))
+    assert len(response_json(app.get('/artist'))['resources']) == 10
+    assert app.get('/artist/11').status_code == 404
+
+
+def test_failed_fill(full_app, app, snapshot_model, tmpdir):
+    # pylint: disable=redefined-outer-name
+    """Are the files of a snapshot whose first fill failed deleted?"""
+    full_app.config['SANDMAN_SNAPSHOT_DIRECTORY'] = str(tmpdir)
+
+    def broken(table):
+        """Select a column the table doesn't have."""
+        return table.select().where(table.c.Missing == 1)
+
+    snapshot_model('Artist', query=broken)
+    for _ in range(2):
+        with pytest.raises(AttributeError):
+            app.get('/artist/1')
+    assert tmpdir.listdir() == []
+    assert full_app.class_references['Artist'] not in (
+        full_app.extensions['sandman_snapshots'])
+
+
+def test_fills_independent(full_app, app, snapshot_model):
+    # pylint: disable=redefined-outer-name
+    """Are snapshots of other models filled while one is being filled?"""
+    model = snapshot_model('Artist')
+    snapshot_model('Genre')
+    locks = full_app.extensions['sandman_snapshot_locks']
+    with locks.setdefault(model, threading.Lock()):
+        assert response_json(app.get('/genre/1'))['Name'] == 'Rock'
@@ -0,0 +1,97 @@
+"""Tests for the SQLite production mode."""
+from __future__ import absolute_import
+
+import json
+import os
+import shutil
+import sqlite3
+
+import pytest
+from sqlalchemy import event
+
+from sandman import reflect_all_app
+from sandman.model import db
+from sandman.sqlite import database_path, engines
+
+
+@pytest.yield_fixture(scope='function')  # pylint: disable=no-member
+def tuned_app(tmpdir):
+    """Return an application serving a copy of the test database in the
+    SQLite production mode."""
+    path = str(tmpdir.join('chinook.sqlite3'))
+    shutil.copy2(os.path.join('tests', 'data', 'chinook.sqlite3'), path)
+    application = reflect_all_app('sqlite+pysqlite:///{}'.format(path))
+    application.testing = True
+    application.config['SANDMAN_SQLITE_TUNING'] = True
+
+    yield application
+
+    for engine in engines(application):
+        engine.dispose()
+
+
+def test_database_path():
+    """Does the mode only apply to SQLite database files?"""
+    assert database_path('sqlite+pysqlite:////tmp/db.sqlite3') == (
+        '/tmp/db.sqlite3')
+    assert database_path('sqlite://') is None
+    assert database_path('sqlite:///:memory:') is None
+    assert database_path('postgresql://localhost/db') is None
+
+
+def test_pragmas(tuned_app):  # pylint: disable=redefined-outer-name
+    """Are connections tuned, and are reads made on read-only ones?"""
+    with tuned_app.test_request_context('/artist/1'):
+        tuned_app.preprocess_request()
+        connection = db.session.connection()
+        assert connection.execute('PRAGMA journal_mode').scalar() == 'wal'
+        assert connection.execute('PRAGMA query_only').scalar() == 1
+        assert connection.execute('PRAGMA busy_timeout').scalar() == 5000
+    with tuned_app.test_request_context('/artist', method='POST'):
+        tuned_app.preprocess_request()
+        connection = db.session.connection()
+        assert connection.execute('PRAGMA query_only').scalar() == 0
+        assert connection.execute('PRAGMA synchronous').scalar() == 1
+
+
+def test_concurrent_reads(tuned_app):  # pylint: disable=redefined-outer-name
+    """Are reads served while another connection writes?"""
+    client = tuned_app.test_client()
+    response = client.post('/artist', data=json.dumps({'Name': 'Tuned'}),
+                           content_type='application/json')
+    assert response.status_code == 201
+    artist_id = json.loads(response.get_data(as_text=True))['ArtistId']
+
+    writer = sqlite3.connect(database_path(
+        tuned_app.config['SQLALCHEMY_DATABASE_URI']), timeout=0)
+    writer.execute('BEGIN EXCLUSIVE')
+    writer.execute("UPDATE Artist SET Name = 'Pending' WHERE ArtistId = 1")
+    try:
+        response = client.get('/artist/{}'.format(artist_id))
+        assert response.status_code == 200
+        assert json.loads(response.get_data(as_text=True))['Name'] == 'Tuned'
+        response = client.get('/artist/1')
+        assert json.loads(response.get_data(as_text=True))['Name'] == (
+            'AC/DC')
+    finally:
+        writer.rollback()
+        writer.close()
+
+
+def test_bulk_engines(tuned_app):  # pylint: disable=redefined-outer-name
+    """Are imports made on the writer connection and exports on read-only
+    ones, rather than on the application's engine?"""
+    checkouts = []
+    with tuned_app.app_context():
+        event.listen(db.get_engine(tuned_app), 'checkout',
+                     lambda *args: checkouts.append(args))
+    client = tuned_app.test_client()
+    response = client.post(
+        '/artist/import', data=json.dumps({'ArtistId': 276, 'Name': 'Bulk'}),
+        headers={'Content-type': 'application/x-ndjson'})
+    assert response.status_code == 200
+
+    response = client.get('/artist/export', buffered=True)
+    assert response.status_code == 200
+    assert '"Bulk"' in response.get_data(as_text=True)
+    assert checkouts == []
@@ -0,0 +1,75 @@
+"""Tests for request tracing."""
+from __future__ import absolute_import
+
+import json
+import os
+
+import pytest
+
+TRACEPARENT = '00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-{}'
+
+
+@pytest.yield_fixture(scope='function')  # pylint: disable=no-member
+def traces(full_app):
+    """Export the traces of the test application to a file, and yield a
+    function returning the spans of each trace exported."""
+    full_app.config['SANDMAN_TRACE_EXPORT'] = 'traces.jsonl'
+
+    def exported():
+        """Return the spans of each trace exported, by name."""
+        if not os.path.exists('traces.jsonl'):
+            return []
+        with open('traces.jsonl') as lines:
+            return [dict(
+                (span['name'], span) for span in json.loads(line)[
+                    'resourceSpans'][0]['scopeSpans'][0]['spans'])
+                    for line in lines]
+    yield exported
+
+    if os.path.exists('traces.jsonl'):
+        os.unlink('traces.jsonl')
+
+
+def test_trace(full_app, traces):  # pylint: disable=redefined-outer-name
+    """Are the phases of a request recorded as nested spans?"""
+    response = full_app.test_client().get('/track/3', buffered=True)
+    assert response.status_code == 200
+
+    spans, = traces()
+    root = spans['GET /track/3']
+    assert 'parentSpanId' not in root
+    for name in ('flask.routing', 'db.pool.wait', 'sql', 'serialize',
+                 'jsonify', 'response.write'):
+        assert spans[name]['parentSpanId'] == root['spanId']
+        assert spans[name]['traceId'] == root['traceId']
+        assert int(spans[name]['startTimeUnixNano']) >= int(
+            root['startTimeUnixNano'])
+    assert {'key': 'http.status_code', 'value': {'intValue': '200'}} in root[
+        'attributes']
+    assert {'key': 'http.route',
+            'value': {'stringValue': '/track/<int:resource_id>'}} in spans[
+                'flask.routing']['attributes']
+    assert response.headers['traceresponse'] == '00-{}-{}-01'.format(
+        root['traceId'], root['spanId'])
+
+
+def test_traceparent(full_app, traces):  # pylint: disable=redefined-outer-name
+    """Do we continue the caller's trace, unless it isn't sampled?"""
+    client = full_app.test_client()
+    client.get('/artist/1', buffered=True,
+               headers={'traceparent': TRACEPARENT.format('01')})
+    client.get('/artist/1', buffered=True,
+               headers={'traceparent': TRACEPARENT.format('00')})
+
+    spans, = traces()
+    root = spans['GET /artist/1']
+    assert root['traceId'] == '0af7651916cd43dd8448eb211c80319c'
+    assert root['parentSpanId'] == 'b7ad6b7169203331'
+
+
+def test_tracing_disabled(app):  # pylint: disable=redefined-outer-name
+    """Is nothing traced by default?"""
+    response = app.get('/artist/1', buffered=True)
+
+    assert 'traceresponse' not in response.headers
+    assert not os.path.exists('traces.jsonl')